@@ -0,0 +1,83 @@
+import numpy as np
+
+from fftoptionlib.engine_class import (
+    FFTEngine,
+    FractionFFTEngine,
+    NUFFTEngine,
+    CosineEngine,
+)
+from fftoptionlib.process_class import (
+    BlackScholes,
+    Heston,
+    MertonJump,
+    KouJump,
+    VarianceGamma,
+    NIG,
+    Poisson,
+    CGMY,
+)
+
+S0 = 100.
+RATE = 0.03
+DIVIDEND = 0.01
+
+
+def fft_engine(N, precision='double'):
+    # grid spacings shrink together, so both the u truncation and the log-strike range grow with N
+    d_u = np.sqrt(2 * np.pi / N)
+    return FFTEngine(N, d_u, 1.5, spline_order=3, precision=precision)
+
+
+def fraction_fft_engine(N, precision='double'):
+    return FractionFFTEngine(N, 4 * np.sqrt(2 * np.pi / N), 4. / N, 1.5, spline_order=3, precision=precision)
+
+
+def nufft_engine(N):
+    # no strike grid to resolve: d_u only keeps the aliasing period 2 pi / d_u wide, N sets the u truncation
+    return NUFFTEngine(N, 0.25, 1.5)
+
+
+def cosine_engine(N):
+    return CosineEngine(N, 12)
+
+
+ENGINES = {
+    'FFTEngine': fft_engine,
+    'FractionFFTEngine': fraction_fft_engine,
+    'NUFFTEngine': nufft_engine,
+    'CosineEngine': cosine_engine,
+}
+
+# parameters keep the mgf finite at alpha + 1, which the Carr-Madan engines need
+PROCESSES = {
+    'BlackScholes': lambda: BlackScholes(0.2),
+    'MertonJump': lambda: MertonJump(0.2, 0.5, -0.1, 0.15),
+    'KouJump': lambda: KouJump(0.2, 0.8, 10., 5., 0.4),
+    # lattice distribution, the Fourier engines do not converge on it: kept as a stress case
+    'Poisson': lambda: Poisson(0.34),
+    'VarianceGamma': lambda: VarianceGamma(-0.14, 0.2, 0.12),
+    'NIG': lambda: NIG(4., 0.3, 0.6),
+    'CGMY': lambda: CGMY(0.1, 5., 5., 1.5),
+    'Heston': lambda: Heston(0.04, 0.05, 1.5, 0.3, -0.6),
+}
+
+
+def engine_cells(engine_name, N, n_strikes):
+    """
+    Size of the largest intermediate array, the COS engine expands every strike over the whole grid.
+    """
+    if engine_name == 'CosineEngine':
+        return N * n_strikes
+    return N
+
+
+def strike_grid(n_strikes):
+    if n_strikes == 1:
+        return np.array([S0])
+    return np.linspace(0.6 * S0, 1.6 * S0, n_strikes)
+
+
+def reference_prices(process, strike, t, N=2 ** 14, L=16, chunk_size=256):
+    engine = CosineEngine(N, L)
+    return np.concatenate([engine(strike=strike[i:i + chunk_size], t=t, r=RATE, q=DIVIDEND, S0=S0, chf_ln_st=process)
+                           for i in range(0, len(strike), chunk_size)])
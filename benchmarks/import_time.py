@@ -0,0 +1,48 @@
+"""
+Wall time of a fresh `import fftoptionlib` and the heavy modules it loads, median over separate interpreters.
+
+    python -m benchmarks.import_time --max-seconds 0.5
+
+Exits with status 1 when the median exceeds --max-seconds.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import fftoptionlib
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('pandas', 'autograd', 'scipy') if name in sys.modules]
+print(elapsed, ' '.join(heavy))
+'''
+
+
+def measure_import(repeat):
+    times, heavy_modules = [], set()
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT]).decode().split()
+        times.append(float(output[0]))
+        heavy_modules.update(output[1:])
+    return times, sorted(heavy_modules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--max-seconds', type=float)
+    args = parser.parse_args(argv)
+    times, heavy_modules = measure_import(args.repeat)
+    result = {'median': statistics.median(times), 'min': min(times), 'max': max(times),
+              'heavy_modules': heavy_modules}
+    json.dump(result, sys.stdout, indent=1)
+    print()
+    if args.max_seconds is not None and result['median'] > args.max_seconds:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Single against double precision in the Carr-Madan engines: price differences, speedup of the chf and transform
+stages, and the size of the chf array.
+
+    python -m benchmarks.precision
+"""
+import argparse
+import json
+import sys
+import timeit
+
+import numpy as np
+
+from benchmarks.cases import (
+    PROCESSES,
+    S0,
+    RATE,
+    DIVIDEND,
+    fft_engine,
+    fraction_fft_engine,
+    strike_grid,
+)
+from fftoptionlib.engine_class import discounted_chf
+
+ENGINES = {
+    'FFTEngine': fft_engine,
+    'FractionFFTEngine': fraction_fft_engine,
+}
+
+
+def transform_time(engine, process, t, repeat):
+    def price_grid():
+        engine.transform(S0, discounted_chf(engine.grid_plan.chf_u_arr, t, RATE, DIVIDEND, S0, process))
+
+    return min(timeit.repeat(price_grid, number=5, repeat=repeat)) / 5
+
+
+def compare(engine_name, process_name, N, strike, t, repeat):
+    process = PROCESSES[process_name]()
+    double_engine = ENGINES[engine_name](N, 'double')
+    single_engine = ENGINES[engine_name](N, 'single')
+    double_prices = double_engine(strike, t, RATE, DIVIDEND, S0, process)
+    single_prices = single_engine(strike, t, RATE, DIVIDEND, S0, process)
+    abs_error = np.abs(single_prices - double_prices)
+    return {
+        'engine': engine_name,
+        'process': process_name,
+        'N': N,
+        't': t,
+        'max_abs_error': float(abs_error.max()),
+        'max_error_over_spot': float(abs_error.max() / S0),
+        'max_rel_error': float(np.max(abs_error / np.maximum(double_prices, 1e-3 * S0))),
+        'speedup': transform_time(double_engine, process, t, repeat) / transform_time(single_engine, process, t, repeat),
+        'chf_bytes': discounted_chf(single_engine.grid_plan.chf_u_arr, t, RATE, DIVIDEND, S0, process).nbytes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', nargs='+', type=int, default=[2 ** 12, 2 ** 14])
+    parser.add_argument('--maturities', nargs='+', type=float, default=[0.1, 1.0])
+    parser.add_argument('--strikes', type=int, default=101)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    strike = strike_grid(args.strikes)
+    records = [compare(engine_name, process_name, N, strike, t, args.repeat)
+               for engine_name in ENGINES for process_name in PROCESSES if process_name != 'Poisson'
+               for N in args.n for t in args.maturities]
+    json.dump(records, sys.stdout, indent=1)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Time every engine against every process over grid sizes, strike counts and maturities.
+
+    python -m benchmarks.run --output results.json
+
+Results are JSON: one record per case with best and first-call wall time, tracemalloc peak memory and the
+maximum absolute error against high-N COS reference prices.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import scipy
+
+import fftoptionlib
+from benchmarks.cases import (
+    ENGINES,
+    PROCESSES,
+    S0,
+    RATE,
+    DIVIDEND,
+    engine_cells,
+    strike_grid,
+    reference_prices,
+)
+
+DEFAULT_N = [2 ** 8, 2 ** 10, 2 ** 12, 2 ** 14, 2 ** 16]
+DEFAULT_STRIKES = [1, 100, 10000]
+DEFAULT_MATURITIES = [0.1, 1.0]
+
+
+def price(engine, process, strike, t):
+    return engine(strike=strike, t=t, r=RATE, q=DIVIDEND, S0=S0, chf_ln_st=process)
+
+
+def time_case(engine_factory, process, N, strike, t, repeat):
+    """
+    :return: first call time (grid plan built), best time of the following calls, prices
+    """
+    engine = engine_factory(N)
+    start = time.perf_counter()
+    prices = price(engine, process, strike, t)
+    first_time = time.perf_counter() - start
+    best_time = first_time
+    for _ in range(repeat):
+        start = time.perf_counter()
+        price(engine, process, strike, t)
+        best_time = min(best_time, time.perf_counter() - start)
+    return first_time, best_time, prices
+
+
+def peak_memory(engine_factory, process, N, strike, t):
+    engine = engine_factory(N)
+    tracemalloc.start()
+    try:
+        price(engine, process, strike, t)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(engine_name, process_name, N, n_strikes, t, reference, repeat, max_cells):
+    record = {'engine': engine_name, 'process': process_name, 'N': N, 'n_strikes': n_strikes, 't': t}
+    if engine_cells(engine_name, N, n_strikes) > max_cells:
+        record['status'] = 'skipped'
+        return record
+    strike = strike_grid(n_strikes)
+    process = PROCESSES[process_name]()
+    engine_factory = ENGINES[engine_name]
+    first_time, best_time, prices = time_case(engine_factory, process, N, strike, t, repeat)
+    record.update({
+        'status': 'ok',
+        'first_time': first_time,
+        'best_time': best_time,
+        'peak_memory': peak_memory(engine_factory, process, N, strike, t),
+        'max_abs_error': float(np.max(np.abs(np.asarray(prices) - reference))),
+    })
+    return record
+
+
+def run(engine_names, process_names, n_list, strike_counts, maturities, repeat, max_cells, log=None):
+    records = []
+    for process_name in process_names:
+        for t in maturities:
+            for n_strikes in strike_counts:
+                reference = reference_prices(PROCESSES[process_name](), strike_grid(n_strikes), t)
+                for engine_name in engine_names:
+                    for N in n_list:
+                        record = run_case(engine_name, process_name, N, n_strikes, t, reference, repeat, max_cells)
+                        records.append(record)
+                        if log is not None:
+                            log(record)
+    return records
+
+
+def metadata():
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'fftoptionlib': fftoptionlib.__version__,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--processes', nargs='+', default=list(PROCESSES), choices=list(PROCESSES))
+    parser.add_argument('--n', nargs='+', type=int, default=DEFAULT_N, help='grid sizes')
+    parser.add_argument('--strikes', nargs='+', type=int, default=DEFAULT_STRIKES, help='strike counts')
+    parser.add_argument('--maturities', nargs='+', type=float, default=DEFAULT_MATURITIES)
+    parser.add_argument('--repeat', type=int, default=3, help='timed calls after the first one')
+    parser.add_argument('--max-cells', type=int, default=2 ** 24,
+                        help='skip cases whose largest intermediate array has more elements')
+    parser.add_argument('--output', help='JSON file, stdout by default')
+    parser.add_argument('--quiet', action='store_true')
+    return parser.parse_args(argv)
+
+
+def log_record(record):
+    if record['status'] == 'ok':
+        print('{engine:>18} {process:>14} N={N:<6} strikes={n_strikes:<6} t={t:<5} '
+              '{best_time:.2e}s {peak_memory:>11}B err={max_abs_error:.1e}'.format(**record), file=sys.stderr)
+    else:
+        print('{engine:>18} {process:>14} N={N:<6} strikes={n_strikes:<6} t={t:<5} {status}'.format(**record),
+              file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    records = run(args.engines, args.processes, args.n, args.strikes, args.maturities, args.repeat, args.max_cells,
+                  log=None if args.quiet else log_record)
+    results = {'metadata': metadata(), 'results': records}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    else:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,12 @@
 from .engine_class import (
     FFTEngine,
     FractionFFTEngine,
+    NUFFTEngine,
     CosineEngine,
+    EarlyExerciseCosineEngine,
+    BarrierEngine,
 )
-from .option_class import BasicOption
+from .option_class import BasicOption, OptionBatch
 from .pricing_class import FourierPricer
 from .process_class import (
     BlackScholes,
@@ -16,3 +19,7 @@ from .process_class import (
     CGMY,
 )
 from .version import __version__
+from .portfolio import price_portfolio
+from .instrumentation import StageCollector
+from .fft_backend import set_fft_backend
+from .chf_cache import ChfCache, set_chf_cache
@@ -0,0 +1,52 @@
+import numpy as np
+
+from fftoptionlib.fft_backend import get_fft_backend
+from fftoptionlib.helper import read_only
+
+
+class BarrierGridPlan(object):
+    """
+    Log price grid of the Fourier time stepping (Jackson, Jaimungal and Surkov, 2008), built once and used at
+    every monitoring date. The log price is taken over the barrier, which sits on a grid point.
+    """
+
+    def __init__(self, N, x_min, x_max):
+        self.N = N
+        self.d_x = (x_max - x_min) / N
+        barrier_index = int(np.ceil(-x_min / self.d_x))
+        self.x_min = -barrier_index * self.d_x
+        self.x_arr = self.x_min + np.arange(N) * self.d_x
+        self.omega_arr = 2 * np.pi * np.fft.fftfreq(N, self.d_x)
+        # trapezoidal weights of the knocked out value, half at the barrier
+        self.down_arr = (self.x_arr > 0) + 0.5 * (np.arange(N) == barrier_index)
+        self.up_arr = (self.x_arr < 0) + 0.5 * (np.arange(N) == barrier_index)
+        read_only(self.x_arr, self.omega_arr, self.down_arr, self.up_arr)
+
+    @property
+    def key(self):
+        return self.N, self.x_min, self.d_x
+
+    def knock_out_weights(self, is_up):
+        return self.up_arr if is_up else self.down_arr
+
+
+def fourier_time_stepping_put(grid_plan, log_strike, x0, transfer_arr, monitoring_dates, is_up, fft_backend=None):
+    """
+    Knock-out put with payoff (exp(log_strike) - exp(x))^+, x the log price over the barrier, monitored at
+    monitoring_dates dates dt apart, the last one at expiry. Each date costs one FFT pair per strike.
+    :param log_strike: log strikes over the barrier, one row per strike
+    :param transfer_arr: discounted chf of the log price increment over dt on grid_plan.omega_arr
+    :return: unit barrier prices at x0
+    """
+    fft_backend = get_fft_backend(fft_backend)
+    weight_arr = grid_plan.knock_out_weights(is_up)
+    value_arr = weight_arr * np.maximum(np.exp(np.reshape(log_strike, (-1, 1))) - np.exp(grid_plan.x_arr), 0.)
+    for _ in range(monitoring_dates - 1):
+        spectrum_arr = fft_backend.fft(value_arr, axis=-1)
+        spectrum_arr *= transfer_arr
+        value_arr = weight_arr * fft_backend.ifft(spectrum_arr, axis=-1, overwrite_x=True).real
+    spectrum_arr = fft_backend.fft(value_arr, axis=-1)
+    spectrum_arr *= transfer_arr
+    # trigonometric interpolation of the last step at x0
+    phase_arr = np.exp(1j * grid_plan.omega_arr * (x0 - grid_plan.x_min))
+    return (spectrum_arr * phase_arr).real.sum(axis=-1) / grid_plan.N
@@ -1,64 +1,157 @@
 import numpy as np
-from scipy.special import gamma
+
+from fftoptionlib.helper import LazyModule
+
+special = LazyModule('scipy.special')
+
+_kernel_chfs = None
+
+
+def set_chf_kernels(enabled):
+    """
+    :param enabled: False keeps the numpy chfs even when numba is installed, True or None selects the numba
+    kernels of chf_kernels when it can be imported
+    """
+    global _kernel_chfs
+    _kernel_chfs = {} if enabled is False else None
+
+
+def kernel_chf(chf):
+    """
+    :return: the numba kernel of a built-in ln(S_T) chf when numba is installed, else chf itself
+    """
+    global _kernel_chfs
+    if _kernel_chfs is None:
+        try:
+            from fftoptionlib import chf_kernels
+        except ImportError:
+            _kernel_chfs = {}
+        else:
+            _kernel_chfs = chf_kernels.make_kernel_chfs()
+    return _kernel_chfs.get(chf, chf)
+
+
+def cexp(z):
+    """
+    np.exp, except that complex64 arrays go through the float32 exp, cos and sin: unlike the complex64
+    ufuncs these are vectorized. clog, csqrt and cpow follow the same path.
+    """
+    z = np.asarray(z)
+    if z.dtype != np.complex64:
+        return np.exp(z)
+    modulus = np.exp(z.real)
+    res = np.empty(z.shape, dtype=np.complex64)
+    res.real = modulus * np.cos(z.imag)
+    res.imag = modulus * np.sin(z.imag)
+    return res
+
+
+def clog(z):
+    z = np.asarray(z)
+    if z.dtype != np.complex64:
+        return np.log(z)
+    res = np.empty(z.shape, dtype=np.complex64)
+    res.real = np.log(np.hypot(z.real, z.imag))
+    res.imag = np.arctan2(z.imag, z.real)
+    return res
+
+
+def csqrt(z):
+    z = np.asarray(z)
+    if z.dtype != np.complex64:
+        return np.sqrt(z)
+    return cexp(0.5 * clog(z))
+
+
+def cpow(z, y):
+    z = np.asarray(z)
+    if z.dtype != np.complex64:
+        return z ** y
+    return cexp(y * clog(z))
 
 
 def black_schole_log_st_chf(u, t, r, q, S0, sigma):
-    chf_xt = diffusion_chf
-    return general_ln_st_chf(u, t, r, q, S0, chf_xt, sigma=sigma)
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, diffusion_exponent, sigma))
 
 
 def merton_jump_log_st_chf(u, t, r, q, S0, sigma, jump_rate, norm_m, norm_sig):
-    chf_xt = diffusion_with_cpp_normal_chf
-    return general_ln_st_chf(u, t, r, q, S0, chf_xt, sigma=sigma, jump_rate=jump_rate, norm_m=norm_m, norm_sig=norm_sig)
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, diffusion_with_cpp_normal_exponent, sigma, jump_rate, norm_m,
+                                       norm_sig))
 
 
 def kou_jump_log_st_chf(u, t, r, q, S0, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
-    chf_xt = diffusion_with_cpp_double_exponential_chf
-    return general_ln_st_chf(u, t, r, q, S0, chf_xt, sigma=sigma, jump_rate=jump_rate, exp_pos=exp_pos, exp_neg=exp_neg, prob_pos=prob_pos)
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, diffusion_with_cpp_double_exponential_exponent, sigma, jump_rate,
+                                       exp_pos, exp_neg, prob_pos))
 
 
 def poisson_log_st_chf(u, t, r, q, S0, jump_rate):
-    chf_xt = poisson_chf
-    return general_ln_st_chf(u, t, r, q, S0, chf_xt, jump_rate=jump_rate)
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, poisson_exponent, jump_rate))
 
 
 def vg_log_st_chf(u, t, r, q, S0, theta, v, sigma):
-    chf_xt = vg_chf
-    return general_ln_st_chf(u, t, r, q, S0, chf_xt, theta=theta, v=v, sigma=sigma)
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, vg_exponent, theta, v, sigma))
 
 
 def nig_log_st_chf(u, t, r, q, S0, a, b, delta):
-    chf_xt = nig_chf
-    return general_ln_st_chf(u, t, r, q, S0, chf_xt, a=a, b=b, delta=delta)
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, nig_exponent, a, b, delta))
 
 
-def heston_log_st_chf(u, t, r, q, S0, V0, theta, k, sigma, rho):
-    dt = np.sqrt((sigma ** 2) * (1j * u + u ** 2) + (k - 1j * rho * sigma * u) ** 2)
+def heston_log_st_exponent(u, t, r, q, S0, V0, theta, k, sigma, rho):
+    dt = csqrt((sigma ** 2) * (1j * u + u ** 2) + (k - 1j * rho * sigma * u) ** 2)
     beta = k - 1j * u * rho * sigma
     g = (beta - dt) / (beta + dt)
-    D_t = (beta - dt) / (sigma ** 2) * ((1 - np.exp(-dt * t)) / (1 - g * np.exp(-dt * t)))
+    exp_dt = cexp(-dt * t)
+    D_t = (beta - dt) / (sigma ** 2) * ((1 - exp_dt) / (1 - g * exp_dt))
     C_t = 1j * u * (r - q) * t + k * theta / (sigma ** 2) * (
-        (beta - dt) * t - 2 * np.log((1 - g * np.exp(-dt * t)) / (1 - g)))
-    return np.exp(C_t + D_t * V0 + 1j * u * np.log(S0))
+        (beta - dt) * t - 2 * clog((1 - g * exp_dt) / (1 - g)))
+    return C_t + D_t * V0 + 1j * u * np.log(S0)
+
+
+def heston_log_st_chf(u, t, r, q, S0, V0, theta, k, sigma, rho):
+    return cexp(heston_log_st_exponent(u, t, r, q, S0, V0, theta, k, sigma, rho))
 
 
 def cgmy_log_st_chf(u, t, r, q, S0, c, g, m, y):
-    chf_xt = cgmy_chf
-    return general_ln_st_chf(u, t, r, q, S0, chf_xt, c=c, g=g, m=m, y=y)
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, cgmy_exponent, c, g, m, y))
+
+
+def martingale_correction(t, exponent_xt, *args):
+    """
+    :return: -log E[exp(X_t)], the drift that makes S0 exp((r - q) t + X_t) a martingale after discounting
+    """
+    return -np.real(exponent_xt(-1j, t, *args))
+
+
+def general_ln_st_exponent(u, t, r, q, S0, exponent_xt, *args, correction=None):
+    """
+    log chf of ln(S_T) = ln(S0) + (r - q) t + correction + X_t, to be exponentiated once by the caller
+    :param exponent_xt: log chf of the Levy process X_t, called as exponent_xt(u, t, *args)
+    :param correction: martingale_correction(t, exponent_xt, *args), computed here when None
+    """
+    if correction is None:
+        correction = martingale_correction(t, exponent_xt, *args)
+    # the drift is real, kept in the precision of u
+    drift = (np.log(S0) + (r - q) * t + correction).astype(np.result_type(np.asarray(u).real, np.float32), copy=False)
+    res = exponent_xt(u, t, *args)
+    res = res + 1j * drift * u
+    return res
 
 
 def general_ln_st_chf(u, t, r, q, S0, chf_xt, *args, **kwargs):
-    martingale_adjust = -(1 / t) * np.log(chf_xt(-1j, t, *args, **kwargs))
-    normal_term = 1j * (np.log(S0) + (r - q + martingale_adjust) * t) * u
-    ln_st_chf = np.exp(normal_term) * chf_xt(u, t, *args, **kwargs)
-    return ln_st_chf
+    """
+    chf of ln(S_T) from the chf of X_t, see general_ln_st_exponent
+    """
+    def exponent_xt(u, t, *args):
+        return clog(chf_xt(u, t, *args, **kwargs))
+
+    return cexp(general_ln_st_exponent(u, t, r, q, S0, exponent_xt, *args))
 
 
 def vasicek_int_rt_chf(u, t, k, theta, sigma, r0):
     mean_int_rt = theta * t + (r0 - theta) * (1 - np.exp(-k * t)) / k
     var_int_rt = (sigma ** 2 / (2 * k ** 3)) * ((1 - np.exp(-k * t)) ** 2) + (sigma ** 2 / (k ** 2)) * (
         t - (1 - np.exp(-k * t)) / k)
-    return np.exp(1j * mean_int_rt * u - 0.5 * var_int_rt * (u ** 2))
+    return cexp(1j * mean_int_rt * u - 0.5 * var_int_rt * (u ** 2))
 
 
 def cir_int_rt_chf(u, t, k, theta, sigma, r0):
@@ -69,15 +162,15 @@ def cir_int_rt_chf(u, t, k, theta, sigma, r0):
     a_t_v = np.exp(t * theta * (k ** 2) / (sigma ** 2)) / (cosh_fun + (k / r) * sinh_fun) ** (
         2 * k * theta / (sigma ** 2))
     b_t_v = 2 * 1j * u / (k + r * coth_fun)
-    return a_t_v * np.exp(b_t_v * r0)
+    return a_t_v * cexp(b_t_v * r0)
 
 
 def general_log_moneyness_chf(u, strike, chf, *args, **kwargs):
-    return np.exp(-1j * u * np.log(strike)) * chf(u, *args, **kwargs)
+    return cexp(-1j * u * np.log(strike)) * chf(u, *args, **kwargs)
 
 
 def norm_chf(u, norm_mean, norm_sig):
-    return np.exp(1j * norm_mean * u - 0.5 * (u ** 2) * (norm_sig ** 2))
+    return cexp(1j * norm_mean * u - 0.5 * (u ** 2) * (norm_sig ** 2))
 
 
 def double_exponential_chf(u, exp_pos, exp_neg, prob_pos):
@@ -85,30 +178,50 @@ def double_exponential_chf(u, exp_pos, exp_neg, prob_pos):
         (u + 1j * exp_pos) * (u - 1j * exp_neg))
 
 
+def poisson_exponent(u, t, jump_rate):
+    return t * jump_rate * (cexp(1j * u) - 1)
+
+
 def poisson_chf(u, t, jump_rate):
-    return np.exp(t * jump_rate * (np.exp(1j * u) - 1))
+    return cexp(poisson_exponent(u, t, jump_rate))
+
+
+def diffusion_exponent(u, t, sigma):
+    return - 0.5 * t * (u ** 2) * (sigma ** 2)
 
 
 def diffusion_chf(u, t, sigma):
-    return np.exp(- 0.5 * t * (u ** 2) * (sigma ** 2))
+    return cexp(diffusion_exponent(u, t, sigma))
 
 
 def vg_cgm_chf(u, t, c, g, m):
-    return ((g * m) / (g * m + (m - g) * u * 1j + u ** 2)) ** (c * t)
+    return cpow((g * m) / (g * m + (m - g) * u * 1j + u ** 2), c * t)
+
+
+def vg_exponent(u, t, theta, v, sigma):
+    return -t / v * clog(1 - 1j * u * theta * v + 0.5 * (sigma ** 2) * (u ** 2) * v)
 
 
 def vg_chf(u, t, theta, v, sigma):
-    return (1 - 1j * u * theta * v + 0.5 * (sigma ** 2) * (u ** 2) * v) ** (-t / v)
+    return cpow(1 - 1j * u * theta * v + 0.5 * (sigma ** 2) * (u ** 2) * v, -t / v)
+
+
+def cgmy_exponent(u, t, c, g, m, y):
+    return c * t * special.gamma(-y) * (cpow(m - 1j * u, y) - m ** y + cpow(g + 1j * u, y) - g ** y)
 
 
 def cgmy_chf(u, t, c, g, m, y):
-    return np.exp(c * t * gamma(-y) * ((m - 1j * u) ** y - m ** y + (g + 1j * u) ** y - g ** y))
+    return cexp(cgmy_exponent(u, t, c, g, m, y))
+
+
+def nig_exponent(u, t, a, b, delta):
+    sqa = csqrt(a ** 2 - (b + 1j * u) ** 2)
+    sqb = (a ** 2 - b ** 2) ** 0.5
+    return -delta * t * (sqa - sqb)
 
 
 def nig_chf(u, t, a, b, delta):
-    sqa = np.sqrt(a ** 2 - (b + 1j * u) ** 2)
-    sqb = np.sqrt(a ** 2 - b ** 2)
-    return np.exp(-delta * t * (sqa - sqb))
+    return cexp(nig_exponent(u, t, a, b, delta))
 
 
 def parameter_to_cgm(theta, v, sigma):
@@ -120,17 +233,34 @@ def parameter_to_cgm(theta, v, sigma):
     return c, g, m
 
 
+def cpp_normal_exponent(u, t, jump_rate, norm_m, norm_sig):
+    return t * jump_rate * (norm_chf(u, norm_m, norm_sig) - 1)
+
+
 def cpp_normal_chf(u, t, jump_rate, norm_m, norm_sig):
-    return np.exp(t * jump_rate * (norm_chf(u, norm_m, norm_sig) - 1))
+    return cexp(cpp_normal_exponent(u, t, jump_rate, norm_m, norm_sig))
+
+
+def cpp_double_exponential_exponent(u, t, jump_rate, exp_pos, exp_neg, prob_pos):
+    return t * jump_rate * (double_exponential_chf(u, exp_pos, exp_neg, prob_pos) - 1)
 
 
 def cpp_double_exponential_chf(u, t, jump_rate, exp_pos, exp_neg, prob_pos):
-    return np.exp(t * jump_rate * (double_exponential_chf(u, exp_pos, exp_neg, prob_pos) - 1))
+    return cexp(cpp_double_exponential_exponent(u, t, jump_rate, exp_pos, exp_neg, prob_pos))
+
+
+def diffusion_with_cpp_normal_exponent(u, t, sigma, jump_rate, norm_m, norm_sig):
+    return diffusion_exponent(u, t, sigma) + cpp_normal_exponent(u, t, jump_rate, norm_m, norm_sig)
 
 
 def diffusion_with_cpp_normal_chf(u, t, sigma, jump_rate, norm_m, norm_sig):
-    return diffusion_chf(u, t, sigma) * cpp_normal_chf(u, t, jump_rate, norm_m, norm_sig)
+    return cexp(diffusion_with_cpp_normal_exponent(u, t, sigma, jump_rate, norm_m, norm_sig))
+
+
+def diffusion_with_cpp_double_exponential_exponent(u, t, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
+    return diffusion_exponent(u, t, sigma) + cpp_double_exponential_exponent(u, t, jump_rate, exp_pos, exp_neg,
+                                                                             prob_pos)
 
 
 def diffusion_with_cpp_double_exponential_chf(u, t, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
-    return diffusion_chf(u, t, sigma) * cpp_double_exponential_chf(u, t, jump_rate, exp_pos, exp_neg, prob_pos)
+    return cexp(diffusion_with_cpp_double_exponential_exponent(u, t, sigma, jump_rate, exp_pos, exp_neg, prob_pos))
@@ -0,0 +1,123 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from fftoptionlib.helper import read_only
+
+
+class ChfCache(object):
+    """
+    LRU cache of characteristic function evaluations, bounded in bytes and safe to share between threads.
+    Entries are read-only arrays; an evaluation larger than max_bytes is returned without being kept.
+    """
+
+    def __init__(self, max_bytes=2 ** 27):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, u):
+        """
+        :param u: the grid, entries keyed on the identity of a read-only grid hold it and must match it
+        :return: cached array or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] is not u):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, u, value):
+        """
+        :return: value, read-only, or the entry of a thread that stored the same key first
+        """
+        value = read_only(value)[0]
+        if value.nbytes > self.max_bytes:
+            return value
+        grid_ref = u if isinstance(key[1], tuple) and key[1][0] == 'id' else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] is u):
+                return entry[1]
+            if entry is not None:
+                self.nbytes -= entry[1].nbytes
+            self._entries[key] = (grid_ref, value)
+            self._entries.move_to_end(key)
+            self.nbytes += value.nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, entries=len(self._entries),
+                        nbytes=self.nbytes, max_bytes=self.max_bytes)
+
+
+def array_key(x):
+    x = np.asarray(x)
+    if x.ndim == 0:
+        return x.dtype.str, x.item()
+    digest = hashlib.blake2b(np.ascontiguousarray(x).tobytes(), digest_size=16).digest()
+    return x.dtype.str, x.shape, digest
+
+
+def grid_key(u):
+    """
+    Read-only grids, e.g. the u grids of the grid plans, are keyed on their identity, other grids on their bytes.
+    """
+    if isinstance(u, np.ndarray) and not u.flags.writeable:
+        return 'id', id(u), u.dtype.str, u.shape
+    return array_key(u)
+
+
+def chf_key(u, t, r, q, S0, chf_ln_st):
+    return ((type(chf_ln_st), tuple(array_key(item) for item in chf_ln_st.get_parameters())), grid_key(u),
+            array_key(t), array_key(r), array_key(q), array_key(S0))
+
+
+_chf_cache = None
+
+
+def set_chf_cache(cache):
+    """
+    Cache the chf evaluations of every engine, e.g. set_chf_cache(2 ** 28) for 256 MB.
+    :param cache: None to switch caching off, a ChfCache or its max_bytes
+    """
+    global _chf_cache
+    _chf_cache = ChfCache(cache) if isinstance(cache, (int, float)) else cache
+    return _chf_cache
+
+
+def get_chf_cache():
+    return _chf_cache
+
+
+def cached_chf(u, t, r, q, S0, chf_ln_st):
+    """
+    chf of ln(S_T) on u, through the cache set by set_chf_cache if any
+    """
+    cache = _chf_cache
+    if cache is None:
+        return chf_ln_st.chf(u, t, r, q, S0)
+    key = chf_key(u, t, r, q, S0, chf_ln_st)
+    res = cache.get(key, u)
+    if res is None:
+        res = cache.put(key, u, np.asarray(chf_ln_st.chf(u, t, r, q, S0)))
+    return res
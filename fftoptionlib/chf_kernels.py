@@ -0,0 +1,166 @@
+"""
+Numba kernels of the ln(S_T) characteristic functions in characteristic_funs: one fused loop over u without
+intermediate arrays, with the martingale adjustment evaluated once per maturity. Selected through
+characteristic_funs.kernel_chf when numba is installed.
+"""
+import cmath
+import math
+
+import numba
+import numpy as np
+
+from fftoptionlib import characteristic_funs
+
+
+@numba.njit(cache=True)
+def diffusion_exponent(u, t, sigma):
+    return -0.5 * t * u * u * sigma ** 2
+
+
+@numba.njit(cache=True)
+def black_scholes_exponent(u, t, params):
+    return diffusion_exponent(u, t, params[0])
+
+
+@numba.njit(cache=True)
+def merton_jump_exponent(u, t, params):
+    sigma, jump_rate, norm_m, norm_sig = params
+    norm_chf = cmath.exp(1j * norm_m * u - 0.5 * u * u * norm_sig ** 2)
+    return diffusion_exponent(u, t, sigma) + t * jump_rate * (norm_chf - 1)
+
+
+@numba.njit(cache=True)
+def kou_jump_exponent(u, t, params):
+    sigma, jump_rate, exp_pos, exp_neg, prob_pos = params
+    double_exponential_chf = (1j * (prob_pos * u * exp_pos - u * exp_neg + prob_pos * u * exp_neg) + exp_pos * exp_neg) / (
+        (u + 1j * exp_pos) * (u - 1j * exp_neg))
+    return diffusion_exponent(u, t, sigma) + t * jump_rate * (double_exponential_chf - 1)
+
+
+@numba.njit(cache=True)
+def poisson_exponent(u, t, params):
+    return t * params[0] * (cmath.exp(1j * u) - 1)
+
+
+@numba.njit(cache=True)
+def vg_exponent(u, t, params):
+    theta, v, sigma = params
+    return -t / v * cmath.log(1 - 1j * u * theta * v + 0.5 * sigma ** 2 * u * u * v)
+
+
+def nig_prepare(a, b, delta):
+    return a ** 2, b, delta, math.sqrt(a ** 2 - b ** 2)
+
+
+@numba.njit(cache=True)
+def nig_exponent(u, t, params):
+    a_square, b, delta, sqb = params
+    return -delta * t * (cmath.sqrt(a_square - (b + 1j * u) ** 2) - sqb)
+
+
+def cgmy_prepare(c, g, m, y):
+    return c * math.gamma(-y), g, m, y, m ** y + g ** y
+
+
+@numba.njit(cache=True)
+def cgmy_exponent(u, t, params):
+    c_gamma, g, m, y, power_sum = params
+    return c_gamma * t * (cmath.exp(y * cmath.log(m - 1j * u)) + cmath.exp(y * cmath.log(g + 1j * u)) - power_sum)
+
+
+@numba.njit(cache=True)
+def levy_log_st_kernel(exponent, u, t, r, q, S0, params, out):
+    """
+    :param exponent: log of the chf of X_t, ln(S_T) = ln(S0) + (r - q + martingale adjustment) * t + X_t
+    :param u: (n,) float64 or complex128, t, r, q: (m,), out: (m, n)
+    """
+    for i in range(t.shape[0]):
+        martingale_adjust = -exponent(-1j, t[i], params).real / t[i]
+        drift = math.log(S0) + (r[i] - q[i] + martingale_adjust) * t[i]
+        for j in range(u.shape[0]):
+            out[i, j] = cmath.exp(1j * drift * u[j] + exponent(u[j], t[i], params))
+
+
+@numba.njit(cache=True)
+def heston_log_st_kernel(u, t, r, q, S0, params, out):
+    V0, theta, k, sigma, rho = params
+    for i in range(t.shape[0]):
+        for j in range(u.shape[0]):
+            iu = 1j * u[j]
+            dt = cmath.sqrt(sigma ** 2 * (iu + u[j] ** 2) + (k - rho * sigma * iu) ** 2)
+            beta = k - iu * rho * sigma
+            g = (beta - dt) / (beta + dt)
+            exp_dt = cmath.exp(-dt * t[i])
+            D_t = (beta - dt) / sigma ** 2 * ((1 - exp_dt) / (1 - g * exp_dt))
+            C_t = iu * (r[i] - q[i]) * t[i] + k * theta / sigma ** 2 * (
+                (beta - dt) * t[i] - 2 * cmath.log((1 - g * exp_dt) / (1 - g)))
+            out[i, j] = cmath.exp(C_t + D_t * V0 + iu * math.log(S0))
+
+
+def kernel_arguments(u, t, r, q, S0, params, prepare=None):
+    """
+    Kernels take u as a vector and t, r, q as rows of the output, e.g. maturity columns of a price surface.
+    :param prepare: maps the model parameters to the kernel ones, for constants computed once per call
+    :return: kernel arguments and the output shape, None for other shapes and for single precision
+    """
+    u = np.asarray(u)
+    if u.ndim > 1 or u.dtype in (np.float32, np.complex64) or np.ndim(S0) > 0 or any(np.ndim(p) for p in params):
+        return None
+    row_shape = np.broadcast_shapes(np.shape(t), np.shape(r), np.shape(q))
+    if u.ndim == 1 and row_shape != () and (len(row_shape) != 2 or row_shape[1] != 1):
+        return None
+    if u.ndim == 0 and len(row_shape) > 1:
+        return None
+    out_shape = row_shape[:-1] + u.shape if u.ndim == 1 and row_shape else row_shape + u.shape
+    rows = [np.ascontiguousarray(np.broadcast_to(np.asarray(item, dtype=float), row_shape).reshape(-1))
+            for item in (t, r, q)]
+    params = tuple(float(p) for p in params)
+    if prepare is not None:
+        params = tuple(float(p) for p in prepare(*params))
+    u = u.reshape(-1).astype(np.complex128 if np.iscomplexobj(u) else float, copy=False)
+    return (u,) + tuple(rows) + (float(S0), params), out_shape
+
+
+def levy_log_st_chf(exponent, numpy_chf, prepare=None):
+    def log_st_chf(u, t, r, q, S0, *params):
+        arguments = kernel_arguments(u, t, r, q, S0, params, prepare)
+        if arguments is None:
+            return numpy_chf(u, t, r, q, S0, *params)
+        (u, t, r, q, S0, params), out_shape = arguments
+        out = np.empty((t.shape[0], u.shape[0]), dtype=np.complex128)
+        levy_log_st_kernel(exponent, u, t, r, q, S0, params, out)
+        return out.reshape(out_shape)
+
+    return log_st_chf
+
+
+def heston_log_st_chf(numpy_chf):
+    def log_st_chf(u, t, r, q, S0, *params):
+        arguments = kernel_arguments(u, t, r, q, S0, params)
+        if arguments is None:
+            return numpy_chf(u, t, r, q, S0, *params)
+        (u, t, r, q, S0, params), out_shape = arguments
+        out = np.empty((t.shape[0], u.shape[0]), dtype=np.complex128)
+        heston_log_st_kernel(u, t, r, q, S0, params, out)
+        return out.reshape(out_shape)
+
+    return log_st_chf
+
+
+def make_kernel_chfs():
+    """
+    :return: kernel version of every built-in ln(S_T) chf, keyed by the numpy one
+    """
+    levy_exponents = {
+        characteristic_funs.black_schole_log_st_chf: (black_scholes_exponent, None),
+        characteristic_funs.merton_jump_log_st_chf: (merton_jump_exponent, None),
+        characteristic_funs.kou_jump_log_st_chf: (kou_jump_exponent, None),
+        characteristic_funs.poisson_log_st_chf: (poisson_exponent, None),
+        characteristic_funs.vg_log_st_chf: (vg_exponent, None),
+        characteristic_funs.nig_log_st_chf: (nig_exponent, nig_prepare),
+        characteristic_funs.cgmy_log_st_chf: (cgmy_exponent, cgmy_prepare),
+    }
+    res = {numpy_chf: levy_log_st_chf(exponent, numpy_chf, prepare)
+           for numpy_chf, (exponent, prepare) in levy_exponents.items()}
+    res[characteristic_funs.heston_log_st_chf] = heston_log_st_chf(characteristic_funs.heston_log_st_chf)
+    return res
@@ -1,6 +1,7 @@
 import numpy as np
 
 from fftoptionlib.characteristic_funs import general_log_moneyness_chf
+from fftoptionlib.fft_backend import get_fft_backend
 
 
 def chi(n, a, b, c, d):
@@ -16,10 +17,9 @@ def phi(n, a, b, c, d):
     dm = (d - a) * x
     cm = (c - a) * x
     if isinstance(n, np.ndarray):
-        res = np.ones_like(n) * (d - c)
         nonzero_bool = n != 0
-        res[nonzero_bool] = (np.sin(dm[nonzero_bool]) - np.sin(cm[nonzero_bool])) / x[nonzero_bool]
-        return res
+        safe_x = np.where(nonzero_bool, x, 1.)
+        return np.where(nonzero_bool, (np.sin(dm) - np.sin(cm)) / safe_x, d - c)
     else:
         if n == 0:
             return d - c
@@ -49,9 +49,183 @@ def cosin_vanilla_call(N, strike, intv_a, intv_b, t, r, q, S0, chf_ln_st):
     return res
 
 
+def cosin_xi(N, intv_a, intv_b):
+    return np.arange(N) * np.pi / (intv_b - intv_a)
+
+
+def cosin_coefficients(intv_a, intv_b, call_chf, k_start=0):
+    """
+    :param call_chf: discounted chf of ln(S_T) on the terms k_start, k_start + 1, ... of cosin_xi
+    :return: terms and their series coefficients, the first one halved
+    """
+    k_arr = np.arange(k_start, k_start + call_chf.shape[-1])
+    xi = k_arr * np.pi / (intv_b - intv_a)
+    a_arr = 2. * (call_chf * np.exp(-xi * intv_a * 1j)).real / (intv_b - intv_a)
+    if k_start == 0:
+        a_arr[..., 0] = a_arr[..., 0] / 2
+    return k_arr, a_arr
+
+
+def cosin_call_transform(strike, intv_a, intv_b, call_chf):
+    """
+    :param call_chf: discounted chf of ln(S_T) on cosin_xi, transformed along the last axis
+    :return: call prices, (..., strikes)
+    """
+    strike = np.atleast_1d(np.asarray(strike, dtype=float))
+    ln_strike = np.log(strike)[:, np.newaxis]
+    k_arr, a_arr = cosin_coefficients(intv_a, intv_b, call_chf)
+    v_mat = v_call(strike[:, np.newaxis], k_arr, intv_a - ln_strike, intv_b - ln_strike)
+    return (intv_b - intv_a) / 2 * a_arr.dot(v_mat.T)
+
+
+def cosin_put_transform(strike, intv_a, intv_b, put_chf):
+    """
+    Put counterpart of cosin_call_transform, (..., strikes).
+    """
+    strike = np.atleast_1d(np.asarray(strike, dtype=float))
+    ln_strike = np.log(strike)[:, np.newaxis]
+    k_arr, a_arr = cosin_coefficients(intv_a, intv_b, put_chf)
+    v_mat = v_put(strike[:, np.newaxis], k_arr, intv_a - ln_strike, intv_b - ln_strike)
+    return (intv_b - intv_a) / 2 * a_arr.dot(v_mat.T)
+
+
+def cosin_put_terms(strike, intv_a, intv_b, put_chf, k_start=0):
+    """
+    Put counterpart of cosin_call_transform for a one dimensional put_chf, without summing the series. The put
+    payoff is bounded by the strike, so wide truncation ranges stay accurate, unlike the call payoff.
+    :return: contribution of every term to the put prices, (strikes, terms)
+    """
+    strike = np.atleast_1d(np.asarray(strike, dtype=float))
+    ln_strike = np.log(strike)[:, np.newaxis]
+    k_arr, a_arr = cosin_coefficients(intv_a, intv_b, put_chf, k_start)
+    v_mat = v_put(strike[:, np.newaxis], k_arr, intv_a - ln_strike, intv_b - ln_strike)
+    return (intv_b - intv_a) / 2 * a_arr * v_mat
+
+
+def truncation_half_width(c2, c4, tol, scale):
+    """
+    Half width h of [c1 - h, c1 + h] with scale * P(|ln(S_T) - c1| >= h) <= tol, from Markov's inequality on the
+    fourth central moment c4 + 3 * c2 ** 2 (Junike and Pankrashkin, 2022).
+    :param scale: bound of the payoff, the largest strike for puts
+    """
+    return (scale * (np.abs(c4) + 3 * c2 ** 2) / tol) ** 0.25
+
+
 def interval_a_and_b(c1, c2, c4, L):
     c2 = np.abs(c2)
     c4 = np.abs(c4)
     a = c1 - L * np.sqrt(c2 + np.sqrt(c4))
     b = c1 + L * np.sqrt(c2 + np.sqrt(c4))
     return a, b
+
+
+def continuation_value(x, intv_a, intv_b, weighted_arr, discount):
+    """
+    Continuation value at x = log(S / K) of the COS backward induction and its derivative.
+    :param weighted_arr: chf of the log-price increment times the series coefficients of the next value, first
+    term halved
+    """
+    xi = cosin_xi(weighted_arr.shape[0], intv_a, intv_b)
+    terms = weighted_arr * np.exp(1j * xi * (x - intv_a))
+    return discount * terms.real.sum(), discount * (1j * xi * terms).real.sum()
+
+
+def continuation_coefficients(intv_a, intv_b, x1, x2, weighted_arr, discount, fft_backend=None):
+    """
+    Series coefficients of the continuation value on [x1, x2]. The matrix of the integrals is a Hankel plus a
+    Toeplitz matrix, both applied by FFT convolutions of length 2N (Fang and Oosterlee, 2009).
+    """
+    fft_backend = get_fft_backend(fft_backend)
+    N = weighted_arr.shape[0]
+    omega = np.pi / (intv_b - intv_a)
+    l_arr = np.arange(1, 2 * N)
+    inv_l = 1. / l_arr
+    exp_1 = np.exp(1j * l_arr * omega * (x1 - intv_a))
+    exp_2 = np.exp(1j * l_arr * omega * (x2 - intv_a))
+    m_zero = 1j * omega * (x2 - x1)
+    # Hankel part, m_{j + k} for j + k in 0 .. 2N - 1
+    m_hankel = np.empty(2 * N, dtype=complex)
+    m_hankel[0] = m_zero
+    m_hankel[1:] = (exp_2 - exp_1) * inv_l
+    m_hankel[2 * N - 1] = 0
+    reversed_arr = np.zeros(2 * N, dtype=complex)
+    reversed_arr[:N] = weighted_arr[::-1]
+    hankel = fft_backend.ifft(fft_backend.fft(m_hankel) * fft_backend.fft(reversed_arr))[N - 1:2 * N - 1]
+    # Toeplitz part, m_{j - k}, laid out for a circular convolution
+    m_toeplitz = np.empty(2 * N, dtype=complex)
+    m_toeplitz[0] = m_zero
+    m_toeplitz[1:N] = (np.conj(exp_2[:N - 1]) - np.conj(exp_1[:N - 1])) * -inv_l[:N - 1]
+    m_toeplitz[N] = 0
+    m_toeplitz[N + 1:] = ((exp_2[:N - 1] - exp_1[:N - 1]) * inv_l[:N - 1])[::-1]
+    padded_arr = np.zeros(2 * N, dtype=complex)
+    padded_arr[:N] = weighted_arr
+    toeplitz = fft_backend.ifft(fft_backend.fft(m_toeplitz) * fft_backend.fft(padded_arr))[:N]
+    return discount / np.pi * (hankel + toeplitz).imag
+
+
+def put_payoff_coefficients(N, intv_a, intv_b, x1, x2):
+    """
+    Series coefficients of the unit strike put payoff 1 - exp(x) on [x1, x2].
+    """
+    k_arr = np.arange(N)
+    return 2 / (intv_b - intv_a) * (phi(k_arr, intv_a, intv_b, x1, x2) - chi(k_arr, intv_a, intv_b, x1, x2))
+
+
+def exercise_point(value_gap, lo, hi, x, tol=1e-10, max_iter=100):
+    """
+    Root of the continuation value minus the payoff in [lo, hi], by Newton steps kept inside the bracket.
+    :param value_gap: function of x returning the gap and its derivative
+    """
+    gap_lo = value_gap(lo)[0]
+    for _ in range(max_iter):
+        gap, d_gap = value_gap(x)
+        if abs(gap) < tol or hi - lo < tol:
+            break
+        if (gap < 0) == (gap_lo < 0):
+            lo = x
+        else:
+            hi = x
+        step = x - gap / d_gap if d_gap != 0 else np.nan
+        x = step if lo < step < hi else 0.5 * (lo + hi)
+    return x
+
+
+def cosin_bermudan_put(x0, intv_a, intv_b, dt, r, increment_chf, exercise_dates, fft_backend=None):
+    """
+    Bermudan put with unit strike, exercisable at exercise_dates dates dt apart, the last one at expiry.
+    Processes with independent increments only: the chf of log(S_{t + dt} / S_t) is the same at every date.
+    :param x0: log(S0 / K), the price of strike K is K times the result
+    :param increment_chf: chf of log(S_{t + dt} / S_t) on cosin_xi
+    """
+    N = increment_chf.shape[0]
+    discount = np.exp(-r * dt)
+    value_arr = put_payoff_coefficients(N, intv_a, intv_b, intv_a, 0.)
+    boundary = 0.
+    for _ in range(exercise_dates - 1):
+        weighted_arr = increment_chf * value_arr
+        weighted_arr[0] = weighted_arr[0] / 2
+
+        def value_gap(x):
+            value, d_value = continuation_value(x, intv_a, intv_b, weighted_arr, discount)
+            return value - (1 - np.exp(x)), d_value + np.exp(x)
+
+        # early exercise below the boundary, if at all
+        if value_gap(intv_a)[0] >= 0:
+            boundary = intv_a
+        else:
+            boundary = exercise_point(value_gap, intv_a, 0., boundary)
+        value_arr = (put_payoff_coefficients(N, intv_a, intv_b, intv_a, boundary) +
+                     continuation_coefficients(intv_a, intv_b, boundary, intv_b, weighted_arr, discount, fft_backend))
+    weighted_arr = increment_chf * value_arr
+    weighted_arr[0] = weighted_arr[0] / 2
+    arg = np.outer(np.atleast_1d(x0) - intv_a, cosin_xi(N, intv_a, intv_b))
+    return discount * (np.exp(1j * arg) * weighted_arr).real.sum(axis=1)
+
+
+def richardson_american(bermudan_price, depth):
+    """
+    American price from Bermudan prices with 2 ** d, ..., 2 ** (d + 3) exercise dates, by repeated Richardson
+    extrapolation (Fang and Oosterlee, 2009).
+    """
+    prices = [bermudan_price(2 ** (depth + i)) for i in range(4)]
+    return (64 * prices[3] - 56 * prices[2] + 14 * prices[1] - prices[0]) / 21
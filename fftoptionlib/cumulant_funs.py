@@ -0,0 +1,94 @@
+import numpy as np
+
+from fftoptionlib.characteristic_funs import heston_log_st_chf
+from fftoptionlib.helper import LazyModule
+
+special = LazyModule('scipy.special')
+
+
+def black_scholes_cumulants(t, r, q, sigma):
+    cgf_one = 0.5 * (sigma ** 2) * t
+    return general_cumulants(t, r, q, cgf_one, 0., (sigma ** 2) * t, 0.)
+
+
+def merton_jump_cumulants(t, r, q, sigma, jump_rate, norm_m, norm_sig):
+    cgf_one = 0.5 * (sigma ** 2) * t + t * jump_rate * (np.exp(norm_m + 0.5 * norm_sig ** 2) - 1)
+    k1 = t * jump_rate * norm_m
+    k2 = (sigma ** 2) * t + t * jump_rate * (norm_m ** 2 + norm_sig ** 2)
+    k4 = t * jump_rate * (norm_m ** 4 + 6 * (norm_m ** 2) * (norm_sig ** 2) + 3 * norm_sig ** 4)
+    return general_cumulants(t, r, q, cgf_one, k1, k2, k4)
+
+
+def kou_jump_cumulants(t, r, q, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
+    prob_neg = 1 - prob_pos
+    jump_mgf_one = prob_pos * exp_pos / (exp_pos - 1) + prob_neg * exp_neg / (exp_neg + 1)
+    cgf_one = 0.5 * (sigma ** 2) * t + t * jump_rate * (jump_mgf_one - 1)
+    k1 = t * jump_rate * (prob_pos / exp_pos - prob_neg / exp_neg)
+    k2 = (sigma ** 2) * t + 2 * t * jump_rate * (prob_pos / exp_pos ** 2 + prob_neg / exp_neg ** 2)
+    k4 = 24 * t * jump_rate * (prob_pos / exp_pos ** 4 + prob_neg / exp_neg ** 4)
+    return general_cumulants(t, r, q, cgf_one, k1, k2, k4)
+
+
+def poisson_cumulants(t, r, q, jump_rate):
+    cgf_one = t * jump_rate * (np.e - 1)
+    k = t * jump_rate
+    return general_cumulants(t, r, q, cgf_one, k, k, k)
+
+
+def vg_cumulants(t, r, q, theta, v, sigma):
+    cgf_one = -(t / v) * np.log(1 - theta * v - 0.5 * (sigma ** 2) * v)
+    k1 = theta * t
+    k2 = (sigma ** 2 + v * theta ** 2) * t
+    k4 = 3 * ((sigma ** 4) * v + 2 * (theta ** 4) * (v ** 3) + 4 * (sigma ** 2) * (theta ** 2) * (v ** 2)) * t
+    return general_cumulants(t, r, q, cgf_one, k1, k2, k4)
+
+
+def nig_cumulants(t, r, q, a, b, delta):
+    sqb = np.sqrt(a ** 2 - b ** 2)
+    cgf_one = -delta * t * (np.sqrt(a ** 2 - (b + 1) ** 2) - sqb)
+    k1 = delta * t * b / sqb
+    k2 = delta * t * (a ** 2) / sqb ** 3
+    k4 = 3 * delta * t * (a ** 2) * (a ** 2 + 4 * b ** 2) / sqb ** 7
+    return general_cumulants(t, r, q, cgf_one, k1, k2, k4)
+
+
+def cgmy_cumulants(t, r, q, c, g, m, y):
+    cgf_one = c * t * special.gamma(-y) * ((m - 1) ** y - m ** y + (g + 1) ** y - g ** y)
+    k1 = c * t * special.gamma(1 - y) * (m ** (y - 1) - g ** (y - 1))
+    k2 = c * t * special.gamma(2 - y) * (m ** (y - 2) + g ** (y - 2))
+    k4 = c * t * special.gamma(4 - y) * (m ** (y - 4) + g ** (y - 4))
+    return general_cumulants(t, r, q, cgf_one, k1, k2, k4)
+
+
+def heston_cumulants(t, r, q, V0, theta, k, sigma, rho):
+    exp_kt = np.exp(-k * t)
+    c1 = (r - q) * t + (1 - exp_kt) * (theta - V0) / (2 * k) - 0.5 * theta * t
+    c2 = 1 / (8 * k ** 3) * (
+        sigma * t * k * exp_kt * (V0 - theta) * (8 * k * rho - 4 * sigma)
+        + k * rho * sigma * (1 - exp_kt) * (16 * theta - 8 * V0)
+        + 2 * theta * k * t * (-4 * k * rho * sigma + sigma ** 2 + 4 * k ** 2)
+        + (sigma ** 2) * ((theta - 2 * V0) * exp_kt ** 2 + theta * (4 * exp_kt - 5) + 2 * V0)
+        + 8 * (k ** 2) * (V0 - theta) * (1 - exp_kt))
+    # the fourth cumulant has no compact closed form, read it off the closed-form cgf instead
+    _, _, _, c4 = cumulants_from_cgf_contour(
+        lambda z: np.log(heston_log_st_chf(-1j * z, t, r, q, 1.0, V0, theta, k, sigma, rho)))
+    return c1, c2, c4
+
+
+def general_cumulants(t, r, q, cgf_one, k1, k2, k4):
+    """
+    :param cgf_one: cumulant generating function of the driving process at 1, i.e. the martingale correction
+    :param k1, k2, k4: cumulants of the driving process
+    :return: c1, c2, c4 of ln(S_T / S0)
+    """
+    return (r - q) * t - cgf_one + k1, k2, k4
+
+
+def cumulants_from_cgf_contour(cgf, radius=0.25, n_points=32):
+    """
+    Taylor coefficients of an analytic cgf by the trapezoidal rule on a circle around 0 (Cauchy's formula).
+    :return: first four cumulants
+    """
+    z_arr = radius * np.exp(2j * np.pi * np.arange(n_points) / n_points)
+    taylor_coef = np.fft.fft(cgf(z_arr)) / n_points
+    return tuple((taylor_coef[n] * special.gamma(n + 1) / radius ** n).real for n in range(1, 5))
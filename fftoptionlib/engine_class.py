@@ -1,77 +1,691 @@
+import warnings
+from functools import partial
+
 import numpy as np
 
+from fftoptionlib.barrier_pricer import BarrierGridPlan, fourier_time_stepping_put
+from fftoptionlib.chf_cache import cached_chf
 from fftoptionlib.cosine_pricer import (
+    cosin_bermudan_put,
     cosin_vanilla_call,
+    cosin_call_transform,
+    cosin_put_terms,
+    cosin_put_transform,
+    cosin_xi,
     interval_a_and_b,
+    richardson_american,
+    truncation_half_width,
 )
 from fftoptionlib.fourier_pricer import (
-    carr_madan_fft_call_pricer,
-    carr_madan_fraction_fft_call_pricer,
+    FFTGridPlan,
+    FractionFFTGridPlan,
+    NUFFTGridPlan,
+    carr_madan_fft_transform,
+    carr_madan_fraction_fft_transform,
+    carr_madan_nufft_transform,
+    nufft_spread,
+    nufft_uniform_values,
 )
-from fftoptionlib.helper import spline_fitting
-from fftoptionlib.moment_generating_funs import (
-    general_log_moneyness_mgf,
-    cumulants_from_mgf,
+from fftoptionlib.fft_backend import make_fft_backend
+from fftoptionlib.instrumentation import stage
+from fftoptionlib.helper import (
+    PRECISIONS,
+    local_interpolation,
+    spline_fitting,
+    spline_fitting_surface,
+    to_array_with_same_dimension,
+    to_padded_array,
 )
 
 
+INTERPOLATIONS = ('spline', 'local')
+
+EXERCISE_TYPES = ('european', 'bermudan', 'american')
+
+GRID_PLAN_CACHE_SIZE = 16
+
+BARRIER_TYPES = ('down-and-out', 'up-and-out')
+
+
+def interpolate_grid(sim_strikes, call_prices, spline_order, interpolation, strike, row_index=None):
+    """
+    :param interpolation: 'spline' fits an interpolating spline through the whole grid, 'local' only through
+    the grid points around each strike
+    """
+    if interpolation == 'local':
+        return local_interpolation(sim_strikes, call_prices, spline_order, np.atleast_1d(strike), row_index)
+    if row_index is None:
+        return spline_fitting(sim_strikes, call_prices, spline_order)(strike)
+    return spline_fitting_surface(sim_strikes, call_prices, spline_order, strike, row_index)
+
+
+def price_surface_from_grid(strike, sim_strikes, call_prices, spline_order, interpolation='spline'):
+    strike_arr, mask = to_padded_array(strike)
+    row_index = np.nonzero(mask)[0]
+    res = np.full(mask.shape, np.nan)
+    res[mask] = interpolate_grid(sim_strikes, call_prices, spline_order, interpolation, strike_arr[mask], row_index)
+    return res
+
+
+def to_maturity_columns(t, r, q):
+    return [item[:, np.newaxis] for item in to_array_with_same_dimension(t, r, q)]
+
+
+def discounted_chf(u, t, r, q, S0, chf_ln_st, collector=None):
+    """
+    :param u: float32/complex64 u keeps the chf in complex64, the model inputs are cast to match
+    """
+    with stage(collector, 'chf', np.size(u) * np.size(t)):
+        complex_dtype = np.result_type(u.dtype, np.complex64)
+        if complex_dtype == np.complex64:
+            t, r, q, S0 = [np.asarray(item, dtype=np.float32) for item in (t, r, q, S0)]
+        return (np.exp(-r * t) * cached_chf(u, t, r, q, S0, chf_ln_st)).astype(complex_dtype, copy=False)
+
+
+def split_rows(group_index):
+    """
+    :return: row indices of every group, in group order
+    """
+    order = np.argsort(group_index, kind='stable')
+    return np.split(order, np.cumsum(np.bincount(group_index))[:-1])
+
+
+GREEK_BUMP = 1e-4
+
+
+def discounted_chf_sensitivities(u, t, r, q, S0, chf_ln_st, collector=None):
+    """
+    Discounted chf of ln(S_T) on u and its sensitivities. Pricing transforms are linear in the chf,
+    so every greek is the transform of one of these rows. Spot greeks are exact; time and model
+    parameter greeks use central differences of the chf only.
+    :return: greek names, (greeks x len(u)) rows
+    """
+    call_chf = discounted_chf(u, t, r, q, S0, chf_ln_st, collector)
+    iu = 1j * u
+    names = ['price', 'delta', 'gamma', 'theta']
+    d_t = GREEK_BUMP * t
+    rows = [call_chf,
+            call_chf * iu / S0,
+            call_chf * iu * (iu - 1) / S0 ** 2,
+            (discounted_chf(u, t - d_t, r, q, S0, chf_ln_st, collector) -
+             discounted_chf(u, t + d_t, r, q, S0, chf_ln_st, collector)) / (2 * d_t)]
+    for name, value in zip(chf_ln_st.get_parameter_names(), chf_ln_st.get_parameters()):
+        d_value = GREEK_BUMP * max(abs(value), 1e-2)
+        names.append('d_' + name)
+        rows.append((discounted_chf(u, t, r, q, S0, chf_ln_st.copy(**{name: value + d_value}), collector) -
+                     discounted_chf(u, t, r, q, S0, chf_ln_st.copy(**{name: value - d_value}), collector)) / (2 * d_value))
+    return names, np.array(rows)
+
+
+def greeks_from_grid(strike, sim_strikes, greek_names, greek_grid, spline_order, interpolation='spline'):
+    strike = np.atleast_1d(strike)
+    greek_values = price_surface_from_grid([strike] * len(greek_names), sim_strikes, greek_grid, spline_order, interpolation)
+    return dict(zip(greek_names, greek_values))
+
+
 class FFTEngine(object):
-    def __init__(self, N, d_u, alpha, spline_order):
+    parameter_names = ('N', 'd_u', 'alpha', 'spline_order', 'interpolation', 'precision')
+
+    def __init__(self, N, d_u, alpha, spline_order, interpolation='spline', precision='double'):
+        """
+        :param interpolation: 'spline' or 'local', see interpolate_grid
+        :param precision: 'double', or 'single' to evaluate the chf and the FFT in float32/complex64
+        """
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError('interpolation only accept spline or local')
+        if precision not in PRECISIONS:
+            raise ValueError('precision only accept double or single')
         self.N = N
         self.d_u = d_u
         self.alpha = alpha
         self.spline_order = spline_order
+        self.interpolation = interpolation
+        self.precision = precision
+        self.collector = None
+        self.fft_backend = None
+        self._grid_plan = None
+
+    def set_collector(self, collector):
+        """
+        :param collector: callable collector(stage, duration, size), e.g. instrumentation.StageCollector, or None
+        """
+        self.collector = collector
+        return self
+
+    def set_fft_backend(self, backend, **options):
+        """
+        :param backend: None for the global backend, a backend name with options or a backend instance
+        """
+        self.fft_backend = None if backend is None else make_fft_backend(backend, **options)
+        return self
+
+    def __getstate__(self):
+        # grid plans are rebuilt on first use, so pickled engines stay small, e.g. for price_portfolio
+        state = self.__dict__.copy()
+        state['_grid_plan'] = None
+        if '_grid_plans' in state:
+            state['_grid_plans'] = {}
+        return state
+
+    @property
+    def grid_plan(self):
+        grid_plan = self._grid_plan
+        if grid_plan is None or grid_plan.key != (self.N, self.d_u, self.alpha, self.precision):
+            grid_plan = self._grid_plan = FFTGridPlan(self.N, self.d_u, self.alpha, self.precision)
+        return grid_plan
+
+    def log_strike_window(self, strike):
+        """
+        :return: (lowest, highest) log-strike the grid has to span for strike, None for a grid centred on the spot
+        """
+        return None
+
+    def transform(self, S0, call_chf, log_window=None):
+        with stage(self.collector, 'fft', call_chf.size):
+            return carr_madan_fft_transform(self.grid_plan, S0, call_chf, self.fft_backend)
 
     def __call__(self, strike, t, r, q, S0, chf_ln_st):
-        sim_strikes, call_prices = carr_madan_fft_call_pricer(self.N, self.d_u, self.alpha, r, t, S0, q, chf_ln_st.set_type('chf'))
-        ffn_prices = spline_fitting(sim_strikes, call_prices, self.spline_order)(strike)
+        call_chf = discounted_chf(self.grid_plan.chf_u_arr, t, r, q, S0, chf_ln_st, self.collector)
+        sim_strikes, call_prices = self.transform(S0, call_chf, self.log_strike_window(strike))
+        with stage(self.collector, 'spline', np.size(strike)):
+            ffn_prices = interpolate_grid(sim_strikes, call_prices, self.spline_order, self.interpolation, strike)
         return ffn_prices
 
+    def price_surface(self, strike, t, r, q, S0, chf_ln_st):
+        """
+        :param strike: one strike array per maturity
+        :param t: maturities; r and q are scalars or one value per maturity
+        :return: (maturities x max strikes) call prices, padded with nan
+        """
+        t, r, q = to_maturity_columns(t, r, q)
+        call_chf = discounted_chf(self.grid_plan.chf_u_arr, t, r, q, S0, chf_ln_st, self.collector)
+        sim_strikes, call_prices = self.transform(S0, call_chf, self.log_strike_window(strike))
+        with stage(self.collector, 'spline', sum(np.size(item) for item in strike)):
+            return price_surface_from_grid(strike, sim_strikes, call_prices, self.spline_order, self.interpolation)
+
+    def price_batch(self, option_batch, chf_ln_st):
+        """
+        :param option_batch: OptionBatch, maturities sharing a spot are priced as one surface
+        :return: call prices of every row
+        """
+        groups, group_index = option_batch.pricing_groups()
+        group_rows = split_rows(group_index)
+        res = np.empty(len(option_batch))
+        for S0 in np.unique(groups[:, 3]):
+            group_ids = np.nonzero(groups[:, 3] == S0)[0]
+            rows = [group_rows[i] for i in group_ids]
+            t, r, q = groups[group_ids, :3].T
+            surface = self.price_surface([option_batch.strike[row] for row in rows], t, r, q, S0, chf_ln_st)
+            for prices, row in zip(surface, rows):
+                res[row] = prices[:len(row)]
+        return res
+
+    def spot_pricer(self, strike, t, r, q, S0, chf_ln_st):
+        """
+        Call prices of strike as a function of the spot, for repricing on spot ticks. S0 only enters the chf as
+        exp(1j * u * log(S0)) and the strike grid is centred on log(S0), so the grid prices at any spot are the
+        unit spot ones scaled by S0: the chf and the transform are evaluated once, a tick only interpolates at
+        strike / S0.
+        :param S0: current spot, a strike window is kept in moneyness at this spot
+        :return: function of the spot returning call prices
+        """
+        strike = np.atleast_1d(np.asarray(strike, dtype=float))
+        call_chf = discounted_chf(self.grid_plan.chf_u_arr, t, r, q, 1.0, chf_ln_st, self.collector)
+        log_window = self.log_strike_window(strike)
+        if log_window is not None:
+            log_window = tuple(np.array(log_window) - np.log(S0))
+        sim_strikes, call_prices = self.transform(1.0, call_chf, log_window)
+        if self.interpolation == 'spline':
+            interpolate = spline_fitting(sim_strikes, call_prices, self.spline_order)
+        else:
+            def interpolate(moneyness):
+                return local_interpolation(sim_strikes, call_prices, self.spline_order, moneyness)
+
+        def spot_prices(S0):
+            with stage(self.collector, 'spline', strike.size):
+                return S0 * interpolate(strike / S0)
+
+        return spot_prices
+
+    def calc_greeks(self, strike, t, r, q, S0, chf_ln_st):
+        greek_names, greek_chf = discounted_chf_sensitivities(self.grid_plan.chf_u_arr, t, r, q, S0, chf_ln_st, self.collector)
+        sim_strikes, greek_grid = self.transform(S0, greek_chf, self.log_strike_window(strike))
+        with stage(self.collector, 'spline', np.size(strike) * len(greek_names)):
+            return greeks_from_grid(strike, sim_strikes, greek_names, greek_grid, self.spline_order, self.interpolation)
+
+
+class FractionFFTEngine(FFTEngine):
+    parameter_names = ('N', 'd_u', 'd_k', 'alpha', 'spline_order', 'interpolation', 'precision', 'strike_window')
+
+    def __init__(self, N, d_u, d_k, alpha, spline_order, interpolation='spline', precision='double',
+                 strike_window=None):
+        """
+        :param d_k: log-strike spacing of the grid centred on the spot, and of a window reduced to one strike
+        :param strike_window: None for the grid centred on the spot, (K_min, K_max) or 'strikes' for the range of
+        the priced strikes: all N grid points are spread over the window, beta = log(K_min) and
+        d_k = log(K_max / K_min) / (N - 1)
+        """
+        super(FractionFFTEngine, self).__init__(N, d_u, alpha, spline_order, interpolation, precision)
+        self.d_k = d_k
+        self.strike_window = strike_window
+        self._grid_plans = {}
+
+    def fraction_grid_plan(self, d_k):
+        """
+        Grid plans are cached per log-strike spacing, the chirp factors depend on it.
+        """
+        key = (self.N, self.d_u, d_k, self.alpha, self.precision)
+        grid_plan = self._grid_plans.get(key)
+        if grid_plan is None:
+            if len(self._grid_plans) >= GRID_PLAN_CACHE_SIZE:
+                self._grid_plans.clear()
+            grid_plan = self._grid_plans[key] = FractionFFTGridPlan(*key)
+        return grid_plan
+
+    @property
+    def grid_plan(self):
+        return self.fraction_grid_plan(self.d_k)
+
+    def log_strike_window(self, strike):
+        if self.strike_window is None:
+            return None
+        if isinstance(self.strike_window, str):
+            if self.strike_window != 'strikes':
+                raise ValueError('strike window only accept None, (K_min, K_max) or strikes')
+            log_strike = np.log(np.hstack(strike))
+            return log_strike.min(), log_strike.max()
+        return tuple(np.log(self.strike_window))
+
+    def transform(self, S0, call_chf, log_window=None):
+        if log_window is None:
+            grid_plan, beta = self.grid_plan, None
+        else:
+            k_min, k_max = log_window
+            d_k = (k_max - k_min) / (self.N - 1) if k_max > k_min else self.d_k
+            grid_plan, beta = self.fraction_grid_plan(d_k), (k_min + k_max - d_k * (self.N - 1)) / 2
+        with stage(self.collector, 'fft', call_chf.size):
+            return carr_madan_fraction_fft_transform(grid_plan, S0, call_chf, self.fft_backend, beta)
+
+
+class NUFFTEngine(FFTEngine):
+    """
+    Carr-Madan prices at the requested strikes, without a strike grid or interpolation: the sum over the N
+    integration points is evaluated at every log-strike by a non-uniform FFT, O(N log N + M) for M strikes.
+    The strike grid spacing no longer ties N to d_u, so N only has to resolve the chf.
+    """
+    parameter_names = ('N', 'd_u', 'alpha', 'spreading')
 
-class FractionFFTEngine(object):
-    def __init__(self, N, d_u, d_k, alpha, spline_order):
+    def __init__(self, N, d_u, alpha, spreading=12):
+        """
+        :param spreading: half width of the Gaussian gridding in oversampled grid points, see NUFFTGridPlan
+        """
         self.N = N
         self.d_u = d_u
-        self.d_k = d_k
         self.alpha = alpha
-        self.spline_order = spline_order
+        self.spreading = spreading
+        self.collector = None
+        self.fft_backend = None
+        self._grid_plan = None
+
+    @property
+    def grid_plan(self):
+        grid_plan = self._grid_plan
+        if grid_plan is None or grid_plan.key != (self.N, self.d_u, self.alpha, self.spreading):
+            grid_plan = self._grid_plan = NUFFTGridPlan(self.N, self.d_u, self.alpha, self.spreading)
+        return grid_plan
+
+    def transform(self, log_strike, call_chf):
+        with stage(self.collector, 'fft', call_chf.size):
+            return carr_madan_nufft_transform(self.grid_plan, log_strike, call_chf, self.fft_backend)
 
     def __call__(self, strike, t, r, q, S0, chf_ln_st):
-        sim_strikes, call_prices = carr_madan_fraction_fft_call_pricer(self.N, self.d_u, self.d_k, self.alpha, r, t, S0, q, chf_ln_st.set_type('chf'))
-        ffn_prices = spline_fitting(sim_strikes, call_prices, self.spline_order)(strike)
-        return ffn_prices
+        call_chf = discounted_chf(self.grid_plan.chf_u_arr, t, r, q, S0, chf_ln_st, self.collector)
+        return self.transform(np.log(strike), call_chf)
+
+    def price_surface(self, strike, t, r, q, S0, chf_ln_st):
+        """
+        :param strike: one strike array per maturity
+        :param t: maturities; r and q are scalars or one value per maturity
+        :return: (maturities x max strikes) call prices, padded with nan
+        """
+        t, r, q = to_maturity_columns(t, r, q)
+        call_chf = discounted_chf(self.grid_plan.chf_u_arr, t, r, q, S0, chf_ln_st, self.collector)
+        strike_arr, mask = to_padded_array(strike, fill_value=S0)
+        return np.where(mask, self.transform(np.log(strike_arr), call_chf), np.nan)
+
+    def spot_pricer(self, strike, t, r, q, S0, chf_ln_st):
+        """
+        Call prices of strike as a function of the spot, see FFTEngine.spot_pricer. The FFT is done once at unit
+        spot, a tick only spreads to log(strike / S0).
+        """
+        strike = np.atleast_1d(np.asarray(strike, dtype=float))
+        call_chf = discounted_chf(self.grid_plan.chf_u_arr, t, r, q, 1.0, chf_ln_st, self.collector)
+        with stage(self.collector, 'fft', call_chf.size):
+            uniform_arr = nufft_uniform_values(self.grid_plan, call_chf, self.fft_backend)
+
+        def spot_prices(S0):
+            return S0 * nufft_spread(self.grid_plan, uniform_arr, np.log(strike / S0))
+
+        return spot_prices
+
+    def calc_greeks(self, strike, t, r, q, S0, chf_ln_st):
+        greek_names, greek_chf = discounted_chf_sensitivities(self.grid_plan.chf_u_arr, t, r, q, S0, chf_ln_st, self.collector)
+        return dict(zip(greek_names, self.transform(np.log(np.atleast_1d(strike)), greek_chf)))
 
 
 class CosineEngine(object):
-    def __init__(self, N, L):
+    parameter_names = ('N', 'L', 'batch', 'tol', 'max_N')
+
+    def __init__(self, N, L, batch=True, tol=None, max_N=2 ** 16):
+        """
+        :param tol: target absolute error of the prices. When given, L is ignored and the truncation range is
+        chosen from the cumulants, N is the starting number of terms, doubled up to max_N until the last half of
+        the series is below tol / 2. adaptive_grid returns the number of terms used; when max_N is reached with
+        a larger tail, a RuntimeWarning reports it and the prices may miss tol.
+        """
         self.N = N
         self.L = L
+        self.batch = batch
+        self.tol = tol
+        self.max_N = max_N
+        self.collector = None
+
+    def set_collector(self, collector):
+        self.collector = collector
+        return self
 
     def calc_integral_interval(self, strike, L, t, r, q, S0, chf_ln_st):
-        c1, c2, c4 = cumulants_from_mgf(general_log_moneyness_mgf,
-                                        strike,
-                                        chf_ln_st.set_type('mgf'),
-                                        t=t,
-                                        r=r,
-                                        q=q,
-                                        S0=S0)
-        a, b = interval_a_and_b(c1, c2, c4, L)
+        with stage(self.collector, 'cumulants'):
+            c1, c2, c4 = chf_ln_st.cumulants(t, r, q)
+        a, b = interval_a_and_b(c1 + np.log(S0 / strike), c2, c4, L)
         return a, b
 
+    def adaptive_grid(self, strike, t, r, q, S0, chf_ln_st):
+        """
+        :return: truncation range, number of terms and call prices within tol
+        """
+        strike = np.atleast_1d(np.asarray(strike, dtype=float))
+        with stage(self.collector, 'cumulants'):
+            c1, c2, c4 = chf_ln_st.cumulants(t, r, q)
+        # half of tol for the truncation of the density, half for the truncation of the series
+        half_width = truncation_half_width(c2, c4, self.tol / 2, strike.max())
+        a, b = c1 + np.log(S0) - half_width, c1 + np.log(S0) + half_width
+        N = self.N
+        put_chf = discounted_chf(cosin_xi(N, a, b), t, r, q, S0, chf_ln_st, self.collector)
+        with stage(self.collector, 'cos', N * strike.size):
+            terms = cosin_put_terms(strike, a, b, put_chf)
+        tail = np.abs(terms[:, N // 2:]).sum(axis=1).max()
+        while N < self.max_N and tail > self.tol / 2:
+            # the terms already summed keep their coefficients, only the next N are added
+            put_chf = discounted_chf(np.arange(N, 2 * N) * np.pi / (b - a), t, r, q, S0, chf_ln_st, self.collector)
+            with stage(self.collector, 'cos', N * strike.size):
+                terms = np.concatenate([terms, cosin_put_terms(strike, a, b, put_chf, N)], axis=1)
+            N = 2 * N
+            tail = np.abs(terms[:, N // 2:]).sum(axis=1).max()
+        if tail > self.tol / 2:
+            # a smaller tol widens the range at fixed max_N, so the prices can miss it further
+            warnings.warn('CosineEngine reached max_N = %d with a series tail of %.3g, above tol / 2 = %.3g; '
+                          'raise max_N or tol' % (N, tail, self.tol / 2), RuntimeWarning, stacklevel=3)
+        put_prices = terms.sum(axis=1)
+        return a, b, N, put_prices + S0 * np.exp(-q * t) - strike * np.exp(-r * t)
+
     def _single_cal_price(self, strike, t, r, q, S0, chf_ln_st):
         a, b = self.calc_integral_interval(strike, self.L, t, r, q, S0, chf_ln_st)
-        call_price = cosin_vanilla_call(
-            self.N,
-            strike=strike,
-            intv_a=a,
-            intv_b=b,
-            t=t,
-            r=r,
-            q=q,
-            S0=S0,
-            chf_ln_st=chf_ln_st.set_type('chf'))
+        with stage(self.collector, 'cos', self.N):
+            call_price = cosin_vanilla_call(
+                self.N,
+                strike=strike,
+                intv_a=a,
+                intv_b=b,
+                t=t,
+                r=r,
+                q=q,
+                S0=S0,
+                chf_ln_st=partial(cached_chf, chf_ln_st=chf_ln_st))
         return call_price
 
+    def _batch_cal_price(self, strike, t, r, q, S0, chf_ln_st):
+        a, b = self.calc_integral_interval(1.0, self.L, t, r, q, S0, chf_ln_st)
+        call_chf = discounted_chf(cosin_xi(self.N, a, b), t, r, q, S0, chf_ln_st, self.collector)
+        with stage(self.collector, 'cos', self.N * np.size(strike)):
+            return cosin_call_transform(strike, a, b, call_chf)
+
+    def spot_pricer(self, strike, t, r, q, S0, chf_ln_st):
+        """
+        See FFTEngine.spot_pricer. The coefficients of the unit spot series are kept, a tick only reruns the cosine
+        transform at strike / S0, shifted by log(S0) like the truncation range.
+        :param S0: current spot, sizes the adaptive series when tol is given
+        """
+        strike = np.atleast_1d(np.asarray(strike, dtype=float))
+        if self.tol is None:
+            N = self.N
+            a, b = self.calc_integral_interval(1.0, self.L, t, r, q, 1.0, chf_ln_st)
+        else:
+            a, b, N, _ = self.adaptive_grid(strike, t, r, q, S0, chf_ln_st)
+            a, b = a - np.log(S0), b - np.log(S0)
+        unit_chf = discounted_chf(cosin_xi(N, a, b), t, r, q, 1.0, chf_ln_st, self.collector)
+
+        def spot_prices(S0):
+            moneyness = strike / S0
+            with stage(self.collector, 'cos', N * strike.size):
+                if self.tol is None:
+                    return S0 * cosin_call_transform(moneyness, a, b, unit_chf)
+                return S0 * (cosin_put_transform(moneyness, a, b, unit_chf) + np.exp(-q * t) - moneyness * np.exp(-r * t))
+
+        return spot_prices
+
+    def price_batch(self, option_batch, chf_ln_st):
+        """
+        :param option_batch: OptionBatch, rows sharing (t, r, q, S0) are priced in one call
+        :return: call prices of every row
+        """
+        groups, group_index = option_batch.pricing_groups()
+        res = np.empty(len(option_batch))
+        for (t, r, q, S0), row in zip(groups, split_rows(group_index)):
+            res[row] = self(option_batch.strike[row], t, r, q, S0, chf_ln_st)
+        return res
+
+    def calc_greeks(self, strike, t, r, q, S0, chf_ln_st):
+        if self.tol is not None:
+            return self._adaptive_greeks(strike, t, r, q, S0, chf_ln_st)
+        a, b = self.calc_integral_interval(1.0, self.L, t, r, q, S0, chf_ln_st)
+        greek_names, greek_chf = discounted_chf_sensitivities(cosin_xi(self.N, a, b), t, r, q, S0, chf_ln_st, self.collector)
+        with stage(self.collector, 'cos', greek_chf.size * np.size(strike)):
+            return dict(zip(greek_names, cosin_call_transform(strike, a, b, greek_chf)))
+
+    def _adaptive_greeks(self, strike, t, r, q, S0, chf_ln_st):
+        strike = np.atleast_1d(np.asarray(strike, dtype=float))
+        a, b, N, _ = self.adaptive_grid(strike, t, r, q, S0, chf_ln_st)
+        greek_names, greek_chf = discounted_chf_sensitivities(cosin_xi(N, a, b), t, r, q, S0, chf_ln_st, self.collector)
+        # put-call parity row by row: the greeks of exp(-r t) (S_T - K) are the rows at u = -i and u = 0
+        _, forward_chf = discounted_chf_sensitivities(np.array([0., -1j]), t, r, q, S0, chf_ln_st, self.collector)
+        with stage(self.collector, 'cos', greek_chf.size * strike.size):
+            put_greeks = cosin_put_transform(strike, a, b, greek_chf)
+        return dict(zip(greek_names, put_greeks + forward_chf[:, 1:].real - forward_chf[:, :1].real * strike))
+
     def __call__(self, strike, t, r, q, S0, chf_ln_st):
+        if self.tol is not None:
+            return self.adaptive_grid(strike, t, r, q, S0, chf_ln_st)[-1]
+        if self.batch:
+            return self._batch_cal_price(strike, t, r, q, S0, chf_ln_st)
         call_prices = np.array([self._single_cal_price(one_strike, t, r, q, S0, chf_ln_st) for one_strike in strike])
         return call_prices
+
+
+class EarlyExerciseCosineEngine(object):
+    """
+    Bermudan and American options by COS backward induction (Fang and Oosterlee, 2009), for processes with
+    independent increments. Prices are homogeneous in the strike, so one induction on log(S / K) prices all
+    strikes of a kind.
+    """
+    parameter_names = ('N', 'L', 'exercise_dates', 'richardson_depth')
+
+    def __init__(self, N, L, exercise_dates=None, richardson_depth=4):
+        """
+        :param exercise_dates: number of equally spaced exercise dates of Bermudan options, the last one at expiry
+        :param richardson_depth: American prices are extrapolated from Bermudan ones with 2 ** d, ..., 2 ** (d + 3)
+        exercise dates
+        """
+        self.N = N
+        self.L = L
+        self.exercise_dates = exercise_dates
+        self.richardson_depth = richardson_depth
+        self.collector = None
+        self.fft_backend = None
+
+    def set_collector(self, collector):
+        self.collector = collector
+        return self
+
+    def set_fft_backend(self, backend, **options):
+        self.fft_backend = None if backend is None else make_fft_backend(backend, **options)
+        return self
+
+    def bermudan_price(self, x0, t, r, q, chf_ln_st, exercise_dates, is_put):
+        """
+        Calls are priced as puts under the share measure: there log(K / S) has independent increments with chf
+        phi(-u - 1j) / phi(-1j), phi the chf of log(S_{t + dt} / S_t), and r and q swap. Unlike the call payoff,
+        the put payoff stays bounded on the truncation range.
+        :return: unit strike prices at x0 = log(S0 / K)
+        """
+        with stage(self.collector, 'cumulants'):
+            c1, c2, c4 = chf_ln_st.cumulants(t, r, q)
+        dt = t / exercise_dates
+        if is_put:
+            put_x0, put_r, center = x0, r, c1
+        else:
+            # the mean of log(S_t / S0) under the share measure, to second order
+            put_x0, put_r, center = -x0, q, -(c1 + c2)
+        a = np.min(put_x0) + center - interval_a_and_b(0., c2, c4, self.L)[1]
+        b = np.max(put_x0) + center + interval_a_and_b(0., c2, c4, self.L)[1]
+        xi = cosin_xi(self.N, a, b)
+        if is_put:
+            increment_chf = discounted_chf(xi, dt, r, q, 1.0, chf_ln_st, self.collector) * np.exp(r * dt)
+        else:
+            increment_chf = discounted_chf(-xi - 1j, dt, r, q, 1.0, chf_ln_st, self.collector) * np.exp(q * dt)
+        with stage(self.collector, 'cos', self.N * exercise_dates):
+            unit_prices = cosin_bermudan_put(put_x0, a, b, dt, put_r, increment_chf, exercise_dates, self.fft_backend)
+        return unit_prices if is_put else unit_prices * np.exp(x0)
+
+    def price(self, strike, is_put, t, r, q, S0, chf_ln_st, exercise_type='american'):
+        """
+        :param is_put: bool per strike
+        :return: prices of puts and calls
+        """
+        if exercise_type not in EXERCISE_TYPES:
+            raise ValueError('exercise type only accept european, bermudan or american')
+        if not chf_ln_st.independent_increments:
+            raise ValueError('early exercise pricing only accept processes with independent increments')
+        strike, is_put = np.broadcast_arrays(np.atleast_1d(np.asarray(strike, dtype=float)), is_put)
+        x0 = np.log(S0 / strike)
+        res = np.empty(strike.shape)
+        for kind in [True, False]:
+            rows = is_put == kind
+            if not rows.any():
+                continue
+            if exercise_type == 'european':
+                unit_prices = self.bermudan_price(x0[rows], t, r, q, chf_ln_st, 1, kind)
+            elif exercise_type == 'bermudan':
+                if self.exercise_dates is None:
+                    raise ValueError('bermudan options need exercise_dates')
+                unit_prices = self.bermudan_price(x0[rows], t, r, q, chf_ln_st, self.exercise_dates, kind)
+            else:
+                unit_prices = richardson_american(
+                    lambda exercise_dates: self.bermudan_price(x0[rows], t, r, q, chf_ln_st, exercise_dates, kind),
+                    self.richardson_depth)
+                # exercise today
+                unit_prices = np.maximum(unit_prices, (1 - np.exp(x0[rows])) * (1 if kind else -1))
+            res[rows] = strike[rows] * unit_prices
+        return res
+
+    def __call__(self, strike, t, r, q, S0, chf_ln_st):
+        return self.price(strike, False, t, r, q, S0, chf_ln_st, 'european')
+
+
+class BarrierEngine(object):
+    """
+    Discretely monitored knock-out options by Fourier time stepping, for processes with independent increments.
+    Between two monitoring dates the value is convolved with the increment density by an FFT pair on a log
+    price grid, so M monitoring dates cost O(M N log N) per strike. The grid and the discounted increment chf
+    are built once and used at every date.
+    """
+    parameter_names = ('N', 'L')
+
+    def __init__(self, N, L):
+        """
+        :param L: the grid spans L standard deviations (cumulant based, see interval_a_and_b) of log(S_T) around
+        the barrier, the spot and the strikes
+        """
+        self.N = N
+        self.L = L
+        self.collector = None
+        self.fft_backend = None
+        self._grid_plan = None
+
+    def set_collector(self, collector):
+        self.collector = collector
+        return self
+
+    def set_fft_backend(self, backend, **options):
+        self.fft_backend = None if backend is None else make_fft_backend(backend, **options)
+        return self
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_grid_plan'] = None
+        return state
+
+    def grid_plan(self, x_min, x_max):
+        key = (self.N, x_min, x_max)
+        if self._grid_plan is None or self._grid_plan[0] != key:
+            self._grid_plan = key, BarrierGridPlan(self.N, x_min, x_max)
+        return self._grid_plan[1]
+
+    def knock_out_put(self, log_strike, x0, t, r, q, chf_ln_st, monitoring_dates, is_up, share_measure=False):
+        """
+        :param share_measure: walk of x = log(H / S) under the share measure, see price
+        :return: unit barrier prices of fourier_time_stepping_put
+        """
+        with stage(self.collector, 'cumulants'):
+            c1, c2, c4 = chf_ln_st.cumulants(t, r, q)
+        # the mean of x_T - x0, to second order under the share measure
+        center = -(c1 + c2) if share_measure else c1
+        half_width = interval_a_and_b(0., c2, c4, self.L)[1]
+        grid_plan = self.grid_plan(min(0., x0, x0 + center, np.min(log_strike)) - half_width,
+                                   max(0., x0, x0 + center, np.max(log_strike)) + half_width)
+        dt = t / monitoring_dates
+        # discounted at q under the share measure: exp(-q dt) phi(-u - 1j) / phi(-1j) = exp(-r dt) phi(-u - 1j)
+        chf_u_arr = -grid_plan.omega_arr - 1j if share_measure else grid_plan.omega_arr
+        transfer_arr = discounted_chf(chf_u_arr, dt, r, q, 1.0, chf_ln_st, self.collector)
+        with stage(self.collector, 'fft', self.N * np.size(log_strike) * monitoring_dates):
+            return fourier_time_stepping_put(
+                grid_plan, log_strike, x0, transfer_arr, monitoring_dates, is_up, self.fft_backend)
+
+    def price(self, strike, is_put, t, r, q, S0, chf_ln_st, barrier, barrier_type, monitoring_dates):
+        """
+        Calls are priced as puts under the share measure, on log(H / S) with increment chf phi(-u - 1j) /
+        phi(-1j) and r and q swapped, down-and-out calls becoming up-and-out puts. The put payoff stays bounded,
+        so nothing large wraps around the periodic grid.
+        :param is_put: bool per strike
+        :param barrier: barrier level H
+        :param barrier_type: 'down-and-out' or 'up-and-out'
+        :param monitoring_dates: number of equally spaced monitoring dates, the last one at expiry
+        :return: prices of puts and calls
+        """
+        if barrier_type not in BARRIER_TYPES:
+            raise ValueError('barrier type only accept down-and-out or up-and-out')
+        if not chf_ln_st.independent_increments:
+            raise ValueError('barrier pricing only accept processes with independent increments')
+        strike, is_put = np.broadcast_arrays(np.atleast_1d(np.asarray(strike, dtype=float)), is_put)
+        is_up = barrier_type == 'up-and-out'
+        res = np.empty(strike.shape)
+        puts = is_put
+        if puts.any():
+            res[puts] = barrier * self.knock_out_put(
+                np.log(strike[puts] / barrier), np.log(S0 / barrier), t, r, q, chf_ln_st, monitoring_dates, is_up)
+        calls = ~is_put
+        if calls.any():
+            res[calls] = S0 * strike[calls] / barrier * self.knock_out_put(
+                np.log(barrier / strike[calls]), np.log(barrier / S0), t, r, q, chf_ln_st, monitoring_dates,
+                not is_up, share_measure=True)
+        return res
@@ -0,0 +1,113 @@
+import numpy as np
+
+from fftoptionlib.helper import LazyModule
+
+scipy_fft = LazyModule('scipy.fft')
+
+
+class ScipyFFTBackend(object):
+    """
+    scipy.fft, multithreaded over batched transforms with workers > 1 (-1 uses all cores).
+    """
+    name = 'scipy'
+
+    def __init__(self, workers=None):
+        self.workers = workers
+
+    def fft(self, x, axis=-1, overwrite_x=False):
+        return scipy_fft.fft(x, axis=axis, overwrite_x=overwrite_x, workers=self.workers)
+
+    def ifft(self, x, axis=-1, overwrite_x=False):
+        return scipy_fft.ifft(x, axis=axis, overwrite_x=overwrite_x, workers=self.workers)
+
+
+class NumpyFFTBackend(object):
+    """
+    numpy.fft, transforming in place with overwrite_x from numpy 2.0 on, which added the out argument.
+    """
+    name = 'numpy'
+    supports_out = np.lib.NumpyVersion(np.__version__) >= '2.0.0'
+
+    def _options(self, x, overwrite_x):
+        if self.supports_out and overwrite_x and x.dtype == np.complex128 and x.flags.writeable:
+            return {'out': x}
+        return {}
+
+    def fft(self, x, axis=-1, overwrite_x=False):
+        return np.fft.fft(x, axis=axis, **self._options(x, overwrite_x))
+
+    def ifft(self, x, axis=-1, overwrite_x=False):
+        return np.fft.ifft(x, axis=axis, **self._options(x, overwrite_x))
+
+
+class PyFFTWBackend(object):
+    """
+    pyFFTW through its scipy.fft interface. FFTW plans are cached per shape, dtype and axis and kept alive
+    for keepalive_time seconds; wisdom from export_wisdom() of an earlier run skips the planning.
+    """
+    name = 'pyfftw'
+
+    def __init__(self, threads=1, planner_effort='FFTW_MEASURE', wisdom=None, keepalive_time=60.):
+        try:
+            import pyfftw
+            import pyfftw.interfaces.scipy_fft
+        except ImportError:
+            raise ImportError('PyFFTWBackend requires pyfftw')
+        self._pyfftw = pyfftw
+        self.threads = threads
+        self.planner_effort = planner_effort
+        self.keepalive_time = keepalive_time
+        if wisdom is not None:
+            pyfftw.import_wisdom(wisdom)
+        pyfftw.interfaces.cache.enable()
+        pyfftw.interfaces.cache.set_keepalive_time(keepalive_time)
+
+    def __reduce__(self):
+        # the module is imported again on unpickling, with the wisdom gathered so far
+        return type(self), (self.threads, self.planner_effort, self.export_wisdom(), self.keepalive_time)
+
+    def export_wisdom(self):
+        return self._pyfftw.export_wisdom()
+
+    def fft(self, x, axis=-1, overwrite_x=False):
+        return self._pyfftw.interfaces.scipy_fft.fft(
+            x, axis=axis, overwrite_x=overwrite_x, workers=self.threads, planner_effort=self.planner_effort)
+
+    def ifft(self, x, axis=-1, overwrite_x=False):
+        return self._pyfftw.interfaces.scipy_fft.ifft(
+            x, axis=axis, overwrite_x=overwrite_x, workers=self.threads, planner_effort=self.planner_effort)
+
+
+FFT_BACKENDS = {
+    'scipy': ScipyFFTBackend,
+    'numpy': NumpyFFTBackend,
+    'pyfftw': PyFFTWBackend,
+}
+
+_default_backend = ScipyFFTBackend()
+
+
+def make_fft_backend(backend, **options):
+    """
+    :param backend: backend instance, or one of the names in FFT_BACKENDS with constructor options
+    """
+    if isinstance(backend, str):
+        if backend not in FFT_BACKENDS:
+            raise ValueError('fft backend only accept {}'.format(', '.join(FFT_BACKENDS)))
+        return FFT_BACKENDS[backend](**options)
+    return backend
+
+
+def set_fft_backend(backend, **options):
+    """
+    Set the backend of every engine without its own, e.g. set_fft_backend('scipy', workers=-1).
+    """
+    global _default_backend
+    _default_backend = make_fft_backend(backend, **options)
+    return _default_backend
+
+
+def get_fft_backend(backend=None):
+    if backend is None:
+        return _default_backend
+    return backend
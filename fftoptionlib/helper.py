@@ -1,9 +1,80 @@
+import importlib
+
 import numpy as np
-from scipy.interpolate import InterpolatedUnivariateSpline
+
+
+class LazyModule(object):
+    """
+    Stand-in for a module that is only imported on first attribute access.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)
+        return value
+
+
+interpolate = LazyModule('scipy.interpolate')
+
+PRECISIONS = {
+    'double': (np.float64, np.complex128),
+    'single': (np.float32, np.complex64),
+}
 
 
 def spline_fitting(x_data, y_data, order):
-    return InterpolatedUnivariateSpline(x_data, y_data, k=order)
+    return interpolate.InterpolatedUnivariateSpline(x_data, y_data, k=order)
+
+
+def spline_fitting_surface(x_data, y_data, order, x_eval, row_index):
+    """
+    Interpolating splines through every row of y_data, fitted with a single banded solve.
+    :param row_index: row of y_data each point of x_eval is evaluated on
+    """
+    spl = interpolate.make_interp_spline(x_data, y_data.T, k=order)
+    design = interpolate.BSpline.design_matrix(x_eval, spl.t, order, extrapolate=True)
+    coef = spl.c[design.indices.reshape(-1, order + 1), row_index[:, np.newaxis]]
+    return np.sum(design.data.reshape(-1, order + 1) * coef, axis=1)
+
+
+LOCAL_WINDOW = 16
+
+
+def local_interpolation(x_data, y_data, order, x_eval, row_index=None, window=LOCAL_WINDOW):
+    """
+    Interpolating splines through the window grid points around every point of x_eval instead of the whole
+    grid. The grid is uniform in log-strike, so all windows share one knot vector and are fitted together.
+    :param x_data: strike grid, uniform in log-strike
+    :param row_index: row of y_data each point of x_eval is evaluated on, for a 2-d y_data
+    :param window: grid points per window, at most the whole grid
+    """
+    window = min(window, len(x_data))
+    k_data = np.log(x_data)
+    d_k = (k_data[-1] - k_data[0]) / (len(k_data) - 1)
+    pos = (np.log(x_eval) - k_data[0]) / d_k
+    first = np.clip(np.floor(pos).astype(int) - window // 2 + 1, 0, len(k_data) - window)
+    nodes = first[:, np.newaxis] + np.arange(window)
+    if row_index is None:
+        window_values = y_data[nodes]
+    else:
+        window_values = y_data[row_index[:, np.newaxis], nodes]
+    return spline_fitting_surface(np.arange(window, dtype=float), window_values, order, pos - first,
+                                  np.arange(len(pos)))
+
+
+def to_padded_array(arrays, fill_value=np.nan):
+    """
+    :return: (len(arrays), max length) array padded with fill_value, and the mask of the filled entries
+    """
+    arrays = to_array_atleast_1d(*arrays)
+    max_len = max(len(item) for item in arrays)
+    mask = np.arange(max_len) < np.array([len(item) for item in arrays])[:, np.newaxis]
+    res = np.full(mask.shape, fill_value, dtype=float)
+    res[mask] = np.concatenate(arrays)
+    return res, mask
 
 
 def to_array_atleast_1d(*args):
@@ -27,8 +98,28 @@ def to_array_with_same_dimension(*args):
     return res
 
 
+def read_only(*args):
+    for item in args:
+        item.flags.writeable = False
+    return args
+
+
 def call_to_put(call_prices, put_call_arr, strike_arr, discount_bond_price, forward_price, put_label):
     call_prices, put_call_arr, strike_arr = to_array_with_same_dimension(call_prices, put_call_arr, strike_arr)
     put_bool = put_call_arr == put_label
     call_prices[put_bool] = call_prices[put_bool] - discount_bond_price * (forward_price - strike_arr[put_bool])
     return call_prices
+
+
+def call_greeks_to_put(call_greeks, put_call_arr, strike_arr, discount_bond_price, forward_price, S0, r, q, put_label):
+    """
+    Put-call parity P = C - D * (F - K), with the discounted forward D * F proportional to S0.
+    """
+    res = {name: np.array(value, dtype=float) for name, value in call_greeks.items()}
+    res['price'] = call_to_put(res['price'], put_call_arr, strike_arr, discount_bond_price, forward_price, put_label)
+    _, put_call_arr, strike_arr = to_array_with_same_dimension(res['price'], put_call_arr, strike_arr)
+    put_bool = put_call_arr == put_label
+    discounted_forward = discount_bond_price * forward_price
+    res['delta'][put_bool] = res['delta'][put_bool] - discounted_forward / S0
+    res['theta'][put_bool] = res['theta'][put_bool] + r * discount_bond_price * strike_arr[put_bool] - q * discounted_forward
+    return res
@@ -0,0 +1,117 @@
+import numpy as np
+from scipy.special import ndtr
+
+from fftoptionlib.helper import to_array_with_same_dimension
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+TIME_VALUE_TOL = 1e-10
+
+
+def normalized_black_call(x, s, exp_half_x=None):
+    """
+    Undiscounted Black call price divided by sqrt(forward * strike).
+    :param x: log-moneyness log(forward / strike)
+    :param s: total volatility sigma * sqrt(t)
+    """
+    if exp_half_x is None:
+        exp_half_x = np.exp(0.5 * x)
+    return exp_half_x * ndtr(x / s + 0.5 * s) - ndtr(x / s - 0.5 * s) / exp_half_x
+
+
+def normalized_black_vega(x, s):
+    return np.exp(-0.5 * (x / s) ** 2 - 0.125 * s ** 2) / SQRT_2PI
+
+
+def corrado_miller_guess(x, c):
+    half_intrinsic = np.sinh(0.5 * x)
+    excess = c - half_intrinsic
+    radicand = np.maximum(excess ** 2 - 4 * half_intrinsic ** 2 / np.pi, 0.)
+    return SQRT_2PI / (2 * np.cosh(0.5 * x)) * (excess + np.sqrt(radicand))
+
+
+def halley_iterations(x, c, s, s_lo, s_hi, lower, tol, max_iter):
+    """
+    Bracketed Halley steps on one branch, in 1 / s ** 2 on the lower one. Converged rows are dropped from the
+    working arrays after every step, so the later steps only cost the few slow rows.
+    """
+    res = s.copy()
+    index = np.arange(s.size)
+    target = np.log(c) if lower else c
+    exp_half_x = np.exp(0.5 * x)
+    for _ in range(max_iter):
+        b = normalized_black_call(x, s, exp_half_x)
+        vega = normalized_black_vega(x, s)
+        volga_ratio = x ** 2 / s ** 3 - 0.25 * s
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            if lower:
+                vega_ratio = vega / b
+                ds_dv = -0.5 * s ** 3
+                f = np.log(b) - target
+                d_f = vega_ratio * ds_dv
+                d2_f = vega_ratio * ((volga_ratio - vega_ratio) * ds_dv ** 2 + 0.75 * s ** 5)
+            else:
+                f = b - target
+                d_f = vega
+                d2_f = vega * volga_ratio
+            newton_step = -f / d_f
+            halley_step = newton_step / (1 - 0.5 * newton_step * d2_f / d_f)
+        too_low = b < c
+        s_lo = np.where(too_low, s, s_lo)
+        s_hi = np.where(too_low, s_hi, s)
+        # prefer the Halley step, then the Newton step, and bisect when both leave the bracket
+        s_new = np.where(np.isfinite(s_hi), 0.5 * (s_lo + s_hi), 2 * s)
+        for step in (newton_step, halley_step):
+            with np.errstate(invalid='ignore'):
+                s_step = 1 / np.sqrt(1 / s ** 2 + step) if lower else s + step
+            converged = np.abs(s_step - s) <= tol * s
+            inside = converged | (s_step >= s_lo) & (s_step <= s_hi)
+            s_new = np.where(inside, s_step, s_new)
+        res[index] = s_new
+        active = ~converged
+        if not active.any():
+            break
+        index, x, c, target, exp_half_x, s, s_lo, s_hi = (
+            arr[active] for arr in (index, x, c, target, exp_half_x, s_new, s_lo, s_hi))
+    return res
+
+
+def normalized_implied_volatility(x, c, tol=1e-12, max_iter=20):
+    """
+    Total implied volatility of out-of-the-money (x <= 0) normalized call prices.
+    Halley steps start from the Corrado-Miller guess and stay within the branch bracketed by the inflection
+    point sqrt(2 |x|). Below it, log(price) is solved for 1 / s ** 2, in which it is close to linear.
+    """
+    s_c = np.sqrt(-2 * x)
+    lower_branch = c < normalized_black_call(x, np.maximum(s_c, 1e-300))
+    s = corrado_miller_guess(x, c)
+    for lower, rows in ((True, lower_branch), (False, ~lower_branch)):
+        if not rows.any():
+            continue
+        s_lo = np.zeros(s_c[rows].shape) if lower else s_c[rows]
+        s_hi = s_c[rows] if lower else np.full(s_c[rows].shape, np.inf)
+        s[rows] = halley_iterations(x[rows], c[rows], np.clip(s[rows], s_lo, s_hi), s_lo, s_hi, lower, tol,
+                                    max_iter)
+    return s
+
+
+def calc_implied_volatility(prices, put_call, strike, time_to_maturity, discount_bond_price, forward_price,
+                            put_label='put'):
+    """
+    Black implied volatilities of call and put prices, e.g. the output of FourierPricer.calc_price.
+    Prices outside the no-arbitrage bounds, or whose time value is below TIME_VALUE_TOL of the price, give nan.
+    """
+    prices, put_call, strike, time_to_maturity, discount_bond_price, forward_price = to_array_with_same_dimension(
+        prices, put_call, strike, time_to_maturity, discount_bond_price, forward_price)
+    x = np.log(forward_price / strike)
+    quote = prices.astype(float) / (discount_bond_price * np.sqrt(forward_price * strike))
+    # b(x, s) = b(-x, s) + 2 sinh(x / 2) and puts are calls at -x, so every quote is solved as the time value
+    # of an out-of-the-money call; out-of-the-money puts are their time value without going through parity
+    intrinsic = 2 * np.sinh(0.5 * np.where(put_call == put_label, -x, x))
+    c = quote - np.maximum(intrinsic, 0.)
+    x = -np.abs(x)
+    # time values at the rounding level of in-the-money quotes leave the volatility undetermined
+    valid = (c > TIME_VALUE_TOL * quote) & (c < np.exp(0.5 * x))
+    res = np.full(c.shape, np.nan)
+    res[valid] = normalized_implied_volatility(x[valid], c[valid]) / np.sqrt(time_to_maturity[valid])
+    return res
@@ -0,0 +1,78 @@
+import threading
+from time import perf_counter
+
+
+class NullStage(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage(object):
+    __slots__ = ('collector', 'name', 'size', 'start')
+
+    def __init__(self, collector, name, size):
+        self.collector = collector
+        self.name = name
+        self.size = size
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.collector(self.name, perf_counter() - self.start, self.size)
+        return False
+
+
+def stage(collector, name, size=0):
+    """
+    Context manager timing one engine stage. Without a collector it is a shared no-op.
+    :param collector: None or callable collector(name, duration, size)
+    :param size: number of elements processed by the stage, e.g. chf evaluation points
+    """
+    if collector is None:
+        return NULL_STAGE
+    return Stage(collector, name, size)
+
+
+class StageCollector(object):
+    """
+    Collector aggregating calls, total and maximum duration and total size per stage. Engines report
+    the stages chf, cumulants, fft, cos and spline; one chf call is one evaluation of the characteristic
+    function on an array of the reported size. One collector can be shared between threads.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name, duration, size=0):
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = {'calls': 0, 'time': 0., 'max_time': 0., 'size': 0}
+            stats['calls'] += 1
+            stats['time'] += duration
+            stats['max_time'] = max(stats['max_time'], duration)
+            stats['size'] += size
+
+    def __getstate__(self):
+        with self._lock:
+            return {'stats': self.stats}
+
+    def __setstate__(self, state):
+        self.stats = state['stats']
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+        return self
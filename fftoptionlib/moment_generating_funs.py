@@ -1,36 +1,34 @@
-import autograd.numpy as np
-from scipy.special import gamma
-from autograd import grad
+from fftoptionlib.helper import LazyModule
+
+# autograd is only imported when an mgf is evaluated, e.g. for cumulants without a closed form
+np = LazyModule('autograd.numpy')
+autograd = LazyModule('autograd')
+special = LazyModule('scipy.special')
 
 
 def black_scholes_log_st_mgf(u, t, r, q, S0, sigma):
-    chf_xt = diffusion_mgf
-    return general_ln_st_mgf(u, t, r, q, S0, chf_xt, sigma=sigma)
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, diffusion_cgf, sigma))
 
 
 def merton_jump_log_st_mgf(u, t, r, q, S0, sigma, jump_rate, norm_m, norm_sig):
-    chf_xt = diffusion_with_cpp_normal_mgf
-    return general_ln_st_mgf(u, t, r, q, S0, chf_xt, sigma=sigma, jump_rate=jump_rate, norm_m=norm_m, norm_sig=norm_sig)
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, diffusion_with_cpp_normal_cgf, sigma, jump_rate, norm_m, norm_sig))
 
 
 def kou_jump_log_st_mgf(u, t, r, q, S0, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
-    mgf_xt = diffusion_with_cpp_double_exponential_mgf
-    return general_ln_st_mgf(u, t, r, q, S0, mgf_xt, sigma=sigma, jump_rate=jump_rate, exp_pos=exp_pos, exp_neg=exp_neg, prob_pos=prob_pos)
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, diffusion_with_cpp_double_exponential_cgf, sigma, jump_rate,
+                                    exp_pos, exp_neg, prob_pos))
 
 
 def poisson_log_st_mgf(u, t, r, q, S0, jump_rate):
-    mgf_xt = poisson_mgf
-    return general_ln_st_mgf(u, t, r, q, S0, mgf_xt, jump_rate=jump_rate)
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, poisson_cgf, jump_rate))
 
 
 def vg_log_st_mgf(u, t, r, q, S0, theta, v, sigma):
-    mgf_xt = vg_mgf
-    return general_ln_st_mgf(u, t, r, q, S0, mgf_xt, theta=theta, v=v, sigma=sigma)
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, vg_cgf, theta, v, sigma))
 
 
 def nig_log_st_mgf(u, t, r, q, S0, a, b, delta):
-    mgf_xt = nig_mgf
-    return general_ln_st_mgf(u, t, r, q, S0, mgf_xt, a=a, b=b, delta=delta)
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, nig_cgf, a, b, delta))
 
 
 def heston_log_st_mgf(u, t, r, q, S0, V0, theta, k, sigma, rho):
@@ -44,15 +42,34 @@ def heston_log_st_mgf(u, t, r, q, S0, V0, theta, k, sigma, rho):
 
 
 def cgmy_log_st_mgf(u, t, r, q, S0, c, g, m, y):
-    mgf_xt = cgmy_mgf
-    return general_ln_st_mgf(u, t, r, q, S0, mgf_xt, c=c, g=g, m=m, y=y)
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, cgmy_cgf, c, g, m, y))
 
 
 def general_ln_st_mgf(u, t, r, q, S0, mgf_xt, *args, **kwargs):
-    martingale_adjust = -(1 / t) * np.log(mgf_xt(1, t, *args, **kwargs))
-    normal_term = (np.log(S0) + (r - q + martingale_adjust) * t) * u
-    ln_st_mgf = np.exp(normal_term) * mgf_xt(u, t, *args, **kwargs)
-    return ln_st_mgf
+    """
+    mgf of ln(S_T) from the mgf of X_t, see general_ln_st_cgf
+    """
+    def cgf_xt(u, t, *args):
+        return clog(mgf_xt(u, t, *args, **kwargs))
+
+    return np.exp(general_ln_st_cgf(u, t, r, q, S0, cgf_xt, *args))
+
+
+def general_ln_st_cgf(u, t, r, q, S0, cgf_xt, *args):
+    """
+    log mgf of ln(S_T), see characteristic_funs.general_ln_st_exponent
+    """
+    return (np.log(S0) + (r - q) * t - cgf_xt(1, t, *args)) * u + cgf_xt(u, t, *args)
+
+
+def clog(z):
+    """
+    Log continued to negative reals, e.g. log(1 - theta v u - sigma^2 v u^2 / 2) of VG beyond the domain of its
+    mgf, which is the log chf at -1j u. Differentiable by autograd, unlike characteristic_funs.clog.
+    """
+    if np.all(np.real(z) > 0):
+        return np.log(z)
+    return np.log(z + 0j)
 
 
 def norm_mgf(u, norm_mean, norm_sig):
@@ -64,30 +81,50 @@ def double_exponential_mgf(u, exp_pos, exp_neg, prob_pos):
         (u - exp_pos) * (u + exp_neg))
 
 
+def poisson_cgf(u, t, jump_rate):
+    return t * jump_rate * (np.exp(u) - 1)
+
+
 def poisson_mgf(u, t, jump_rate):
-    return np.exp(t * jump_rate * (np.exp(u) - 1))
+    return np.exp(poisson_cgf(u, t, jump_rate))
+
+
+def diffusion_cgf(u, t, sigma):
+    return 0.5 * t * (u ** 2) * (sigma ** 2)
 
 
 def diffusion_mgf(u, t, sigma):
-    return np.exp(0.5 * t * (u ** 2) * (sigma ** 2))
+    return np.exp(diffusion_cgf(u, t, sigma))
 
 
 def vg_cgm_mgf(u, t, c, g, m):
     return ((g * m) / (g * m + (m - g) * u - u ** 2)) ** (c * t)
 
 
+def vg_cgf(u, t, theta, v, sigma):
+    return -t / v * clog(1 - theta * v * u - 0.5 * (sigma ** 2) * v * (u ** 2))
+
+
 def vg_mgf(u, t, theta, v, sigma):
     return (1 - u * theta * v + 0.5 * (sigma ** 2) * (-u ** 2) * v) ** (-t / v)
 
 
+def cgmy_cgf(u, t, c, g, m, y):
+    return c * t * special.gamma(-y) * ((m - u) ** y - m ** y + (g + u) ** y - g ** y)
+
+
 def cgmy_mgf(u, t, c, g, m, y):
-    return np.exp(c * t * gamma(-y) * ((m - u) ** y - m ** y + (g + u) ** y - g ** y))
+    return np.exp(cgmy_cgf(u, t, c, g, m, y))
 
 
-def nig_mgf(u, t, a, b, delta):
+def nig_cgf(u, t, a, b, delta):
     sqa = np.sqrt(a ** 2 - (b + u) ** 2)
     sqb = np.sqrt(a ** 2 - b ** 2)
-    return np.exp(-delta * t * (sqa - sqb))
+    return -delta * t * (sqa - sqb)
+
+
+def nig_mgf(u, t, a, b, delta):
+    return np.exp(nig_cgf(u, t, a, b, delta))
 
 
 def parameter_to_cgm(theta, v, sigma):
@@ -99,20 +136,36 @@ def parameter_to_cgm(theta, v, sigma):
     return c, g, m
 
 
+def cpp_normal_cgf(u, t, jump_rate, norm_m, norm_sig):
+    return t * jump_rate * (norm_mgf(u, norm_m, norm_sig) - 1)
+
+
 def cpp_normal_mgf(u, t, jump_rate, norm_m, norm_sig):
-    return np.exp(t * jump_rate * (norm_mgf(u, norm_m, norm_sig) - 1))
+    return np.exp(cpp_normal_cgf(u, t, jump_rate, norm_m, norm_sig))
+
+
+def cpp_double_exponential_cgf(u, t, jump_rate, exp_pos, exp_neg, prob_pos):
+    return t * jump_rate * (double_exponential_mgf(u, exp_pos, exp_neg, prob_pos) - 1)
 
 
 def cpp_double_exponential_mgf(u, t, jump_rate, exp_pos, exp_neg, prob_pos):
-    return np.exp(t * jump_rate * (double_exponential_mgf(u, exp_pos, exp_neg, prob_pos) - 1))
+    return np.exp(cpp_double_exponential_cgf(u, t, jump_rate, exp_pos, exp_neg, prob_pos))
+
+
+def diffusion_with_cpp_normal_cgf(u, t, sigma, jump_rate, norm_m, norm_sig):
+    return diffusion_cgf(u, t, sigma) + cpp_normal_cgf(u, t, jump_rate, norm_m, norm_sig)
 
 
 def diffusion_with_cpp_normal_mgf(u, t, sigma, jump_rate, norm_m, norm_sig):
-    return diffusion_mgf(u, t, sigma) * cpp_normal_mgf(u, t, jump_rate, norm_m, norm_sig)
+    return np.exp(diffusion_with_cpp_normal_cgf(u, t, sigma, jump_rate, norm_m, norm_sig))
+
+
+def diffusion_with_cpp_double_exponential_cgf(u, t, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
+    return diffusion_cgf(u, t, sigma) + cpp_double_exponential_cgf(u, t, jump_rate, exp_pos, exp_neg, prob_pos)
 
 
 def diffusion_with_cpp_double_exponential_mgf(u, t, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
-    return diffusion_mgf(u, t, sigma) * cpp_double_exponential_mgf(u, t, jump_rate, exp_pos, exp_neg, prob_pos)
+    return np.exp(diffusion_with_cpp_double_exponential_cgf(u, t, sigma, jump_rate, exp_pos, exp_neg, prob_pos))
 
 
 def general_log_moneyness_mgf(u, strike, mgf, **kwargs):
@@ -127,8 +180,8 @@ def cumulants_from_mgf(mgf, *args, **kwargs):
     def dcgf(val):
         return cumulant_generating_fun(val, mgf, *args, **kwargs)
 
-    d_cgf_1 = grad(dcgf)
-    d_cgf_2 = grad(d_cgf_1)
-    d_cgf_3 = grad(d_cgf_2)
-    d_cgf_4 = grad(d_cgf_3)
+    d_cgf_1 = autograd.grad(dcgf)
+    d_cgf_2 = autograd.grad(d_cgf_1)
+    d_cgf_3 = autograd.grad(d_cgf_2)
+    d_cgf_4 = autograd.grad(d_cgf_3)
     return d_cgf_1(0.0), d_cgf_2(0.0), d_cgf_4(0.0)
@@ -1,8 +1,19 @@
 import copy
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 import numpy as np
-from pandas import Timestamp, DateOffset
+
+
+def to_timestamp(value):
+    """
+    datetime objects are kept as they are, anything else, e.g. a string, is parsed by pandas.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    from pandas import Timestamp
+    return Timestamp(value)
 
 
 class BasicOption(object):
@@ -21,8 +32,8 @@ class BasicOption(object):
 
     def set_time_to_maturity(self, time_to_maturity_in_days):
         if self.get_evaluation_date() is None:
-            self.set_evaluation_date(Timestamp(datetime.now().strftime('%Y-%m-%d')))
-        self.set_maturity_date(self.get_evaluation_date() + DateOffset(days=time_to_maturity_in_days))
+            self.set_evaluation_date(datetime.combine(date.today(), datetime.min.time()))
+        self.set_maturity_date(self.get_evaluation_date() + timedelta(days=time_to_maturity_in_days))
         return self
 
     def set_forward_price(self, forward_price):
@@ -42,11 +53,11 @@ class BasicOption(object):
         return self
 
     def set_evaluation_date(self, evaluation_date):
-        self._trade_date = Timestamp(evaluation_date)
+        self._trade_date = to_timestamp(evaluation_date)
         return self
 
     def set_maturity_date(self, maturity_date):
-        self._expiry_date = Timestamp(maturity_date)
+        self._expiry_date = to_timestamp(maturity_date)
         return self
 
     def get_underlying_close_price(self):
@@ -110,3 +121,80 @@ class BasicOption(object):
 
     def copy(self):
         return copy.deepcopy(self)
+
+
+class OptionBatch(object):
+    """
+    Columnar book of European options, one row per option. Scalars are broadcast to every row; dates are
+    datetime64 arrays, e.g. built from ISO strings, datetimes or numpy dates.
+    """
+
+    def __init__(self, strike, put_call, underlying_close_price, zero_rate, evaluation_date, expiry_date,
+                 dividend=0.0, forward_price=None, put_label='put'):
+        self.strike = np.atleast_1d(np.asarray(strike, dtype=float))
+        size = len(self.strike)
+        self.is_put = np.broadcast_to(np.asarray(put_call) == put_label, size)
+        self.underlying_close_price = np.broadcast_to(np.asarray(underlying_close_price, dtype=float), size)
+        self.zero_rate = np.broadcast_to(np.asarray(zero_rate, dtype=float), size)
+        self.dividend = np.broadcast_to(np.asarray(dividend, dtype=float), size)
+        self.evaluation_date = np.broadcast_to(np.asarray(evaluation_date, dtype='datetime64[D]'), size)
+        self.expiry_date = np.broadcast_to(np.asarray(expiry_date, dtype='datetime64[D]'), size)
+        if forward_price is not None:
+            forward_price = np.broadcast_to(np.asarray(forward_price, dtype=float), size)
+        self.forward_price = forward_price
+
+    @classmethod
+    def from_options(cls, options, strikes, put_calls, put_label='put'):
+        """
+        :param options: BasicOption instances, each with its own strike array in strikes and put_calls
+        """
+        options = list(options)
+        if any(option.get_exercise_type() != 'european' for option in options):
+            raise ValueError('OptionBatch only accept european options')
+        rows = [(option, strike, put_call) for option, strike, put_call in zip(options, strikes, put_calls)
+                for strike, put_call in zip(*np.broadcast_arrays(np.atleast_1d(strike), np.atleast_1d(put_call)))]
+        forward_price = None
+        if any(option._forward_price is not None for option, _, _ in rows):
+            forward_price = [option.get_forward_price() for option, _, _ in rows]
+        return cls([strike for _, strike, _ in rows],
+                   [put_call for _, _, put_call in rows],
+                   [option.get_underlying_close_price() for option, _, _ in rows],
+                   [option.get_zero_rate() for option, _, _ in rows],
+                   [np.datetime64(option.get_evaluation_date(), 'D') for option, _, _ in rows],
+                   [np.datetime64(option.get_expiry_date(), 'D') for option, _, _ in rows],
+                   dividend=[option.get_dividend() for option, _, _ in rows],
+                   forward_price=forward_price,
+                   put_label=put_label)
+
+    def __len__(self):
+        return len(self.strike)
+
+    def get_exercise_type(self):
+        return 'european'
+
+    def get_duration(self):
+        """
+        :return: time in days
+        """
+        return (self.expiry_date - self.evaluation_date).astype(int)
+
+    def get_time_to_maturity(self, annualization_factor=365):
+        return self.get_duration() / annualization_factor
+
+    def get_discount_bond_price(self):
+        return np.exp(-self.zero_rate * self.get_time_to_maturity())
+
+    def get_forward_price(self):
+        if self.forward_price is None:
+            return self.underlying_close_price * np.exp((self.zero_rate - self.dividend) * self.get_time_to_maturity())
+        return self.forward_price
+
+    def pricing_groups(self):
+        """
+        Rows sharing the model inputs (t, r, q, S0) are priced in one engine call.
+        :return: (groups x 4) array of t, r, q, S0 and the group of every row
+        """
+        inputs = np.column_stack([self.get_time_to_maturity(), self.zero_rate, self.dividend,
+                                  self.underlying_close_price])
+        groups, group_index = np.unique(inputs, axis=0, return_inverse=True)
+        return groups, group_index.reshape(-1)
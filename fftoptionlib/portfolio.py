@@ -0,0 +1,184 @@
+import hashlib
+import importlib
+import os
+import pickle
+
+import numpy as np
+
+from fftoptionlib.chf_cache import array_key
+from fftoptionlib.helper import call_to_put, to_array_with_same_dimension
+
+WORKER_CACHE_SIZE = 64
+
+REBUILT_MODULES = ('fftoptionlib.engine_class', 'fftoptionlib.process_class')
+
+INSTANCE_SETTINGS = ('fft_backend', 'collector')
+
+EXECUTORS = ('process', 'thread')
+
+_worker_instances = {}
+
+
+def pricer_to_job(pricer, strike, put_call, put_label='put', specs=None):
+    """
+    Compact, picklable description of one pricing job: engine and process are shipped as instance_spec tuples,
+    the option as its pricing inputs. Options that are not european ship the early exercise engine of the
+    pricer.
+    :param specs: dict of the specs built so far by id, so shared engines and processes are described once
+    """
+    if specs is None:
+        specs = {}
+    option = pricer.option
+    exercise_type = option.get_exercise_type()
+    if exercise_type == 'european':
+        engine = pricer.get_pricing_engine()
+    else:
+        engine = pricer.get_early_exercise_engine()
+    strike, put_call = to_array_with_same_dimension(strike, put_call)
+    return (instance_spec(engine, specs),
+            instance_spec(pricer.get_log_st_process(), specs),
+            exercise_type,
+            option.get_time_to_maturity(),
+            option.get_zero_rate(),
+            option.get_dividend(),
+            option.get_underlying_close_price(),
+            option.get_discount_bond_price(),
+            option.get_forward_price(),
+            np.asarray(strike, dtype=float),
+            put_call == put_label)
+
+
+def instance_spec(instance, specs):
+    """
+    Engines and processes of fftoptionlib are described by (key, module, class name, parameters, settings) and
+    rebuilt from their parameter_names, which follow the order of the constructor; settings are the fft backend
+    and collector of engines. Other classes, e.g. processes defined by users, fall back to (key, None, None,
+    pickled instance, ()).
+    :return: spec, whose key identifies equal instances
+    """
+    res = specs.get(id(instance))
+    # the instance is kept next to its spec, so its id is not reused while specs is alive
+    if res is None:
+        cls = type(instance)
+        if cls.__module__ in REBUILT_MODULES and 'parameter_names' in vars(cls):
+            parameters = tuple(getattr(instance, name) for name in cls.parameter_names)
+            settings = tuple((name, getattr(instance, name)) for name in INSTANCE_SETTINGS
+                             if getattr(instance, name, None) is not None)
+            key = (cls.__module__, cls.__qualname__, tuple(array_key(item) for item in parameters),
+                   bytes_key(pickle.dumps(settings, pickle.HIGHEST_PROTOCOL)) if settings else None)
+            spec = (key, cls.__module__, cls.__qualname__, parameters, settings)
+        else:
+            data = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+            spec = (('pickle', bytes_key(data)), None, None, data, ())
+        res = specs[id(instance)] = instance, spec
+    return res[1]
+
+
+def bytes_key(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def rebuild_instance(spec):
+    _, module, class_name, parameters, settings = spec
+    if module is None:
+        return pickle.loads(parameters)
+    instance = getattr(importlib.import_module(module), class_name)(*parameters)
+    for name, value in settings:
+        setattr(instance, name, value)
+    return instance
+
+
+def cached_instance(spec):
+    """
+    Engines and processes rebuilt in a worker are kept by the key of their spec, so grid plans and cumulants are
+    reused across jobs.
+    """
+    instance = _worker_instances.get(spec[0])
+    if instance is None:
+        if len(_worker_instances) >= WORKER_CACHE_SIZE:
+            _worker_instances.clear()
+        instance = _worker_instances[spec[0]] = rebuild_instance(spec)
+    return instance
+
+
+def price_job(job):
+    engine_spec, process_spec, exercise_type, t, r, q, S0, discount_bond_price, forward_price, strike, is_put = job
+    engine = cached_instance(engine_spec)
+    process = cached_instance(process_spec)
+    if exercise_type != 'european':
+        # see FourierPricer.calc_price
+        return engine.price(strike=strike, is_put=is_put, t=t, r=r, q=q, S0=S0, chf_ln_st=process,
+                            exercise_type=exercise_type)
+    call_prices = np.array(engine(strike=strike, t=t, r=r, q=q, S0=S0, chf_ln_st=process), dtype=float)
+    return call_to_put(call_prices, is_put, strike, discount_bond_price, forward_price, True)
+
+
+def price_chunk(jobs):
+    return np.concatenate([price_job(job) for job in jobs])
+
+
+def price_portfolio_threads(pricers, strikes, put_calls, put_label, max_workers):
+    """
+    Price the pricers as they are, engines and processes shared between threads: processes are only read by
+    the engines and numpy releases the GIL in the large array operations.
+    """
+    def price_pricer(args):
+        pricer, strike, put_call = args
+        return np.atleast_1d(np.asarray(pricer.calc_price(strike, put_call, put_label), dtype=float))
+
+    items = list(zip(pricers, strikes, put_calls))
+    if max_workers == 1 or len(items) <= 1:
+        pricer_prices = list(map(price_pricer, items))
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers) as executor:
+            pricer_prices = list(executor.map(price_pricer, items))
+    offsets = np.concatenate([[0], np.cumsum([len(prices) for prices in pricer_prices], dtype=int)])
+    return np.concatenate(pricer_prices) if pricer_prices else np.empty(0), offsets
+
+
+def price_portfolio(pricers, strikes, put_calls, put_label='put', max_workers=None, chunk_size=None,
+                    executor='process'):
+    """
+    Price many FourierPricer instances over a process pool, or a thread pool.
+    :param strikes: one strike array per pricer, put_calls likewise
+    :param max_workers: number of worker processes or threads, 1 prices in the calling thread
+    :param chunk_size: jobs per task of the process pool, by default about four tasks per worker
+    :param executor: 'process', engines and processes are rebuilt in the workers with their settings, whose
+    collectors then collect in the workers, or 'thread', the pricers are priced as they are and may share engines
+    and processes
+    :return: prices of all pricers in one array and offsets, pricer i owns prices[offsets[i]:offsets[i + 1]]
+    """
+    if executor not in EXECUTORS:
+        raise ValueError('executor only accept process or thread')
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if executor == 'thread':
+        return price_portfolio_threads(pricers, strikes, put_calls, put_label, max_workers)
+    specs = {}
+    jobs = [pricer_to_job(pricer, strike, put_call, put_label, specs)
+            for pricer, strike, put_call in zip(pricers, strikes, put_calls)]
+    offsets = np.concatenate([[0], np.cumsum([len(job[-1]) for job in jobs], dtype=int)])
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(jobs) // (4 * max_workers)))
+    # jobs sharing engine and process land in the same chunk, where the worker cache hits
+    interned = {}
+    instance_ids = [(interned.setdefault(job[0][0], len(interned)), interned.setdefault(job[1][0], len(interned)))
+                    for job in jobs]
+    order = sorted(range(len(jobs)), key=instance_ids.__getitem__)
+    chunks = [order[i:i + chunk_size] for i in range(0, len(order), chunk_size)]
+    chunk_jobs = [[jobs[i] for i in chunk] for chunk in chunks]
+    if max_workers == 1 or len(chunks) <= 1:
+        chunk_prices = map(price_chunk, chunk_jobs)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers) as executor:
+            chunk_prices = list(executor.map(price_chunk, chunk_jobs))
+    prices = np.empty(offsets[-1])
+    for chunk, one_chunk_prices in zip(chunks, chunk_prices):
+        start = 0
+        for i in chunk:
+            end = start + offsets[i + 1] - offsets[i]
+            prices[offsets[i]:offsets[i + 1]] = one_chunk_prices[start:end]
+            start = end
+    return prices, offsets
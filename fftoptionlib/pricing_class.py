@@ -1,10 +1,22 @@
-from .helper import call_to_put
+import numpy as np
+
+from .engine_class import BarrierEngine, EarlyExerciseCosineEngine
+from .helper import call_to_put, call_greeks_to_put, to_array_with_same_dimension
+
+
+def check_european(option, method):
+    exercise_type = option.get_exercise_type()
+    if exercise_type != 'european':
+        raise ValueError('{} only accept european options, use calc_price for {} options'.format(
+            method, exercise_type))
 
 
 class FourierPricer(object):
     def __init__(self, option=None):
         self.option = option
         self._pricing_engine = None
+        self._early_exercise_engine = None
+        self._barrier_engine = None
         self._log_st_process = None
 
     def set_log_st_process(self, log_st_process):
@@ -18,10 +30,52 @@ class FourierPricer(object):
     def get_pricing_engine(self):
         return self._pricing_engine
 
+    def set_early_exercise_engine(self, early_exercise_engine):
+        """
+        :param early_exercise_engine: engine of options whose exercise type is not european, see
+        EarlyExerciseCosineEngine
+        """
+        self._early_exercise_engine = early_exercise_engine
+        return self
+
+    def get_early_exercise_engine(self):
+        if self._early_exercise_engine is None:
+            if isinstance(self._pricing_engine, EarlyExerciseCosineEngine):
+                return self._pricing_engine
+            self._early_exercise_engine = EarlyExerciseCosineEngine(2 ** 9, 10)
+        return self._early_exercise_engine
+
+    def set_barrier_engine(self, barrier_engine):
+        """
+        :param barrier_engine: engine of knock-out options, see BarrierEngine
+        """
+        self._barrier_engine = barrier_engine
+        return self
+
+    def get_barrier_engine(self):
+        if self._barrier_engine is None:
+            if isinstance(self._pricing_engine, BarrierEngine):
+                return self._pricing_engine
+            self._barrier_engine = BarrierEngine(2 ** 12, 10)
+        return self._barrier_engine
+
     def get_log_st_process(self):
         return self._log_st_process
 
     def calc_price(self, strike, put_call, put_label='put'):
+        exercise_type = self.option.get_exercise_type()
+        if exercise_type != 'european':
+            strike, put_call = to_array_with_same_dimension(strike, put_call)
+            return self.get_early_exercise_engine().price(
+                strike=strike,
+                is_put=put_call == put_label,
+                t=self.option.get_time_to_maturity(),
+                r=self.option.get_zero_rate(),
+                q=self.option.get_dividend(),
+                S0=self.option.get_underlying_close_price(),
+                chf_ln_st=self._log_st_process,
+                exercise_type=exercise_type,
+            )
         call_prices = self._pricing_engine(
             strike=strike,
             r=self.option.get_zero_rate(),
@@ -34,3 +88,86 @@ class FourierPricer(object):
             call_prices, put_call, strike,
             self.option.get_discount_bond_price(), self.option.get_forward_price(), put_label)
         return res
+
+    def calc_barrier_price(self, strike, put_call, barrier, barrier_type, monitoring_dates, put_label='put'):
+        """
+        :param barrier_type: 'down-and-out' or 'up-and-out'
+        :param monitoring_dates: number of equally spaced monitoring dates, the last one at expiry
+        :return: prices of knock-out options
+        """
+        strike, put_call = to_array_with_same_dimension(strike, put_call)
+        return self.get_barrier_engine().price(
+            strike=strike,
+            is_put=put_call == put_label,
+            t=self.option.get_time_to_maturity(),
+            r=self.option.get_zero_rate(),
+            q=self.option.get_dividend(),
+            S0=self.option.get_underlying_close_price(),
+            chf_ln_st=self._log_st_process,
+            barrier=barrier,
+            barrier_type=barrier_type,
+            monitoring_dates=monitoring_dates,
+        )
+
+    def calc_batch_price(self, option_batch=None):
+        """
+        :param option_batch: OptionBatch, the option of the pricer by default
+        :return: price of every row
+        """
+        if option_batch is None:
+            option_batch = self.option
+        check_european(option_batch, 'calc_batch_price')
+        call_prices = self._pricing_engine.price_batch(option_batch, self._log_st_process)
+        put_prices = call_prices - option_batch.get_discount_bond_price() * (
+            option_batch.get_forward_price() - option_batch.strike)
+        return np.where(option_batch.is_put, put_prices, call_prices)
+
+    def stream_price(self, spots, strike, put_call, put_label='put'):
+        """
+        Reprice on spot ticks, everything else of the option fixed. The model part of the pricing is done once,
+        before the first tick, see the spot_pricer of the engines.
+        :param spots: iterable of spot prices, e.g. a tick stream
+        :return: generator of prices, one array per spot
+        """
+        check_european(self.option, 'stream_price')
+        S0_initial = self.option.get_underlying_close_price()
+        spot_prices = self._pricing_engine.spot_pricer(
+            strike=strike,
+            t=self.option.get_time_to_maturity(),
+            r=self.option.get_zero_rate(),
+            q=self.option.get_dividend(),
+            S0=S0_initial,
+            chf_ln_st=self._log_st_process,
+        )
+        discount_bond_price = self.option.get_discount_bond_price()
+        # the forward of the option, explicit or not, moves with the spot
+        forward_per_spot = self.option.get_forward_price() / S0_initial
+
+        def prices():
+            for S0 in spots:
+                yield call_to_put(
+                    spot_prices(S0), put_call, strike,
+                    discount_bond_price, S0 * forward_per_spot, put_label)
+
+        return prices()
+
+    def calc_greeks(self, strike, put_call, put_label='put'):
+        """
+        :return: dict of price, delta, gamma, theta and d_<parameter> for every parameter of the process
+        """
+        check_european(self.option, 'calc_greeks')
+        S0 = self.option.get_underlying_close_price()
+        r = self.option.get_zero_rate()
+        q = self.option.get_dividend()
+        call_greeks = self._pricing_engine.calc_greeks(
+            strike=strike,
+            r=r,
+            t=self.option.get_time_to_maturity(),
+            q=q,
+            S0=S0,
+            chf_ln_st=self._log_st_process,
+        )
+        res = call_greeks_to_put(
+            call_greeks, put_call, strike,
+            self.option.get_discount_bond_price(), self.option.get_forward_price(), S0, r, q, put_label)
+        return res
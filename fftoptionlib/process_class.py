@@ -1,4 +1,7 @@
 import abc
+import copy
+
+from fftoptionlib.chf_cache import array_key
 
 from fftoptionlib.characteristic_funs import (
     black_schole_log_st_chf,
@@ -9,6 +12,29 @@ from fftoptionlib.characteristic_funs import (
     nig_log_st_chf,
     heston_log_st_chf,
     cgmy_log_st_chf,
+    heston_log_st_exponent,
+    diffusion_exponent,
+    diffusion_with_cpp_normal_exponent,
+    diffusion_with_cpp_double_exponential_exponent,
+    poisson_exponent,
+    vg_exponent,
+    nig_exponent,
+    cgmy_exponent,
+    general_ln_st_exponent,
+    martingale_correction,
+    cexp,
+    clog,
+    kernel_chf,
+)
+from fftoptionlib.cumulant_funs import (
+    black_scholes_cumulants,
+    merton_jump_cumulants,
+    kou_jump_cumulants,
+    poisson_cumulants,
+    vg_cumulants,
+    nig_cumulants,
+    heston_cumulants,
+    cgmy_cumulants,
 )
 from fftoptionlib.moment_generating_funs import (
     black_scholes_log_st_mgf,
@@ -19,8 +45,12 @@ from fftoptionlib.moment_generating_funs import (
     heston_log_st_mgf,
     cgmy_log_st_mgf,
     vg_log_st_mgf,
+    cumulants_from_mgf,
 )
 
+CUMULANTS_CACHE_SIZE = 256
+MARTINGALE_CACHE_SIZE = 256
+
 
 def chf_and_mgf_switch(chf, mgf, type):
     if type == 'chf':
@@ -32,8 +62,21 @@ def chf_and_mgf_switch(chf, mgf, type):
 
 
 class LogSt(abc.ABC):
+    parameter_names = None
+    # closed forms of ln(S_T), called with the parameters in the order of parameter_names
+    log_st_chf = None
+    log_st_mgf = None
+    # log chf of the Levy process X_t with ln(S_T) = ln(S0) + (r - q) t + correction + X_t, called as
+    # exponent_xt(u, t, *parameters), or log_st_exponent(u, t, r, q, S0, *parameters) for other processes
+    exponent_xt = None
+    log_st_exponent = None
+    # the chf of log(S_{t + dt} / S_t) does not depend on the state at t
+    independent_increments = True
+
     def __init__(self, type=None):
         self._type = type
+        self._cumulants_cache = {}
+        self._martingale_cache = {}
 
     def set_type(self, type):
         self._type = type
@@ -41,19 +84,129 @@ class LogSt(abc.ABC):
 
     @property
     def type(self):
-        return self._type
+        return self.__dict__.get('_type')
+
+    def chf(self, u, t, r, q, S0):
+        """
+        chf of ln(S_T). Unlike set_type('chf') it leaves the process unchanged, so one process can be shared by
+        threads.
+        """
+        if self.log_st_chf is not None:
+            kernel = kernel_chf(self.log_st_chf)
+            if kernel is not self.log_st_chf:
+                return kernel(u, t, r, q, S0, *self.get_parameters())
+        if self.exponent_xt is not None or self.log_st_exponent is not None:
+            return cexp(self.log_chf(u, t, r, q, S0))
+        if self.log_st_chf is None:
+            return self.call_as('chf', u, t, r, q, S0)
+        return self.log_st_chf(u, t, r, q, S0, *self.get_parameters())
+
+    def log_chf(self, u, t, r, q, S0):
+        """
+        log chf of ln(S_T), exponentiated once by chf. The martingale correction is cached per parameters and t.
+        """
+        if self.exponent_xt is not None:
+            return general_ln_st_exponent(u, t, r, q, S0, self.exponent_xt, *self.get_parameters(),
+                                          correction=self.martingale_correction(t))
+        if self.log_st_exponent is not None:
+            return self.log_st_exponent(u, t, r, q, S0, *self.get_parameters())
+        return clog(self.chf(u, t, r, q, S0))
+
+    def martingale_correction(self, t):
+        """
+        :return: -log E[exp(X_t)] of exponent_xt
+        """
+        key = (tuple(array_key(item) for item in self.get_parameters()), array_key(t))
+        # created here too, for subclasses that do not call LogSt.__init__
+        cache = self.__dict__.setdefault('_martingale_cache', {})
+        res = cache.get(key)
+        if res is None:
+            if len(cache) >= MARTINGALE_CACHE_SIZE:
+                cache.clear()
+            res = cache[key] = martingale_correction(t, self.exponent_xt, *self.get_parameters())
+        return res
+
+    def mgf(self, u, t, r, q, S0):
+        """
+        mgf of ln(S_T), see chf
+        """
+        if self.log_st_mgf is None:
+            return self.call_as('mgf', u, t, r, q, S0)
+        return self.log_st_mgf(u, t, r, q, S0, *self.get_parameters())
+
+    def call_as(self, kind, u, t, r, q, S0):
+        """
+        Fallback of chf and mgf for processes without closed forms that only implement __call__, on a copy so
+        the type of the process is left unchanged.
+        """
+        if type(self).__call__ is LogSt.__call__:
+            raise NotImplementedError('{} has no closed form of its {} and does not implement __call__'.format(
+                type(self).__name__, kind))
+        return copy.copy(self).set_type(kind)(u, t, r, q, S0)
+
+    def __call__(self, u, t, r, q, S0):
+        return chf_and_mgf_switch(self.chf, self.mgf, self.type)(u, t, r, q, S0)
+
+    def get_parameter_names(self):
+        if self.parameter_names is None:
+            return tuple(sorted(name for name in vars(self) if not name.startswith('_')))
+        return self.parameter_names
+
+    def get_parameters(self):
+        return tuple(getattr(self, name) for name in self.get_parameter_names())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cumulants_cache'] = {}
+        state['_martingale_cache'] = {}
+        return state
+
+    def copy(self, **parameters):
+        res = copy.copy(self)
+        res._cumulants_cache = {}
+        res._martingale_cache = {}
+        for name, value in parameters.items():
+            setattr(res, name, value)
+        return res
+
+    def calc_cumulants(self, t, r, q):
+        """
+        Fallback for processes without closed-form cumulants: automatic differentiation of the mgf.
+        :return: c1, c2, c4 of ln(S_T / S0)
+        """
+        return cumulants_from_mgf(self.mgf, t=t, r=r, q=q, S0=1.0)
+
+    def cumulants(self, t, r, q):
+        key = (tuple(array_key(item) for item in self.get_parameters()), array_key(t), array_key(r), array_key(q))
+        cache = self.__dict__.setdefault('_cumulants_cache', {})
+        res = cache.get(key)
+        if res is None:
+            if len(cache) >= CUMULANTS_CACHE_SIZE:
+                cache.clear()
+            res = cache[key] = self.calc_cumulants(t, r, q)
+        return res
 
 
 class BlackScholes(LogSt):
+    parameter_names = ('sigma',)
+    log_st_chf = staticmethod(black_schole_log_st_chf)
+    log_st_mgf = staticmethod(black_scholes_log_st_mgf)
+    exponent_xt = staticmethod(diffusion_exponent)
+
     def __init__(self, sigma):
         super(BlackScholes, self).__init__()
         self.sigma = sigma
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(black_schole_log_st_chf, black_scholes_log_st_mgf, self.type)(u, t, r, q, S0, self.sigma)
+    def calc_cumulants(self, t, r, q):
+        return black_scholes_cumulants(t, r, q, self.sigma)
 
 
 class MertonJump(LogSt):
+    parameter_names = ('sigma', 'jump_rate', 'norm_m', 'norm_sig')
+    log_st_chf = staticmethod(merton_jump_log_st_chf)
+    log_st_mgf = staticmethod(merton_jump_log_st_mgf)
+    exponent_xt = staticmethod(diffusion_with_cpp_normal_exponent)
+
     def __init__(self, sigma, jump_rate, norm_m, norm_sig):
         self.sigma = sigma
         self.jump_rate = jump_rate
@@ -61,11 +214,16 @@ class MertonJump(LogSt):
         self.norm_sig = norm_sig
         super(MertonJump, self).__init__()
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(merton_jump_log_st_chf, merton_jump_log_st_mgf, self.type)(u, t, r, q, S0, self.sigma, self.jump_rate, self.norm_m, self.norm_sig)
+    def calc_cumulants(self, t, r, q):
+        return merton_jump_cumulants(t, r, q, self.sigma, self.jump_rate, self.norm_m, self.norm_sig)
 
 
 class KouJump(LogSt):
+    parameter_names = ('sigma', 'jump_rate', 'exp_pos', 'exp_neg', 'prob_pos')
+    log_st_chf = staticmethod(kou_jump_log_st_chf)
+    log_st_mgf = staticmethod(kou_jump_log_st_mgf)
+    exponent_xt = staticmethod(diffusion_with_cpp_double_exponential_exponent)
+
     def __init__(self, sigma, jump_rate, exp_pos, exp_neg, prob_pos):
         self.sigma = sigma
         self.jump_rate = jump_rate
@@ -74,46 +232,63 @@ class KouJump(LogSt):
         self.prob_pos = prob_pos
         super(KouJump, self).__init__()
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(kou_jump_log_st_chf, kou_jump_log_st_mgf, self.type)(u, t, r, q, S0, self.sigma,
-                                                                                       self.jump_rate,
-                                                                                       self.exp_pos,
-                                                                                       self.exp_neg,
-                                                                                       self.prob_pos)
+    def calc_cumulants(self, t, r, q):
+        return kou_jump_cumulants(t, r, q, self.sigma, self.jump_rate, self.exp_pos, self.exp_neg, self.prob_pos)
 
 
 class Poisson(LogSt):
+    parameter_names = ('jump_rate',)
+    log_st_chf = staticmethod(poisson_log_st_chf)
+    log_st_mgf = staticmethod(poisson_log_st_mgf)
+    exponent_xt = staticmethod(poisson_exponent)
+
     def __init__(self, jump_rate):
         self.jump_rate = jump_rate
         super(Poisson, self).__init__()
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(poisson_log_st_chf, poisson_log_st_mgf, self.type)(u, t, r, q, S0, self.jump_rate)
+    def calc_cumulants(self, t, r, q):
+        return poisson_cumulants(t, r, q, self.jump_rate)
 
 
 class VarianceGamma(LogSt):
+    parameter_names = ('theta', 'v', 'sigma')
+    log_st_chf = staticmethod(vg_log_st_chf)
+    log_st_mgf = staticmethod(vg_log_st_mgf)
+    exponent_xt = staticmethod(vg_exponent)
+
     def __init__(self, theta, v, sigma):
         self.theta = theta
         self.v = v
         self.sigma = sigma
         super(VarianceGamma, self).__init__()
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(vg_log_st_chf, vg_log_st_mgf, self.type)(u, t, r, q, S0, self.theta, self.v, self.sigma)
+    def calc_cumulants(self, t, r, q):
+        return vg_cumulants(t, r, q, self.theta, self.v, self.sigma)
 
 
 class NIG(LogSt):
+    parameter_names = ('a', 'b', 'delta')
+    log_st_chf = staticmethod(nig_log_st_chf)
+    log_st_mgf = staticmethod(nig_log_st_mgf)
+    exponent_xt = staticmethod(nig_exponent)
+
     def __init__(self, a, b, delta):
         self.a = a
         self.b = b
         self.delta = delta
         super(NIG, self).__init__()
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(nig_log_st_chf, nig_log_st_mgf, self.type)(u, t, r, q, S0, self.a, self.b, self.delta)
+    def calc_cumulants(self, t, r, q):
+        return nig_cumulants(t, r, q, self.a, self.b, self.delta)
 
 
 class Heston(LogSt):
+    parameter_names = ('V0', 'theta', 'k', 'sigma', 'rho')
+    log_st_chf = staticmethod(heston_log_st_chf)
+    log_st_mgf = staticmethod(heston_log_st_mgf)
+    log_st_exponent = staticmethod(heston_log_st_exponent)
+    independent_increments = False
+
     def __init__(self, V0, theta, k, sigma, rho):
         self.V0 = V0
         self.theta = theta
@@ -122,15 +297,16 @@ class Heston(LogSt):
         self.rho = rho
         super(Heston, self).__init__()
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(heston_log_st_chf, heston_log_st_mgf, self.type)(u, t, r, q, S0, self.V0,
-                                                                                   self.theta,
-                                                                                   self.k,
-                                                                                   self.sigma,
-                                                                                   self.rho)
+    def calc_cumulants(self, t, r, q):
+        return heston_cumulants(t, r, q, self.V0, self.theta, self.k, self.sigma, self.rho)
 
 
 class CGMY(LogSt):
+    parameter_names = ('c', 'g', 'm', 'y')
+    log_st_chf = staticmethod(cgmy_log_st_chf)
+    log_st_mgf = staticmethod(cgmy_log_st_mgf)
+    exponent_xt = staticmethod(cgmy_exponent)
+
     def __init__(self, c, g, m, y):
         self.c = c
         self.g = g
@@ -138,8 +314,5 @@ class CGMY(LogSt):
         self.y = y
         super(CGMY, self).__init__()
 
-    def __call__(self, u, t, r, q, S0):
-        return chf_and_mgf_switch(cgmy_log_st_chf, cgmy_log_st_mgf, self.type)(u, t, r, q, S0, self.c,
-                                                                               self.g,
-                                                                               self.m,
-                                                                               self.y)
+    def calc_cumulants(self, t, r, q):
+        return cgmy_cumulants(t, r, q, self.c, self.g, self.m, self.y)
@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+from scipy.stats import norm
+
+from fftoptionlib.engine_class import BarrierEngine, CosineEngine
+from fftoptionlib.process_class import (
+    BlackScholes,
+    CGMY,
+    Heston,
+    KouJump,
+    NIG,
+)
+
+
+def black_put(K, F, sigma, t, r):
+    d1 = (np.log(F / K) + sigma ** 2 * t / 2) / (sigma * np.sqrt(t))
+    d2 = d1 - sigma * np.sqrt(t)
+    return np.exp(-r * t) * (K * norm.cdf(-d2) - F * norm.cdf(-d1)), np.exp(-r * t) * norm.cdf(-d2)
+
+
+class TestBarrierPricer(unittest.TestCase):
+    def setUp(self):
+        self.kwargs = dict(t=1, r=0.05, q=0.02, S0=100.)
+        self.strike = np.array([90., 100., 110.])
+
+    def test_single_date_black_scholes(self):
+        sigma, H = 0.25, 85.
+        F = 100 * np.exp(0.03)
+        put, _ = black_put(self.strike, F, sigma, 1, 0.05)
+        put_h, digital_h = black_put(H, F, sigma, 1, 0.05)
+        engine = BarrierEngine(2 ** 14, 10)
+        res = engine.price(self.strike, True, chf_ln_st=BlackScholes(sigma), barrier=H, barrier_type='down-and-out',
+                           monitoring_dates=1, **self.kwargs)
+        npt.assert_array_almost_equal(res, put - put_h - (self.strike - H) * digital_h, 5)
+        # up-and-out call, (S - K)^+ below 120
+        H = 120.
+        put_h, digital_h = black_put(H, F, sigma, 1, 0.05)
+        call = put + np.exp(-0.05) * (F - self.strike)
+        call_h = put_h + np.exp(-0.05) * (F - H)
+        res = engine.price(self.strike, False, chf_ln_st=BlackScholes(sigma), barrier=H, barrier_type='up-and-out',
+                           monitoring_dates=1, **self.kwargs)
+        npt.assert_array_almost_equal(res, call - call_h - (H - self.strike) * (np.exp(-0.05) - digital_h), 5)
+
+    def test_nig_monthly_monitoring(self):
+        # Fang and Oosterlee (2009), down-and-out put under NIG with 12 monitoring dates
+        res = BarrierEngine(2 ** 14, 10).price(100, True, chf_ln_st=NIG(15., -5., 0.5), barrier=80.,
+                                               barrier_type='down-and-out', monitoring_dates=12, **self.kwargs)
+        self.assertAlmostEqual(res[0], 2.139931117, 5)
+
+    def test_far_barrier_matches_european(self):
+        engine = BarrierEngine(2 ** 12, 10)
+        is_put = np.array([True, False, False])
+        for process in [KouJump(0.1, 3., 25., 25., 0.3), CGMY(1., 5., 5., 0.5)]:
+            european = CosineEngine(2 ** 12, 12)(self.strike, chf_ln_st=process, **self.kwargs)
+            european = np.where(is_put, european - np.exp(-0.05) * (100 * np.exp(0.03) - self.strike), european)
+            for barrier, barrier_type in [(1., 'down-and-out'), (1e4, 'up-and-out')]:
+                res = engine.price(self.strike, is_put, chf_ln_st=process, barrier=barrier, barrier_type=barrier_type,
+                                   monitoring_dates=12, **self.kwargs)
+                npt.assert_array_almost_equal(res, european, 4)
+
+    def test_knock_out_is_cheaper_than_european(self):
+        engine = BarrierEngine(2 ** 12, 10)
+        process = CGMY(1., 5., 5., 0.5)
+        european = CosineEngine(2 ** 12, 12)(self.strike, chf_ln_st=process, **self.kwargs)
+        daily = engine.price(self.strike, False, chf_ln_st=process, barrier=95., barrier_type='down-and-out',
+                             monitoring_dates=252, **self.kwargs)
+        monthly = engine.price(self.strike, False, chf_ln_st=process, barrier=95., barrier_type='down-and-out',
+                               monitoring_dates=12, **self.kwargs)
+        self.assertTrue(np.all(daily < monthly))
+        self.assertTrue(np.all(monthly < european))
+        self.assertTrue(np.all(daily > 0))
+
+    def test_grid_plan_reuse(self):
+        engine = BarrierEngine(2 ** 10, 10)
+        process = NIG(15., -5., 0.5)
+        engine.price(self.strike, True, chf_ln_st=process, barrier=80., barrier_type='down-and-out',
+                     monitoring_dates=12, **self.kwargs)
+        grid_plan = engine._grid_plan[1]
+        self.assertEqual(grid_plan.x_arr[np.argmin(np.abs(grid_plan.x_arr))], 0)
+        engine.price(self.strike, True, chf_ln_st=process, barrier=80., barrier_type='down-and-out',
+                     monitoring_dates=4, **self.kwargs)
+        self.assertIs(engine._grid_plan[1], grid_plan)
+
+    def test_barrier_errors(self):
+        engine = BarrierEngine(2 ** 10, 10)
+        with self.assertRaises(ValueError):
+            engine.price(100, True, chf_ln_st=Heston(0.04, 0.04, 2, 0.5, -0.7), barrier=80.,
+                         barrier_type='down-and-out', monitoring_dates=12, **self.kwargs)
+        with self.assertRaises(ValueError):
+            engine.price(100, True, chf_ln_st=BlackScholes(0.2), barrier=80., barrier_type='down-and-in',
+                         monitoring_dates=12, **self.kwargs)
@@ -1,6 +1,13 @@
 import unittest
 
+import numpy as np
+import numpy.testing as npt
+
 from fftoptionlib.characteristic_funs import (
+    cexp,
+    clog,
+    cpow,
+    csqrt,
     black_schole_log_st_chf,
     merton_jump_log_st_chf,
     poisson_log_st_chf,
@@ -15,7 +22,12 @@ from fftoptionlib.characteristic_funs import (
     vg_chf,
     parameter_to_cgm,
     vg_log_st_chf,
-    nig_log_st_chf
+    nig_log_st_chf,
+    general_ln_st_chf,
+    general_ln_st_exponent,
+    diffusion_with_cpp_double_exponential_chf,
+    diffusion_with_cpp_double_exponential_exponent,
+    martingale_correction,
 )
 
 
@@ -104,3 +116,29 @@ class TestCharacteristicFunctions(unittest.TestCase):
         exp_res = -0.039178193810523385 - 0.09858914992954515j
         res = nig_log_st_chf(u, t, r, q, S, a, b, delta)
         self.assertAlmostEqual(exp_res, res)
+
+    def test_complex64_functions(self):
+        z = (np.linspace(-3, 3, 100) + 1j * np.linspace(-20, 20, 100)).astype(np.complex64)
+        z128 = z.astype(np.complex128)
+        for res, exp_res in [(cexp(z), np.exp(z128)), (clog(z), np.log(z128)), (csqrt(z), np.sqrt(z128)),
+                             (cpow(z, -1.7), z128 ** -1.7)]:
+            self.assertEqual(res.dtype, np.complex64)
+            npt.assert_allclose(res, exp_res, rtol=1e-5)
+        self.assertEqual(cexp(z128).dtype, np.complex128)
+
+    def test_general_ln_st_exponent(self):
+        u = np.linspace(0, 30, 61) - 1.5j
+        args = (0.2, 0.5, 10., 5., 0.4)
+        chf_xt = diffusion_with_cpp_double_exponential_chf
+        exp_res = np.exp(1j * u * (np.log(100.) + 0.01 * 0.5) - 1j * u * np.log(chf_xt(-1j, 0.5, *args))) * chf_xt(
+            u, 0.5, *args)
+        res = general_ln_st_exponent(u, 0.5, 0.02, 0.01, 100., diffusion_with_cpp_double_exponential_exponent, *args)
+        npt.assert_allclose(cexp(res), exp_res, rtol=1e-13)
+        correction = martingale_correction(0.5, diffusion_with_cpp_double_exponential_exponent, *args)
+        npt.assert_array_equal(general_ln_st_exponent(u, 0.5, 0.02, 0.01, 100.,
+                                                      diffusion_with_cpp_double_exponential_exponent, *args,
+                                                      correction=correction), res)
+        self.assertEqual(general_ln_st_exponent(u.astype(np.complex64), 0.5, 0.02, 0.01, 100.,
+                                                diffusion_with_cpp_double_exponential_exponent, *args).dtype,
+                         np.complex64)
+        npt.assert_allclose(general_ln_st_chf(u, 0.5, 0.02, 0.01, 100., chf_xt, *args), exp_res, rtol=1e-13)
@@ -0,0 +1,89 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.chf_cache import (
+    ChfCache,
+    cached_chf,
+    get_chf_cache,
+    set_chf_cache,
+)
+from fftoptionlib.engine_class import CosineEngine, FFTEngine, FractionFFTEngine
+from fftoptionlib.helper import read_only
+from fftoptionlib.process_class import Heston, NIG
+
+
+class TestChfCache(unittest.TestCase):
+    def setUp(self):
+        self.process = Heston(0.04, 0.04, 2, 0.5, -0.7)
+        self.u = np.linspace(0, 50, 257)
+
+    def tearDown(self):
+        set_chf_cache(None)
+
+    def test_hits_and_misses(self):
+        cache = set_chf_cache(2 ** 20)
+        self.assertIs(get_chf_cache(), cache)
+        res = cached_chf(self.u, 0.5, 0.02, 0.01, 100., self.process)
+        npt.assert_array_equal(res, self.process.set_type('chf')(self.u, 0.5, 0.02, q=0.01, S0=100.))
+        self.assertFalse(res.flags.writeable)
+        self.assertIs(cached_chf(self.u.copy(), 0.5, 0.02, 0.01, 100., self.process), res)
+        self.assertIsNot(cached_chf(self.u, 0.5, 0.02, 0.01, 101., self.process), res)
+        self.assertIsNot(cached_chf(self.u, 0.5, 0.02, 0.01, 100., self.process.copy(rho=-0.6)), res)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 3, 3))
+        self.assertEqual(stats['nbytes'], 3 * res.nbytes)
+
+    def test_read_only_grids_are_keyed_on_identity(self):
+        cache = set_chf_cache(2 ** 20)
+        u = read_only(self.u.copy())[0]
+        res = cached_chf(u, 0.5, 0.02, 0.01, 100., self.process)
+        self.assertIs(cached_chf(u, 0.5, 0.02, 0.01, 100., self.process), res)
+        other_u = read_only(2 * self.u)[0]
+        npt.assert_array_equal(cached_chf(other_u, 0.5, 0.02, 0.01, 100., self.process),
+                               self.process.set_type('chf')(other_u, 0.5, 0.02, q=0.01, S0=100.))
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_byte_cap_evicts_least_recently_used(self):
+        nbytes = self.u.size * 16
+        cache = set_chf_cache(ChfCache(2 * nbytes))
+        first = cached_chf(self.u, 0.5, 0.02, 0.01, 100., self.process)
+        cached_chf(self.u, 1.0, 0.02, 0.01, 100., self.process)
+        cached_chf(self.u, 0.5, 0.02, 0.01, 100., self.process)
+        cached_chf(self.u, 2.0, 0.02, 0.01, 100., self.process)
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions'], stats['nbytes']), (2, 1, 2 * nbytes))
+        self.assertIs(cached_chf(self.u, 0.5, 0.02, 0.01, 100., self.process), first)
+        cached_chf(np.linspace(0, 50, 1025), 0.5, 0.02, 0.01, 100., self.process)
+        self.assertEqual(cache.stats()['entries'], 2)
+        cache.clear()
+        self.assertEqual(cache.stats()['nbytes'], 0)
+
+    def test_engines_match_uncached(self):
+        strike = np.linspace(80, 120, 9)
+        engines = [FFTEngine(2 ** 12, 0.05, 1.5, 3), FractionFFTEngine(2 ** 10, 0.1, 0.005, 1.5, 3),
+                   CosineEngine(256, 12), CosineEngine(256, 12, batch=False), CosineEngine(64, None, tol=1e-6)]
+        exp_res = [engine(strike, 0.5, 0.02, 0.01, 100., self.process) for engine in engines]
+        cache = set_chf_cache(2 ** 24)
+        for _ in range(2):
+            for engine, exp_prices in zip(engines, exp_res):
+                npt.assert_array_equal(engine(strike, 0.5, 0.02, 0.01, 100., self.process), exp_prices)
+        stats = cache.stats()
+        # the per strike COS loop shares its grid between strikes
+        self.assertGreaterEqual(stats['hits'], stats['misses'] + len(strike))
+
+    def test_threads(self):
+        cache = set_chf_cache(2 ** 16)
+        processes = [NIG(15., -5., delta) for delta in np.linspace(0.3, 0.6, 8)]
+        exp_res = [process.set_type('chf')(self.u, 0.5, 0.02, q=0.01, S0=100.) for process in processes]
+
+        def check(i):
+            npt.assert_array_equal(cached_chf(self.u, 0.5, 0.02, 0.01, 100., processes[i % 8]), exp_res[i % 8])
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(check, range(400)))
+        stats = cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 400)
+        self.assertLessEqual(stats['nbytes'], 2 ** 16)
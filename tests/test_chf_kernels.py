@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.characteristic_funs import (
+    heston_log_st_chf,
+    kernel_chf,
+    norm_chf,
+    set_chf_kernels,
+)
+from fftoptionlib.process_class import (
+    BlackScholes,
+    CGMY,
+    Heston,
+    KouJump,
+    MertonJump,
+    NIG,
+    Poisson,
+    VarianceGamma,
+)
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+class TestChfKernels(unittest.TestCase):
+    def setUp(self):
+        self.processes = [BlackScholes(0.2), MertonJump(0.2, 0.5, -0.1, 0.15), KouJump(0.2, 0.5, 10., 5., 0.4),
+                          Poisson(0.5), VarianceGamma(-0.14, 0.2, 0.12), NIG(4., 0.3, 0.6),
+                          CGMY(0.1, 5., 5., 1.5), Heston(0.04, 0.04, 2, 0.5, -0.7)]
+        self.u = np.linspace(0, 100, 257)
+
+    def tearDown(self):
+        set_chf_kernels(None)
+
+    def assert_matches_numpy(self, *args):
+        for process in self.processes:
+            set_chf_kernels(None)
+            res = process.set_type('chf')(*args)
+            set_chf_kernels(False)
+            exp_res = process.set_type('chf')(*args)
+            self.assertEqual(np.shape(res), np.shape(exp_res))
+            self.assertEqual(np.asarray(res).dtype, np.asarray(exp_res).dtype)
+            npt.assert_allclose(res, exp_res, rtol=1e-12, atol=1e-14)
+
+    @unittest.skipIf(numba is None, 'numba is not installed')
+    def test_kernels_are_selected(self):
+        self.assertIsNot(kernel_chf(heston_log_st_chf), heston_log_st_chf)
+        self.assertIs(kernel_chf(norm_chf), norm_chf)
+
+    def test_kernels_match_numpy(self):
+        self.assert_matches_numpy(self.u, 0.5, 0.02, 0.01, 100.)
+        self.assert_matches_numpy(self.u, np.array([[0.1], [0.5], [2.]]), np.array([[0.01], [0.02], [0.03]]), 0.01, 100.)
+        self.assert_matches_numpy(np.array([0., -1j]), 0.5, 0.02, 0.01, 100.)
+        self.assert_matches_numpy(4, 1.5, 0.02, 0.01, 20.2)
+
+    def test_unsupported_inputs_use_numpy(self):
+        self.assert_matches_numpy(np.vstack([self.u, 2 * self.u]), 0.5, 0.02, 0.01, 100.)
+        self.assert_matches_numpy(self.u.astype(np.float32), 0.5, 0.02, 0.01, 100.)
+
+    def test_disabled_kernels(self):
+        set_chf_kernels(False)
+        self.assertIs(kernel_chf(heston_log_st_chf), heston_log_st_chf)
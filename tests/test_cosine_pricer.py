@@ -1,15 +1,23 @@
 import unittest
+import warnings
+
+import numpy as np
+import numpy.testing as npt
 
 from fftoptionlib.cosine_pricer import (
     cosin_vanilla_call,
+    continuation_coefficients,
     interval_a_and_b,
 )
+from fftoptionlib.engine_class import CosineEngine, EarlyExerciseCosineEngine
+from fftoptionlib.implied_volatility import normalized_black_call
 from fftoptionlib.moment_generating_funs import (
     cumulants_from_mgf,
     general_log_moneyness_mgf,
 )
 from fftoptionlib.process_class import (
     BlackScholes,
+    CGMY,
     Heston,
     VarianceGamma,
 )
@@ -117,3 +125,98 @@ class TestCosinePricer(unittest.TestCase):
         res = cosin_vanilla_call(N, strike, intv_a, intv_b, t, r, q, S0, VarianceGamma(theta, v, sigma).set_type('chf'))
         exp_res = 10.8289
         self.assertAlmostEqual(exp_res, res, 4)
+
+    def test_engine_batch_matches_reference(self):
+        S0, t, r, q = 100, 0.5, 0.03, 0.01
+        strike_arr = np.linspace(60, 140, 17)
+        process = Heston(0.04, 0.04, 2, 0.5, -0.7)
+        res = CosineEngine(256, 10)(strike_arr, t, r, q, S0, process)
+        exp_res = CosineEngine(256, 10, batch=False)(strike_arr, t, r, q, S0, process)
+        npt.assert_array_almost_equal(res, exp_res, 10)
+
+    def test_adaptive_black_scholes(self):
+        S0, r, q, sigma = 100, 0.03, 0.01, 0.2
+        strike_arr = np.linspace(60, 140, 17)
+        last_N = []
+        for t, tol in [(0.02, 1e-3), (0.02, 1e-8), (1.0, 1e-3), (1.0, 1e-8)]:
+            engine = CosineEngine(16, None, tol=tol)
+            res = engine(strike_arr, t, r, q, S0, BlackScholes(sigma))
+            _, _, N, grid_res = engine.adaptive_grid(strike_arr, t, r, q, S0, BlackScholes(sigma))
+            npt.assert_array_equal(grid_res, res)
+            forward = S0 * np.exp((r - q) * t)
+            exp_res = np.exp(-r * t) * np.sqrt(forward * strike_arr) * normalized_black_call(
+                np.log(forward / strike_arr), sigma * np.sqrt(t))
+            self.assertLess(np.max(np.abs(res - exp_res)), tol)
+            last_N.append(N)
+        self.assertLess(last_N[0], last_N[1])
+        self.assertLess(last_N[0], 2 ** 12)
+
+    def test_adaptive_warns_at_max_N(self):
+        S0, t, r, q = 100, 0.02, 0.03, 0.01
+        strike_arr = np.linspace(60, 140, 17)
+        engine = CosineEngine(16, None, tol=1e-9, max_N=2 ** 10)
+        with self.assertWarnsRegex(RuntimeWarning, 'max_N = 1024 with a series tail of'):
+            _, _, N, _ = engine.adaptive_grid(strike_arr, t, r, q, S0, VarianceGamma(-0.14, 0.2, 0.12))
+        self.assertEqual(N, 2 ** 10)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            CosineEngine(16, None, tol=1e-6)(strike_arr, t, r, q, S0, BlackScholes(0.2))
+
+    def test_adaptive_matches_reference(self):
+        S0, t, r, q = 100, 0.5, 0.03, 0.01
+        strike_arr = np.linspace(60, 140, 17)
+        for process in [Heston(0.04, 0.04, 2, 0.5, -0.7), VarianceGamma(-0.14, 0.2, 0.12)]:
+            exp_res = CosineEngine(2 ** 14, 16)(strike_arr, t, r, q, S0, process)
+            engine = CosineEngine(16, None, tol=1e-6)
+            npt.assert_allclose(engine(strike_arr, t, r, q, S0, process), exp_res, atol=1e-6)
+            greeks = engine.calc_greeks(strike_arr, t, r, q, S0, process)
+            N = engine.adaptive_grid(strike_arr, t, r, q, S0, process)[2]
+            exp_greeks = CosineEngine(N, 16).calc_greeks(strike_arr, t, r, q, S0, process)
+            npt.assert_allclose(greeks['delta'], exp_greeks['delta'], atol=1e-5)
+
+    def test_continuation_coefficients_match_dense_product(self):
+        N, a, b, x1, x2 = 32, -2., 3., -0.5, 1.2
+        weighted_arr = np.random.RandomState(0).randn(N) + 1j * np.random.RandomState(1).randn(N)
+        omega = np.pi / (b - a)
+
+        def m(l_arr):
+            safe_l = np.where(l_arr == 0, 1, l_arr)
+            return np.where(l_arr == 0, 1j * omega * (x2 - x1),
+                            (np.exp(1j * l_arr * omega * (x2 - a)) - np.exp(1j * l_arr * omega * (x1 - a))) / safe_l)
+
+        j = np.arange(N)
+        m_mat = m(j[np.newaxis, :] + j[:, np.newaxis]) + m(j[np.newaxis, :] - j[:, np.newaxis])
+        exp_res = 0.9 / np.pi * m_mat.dot(weighted_arr).imag
+        npt.assert_array_almost_equal(continuation_coefficients(a, b, x1, x2, weighted_arr, 0.9), exp_res, 12)
+
+    def test_early_exercise_black_scholes(self):
+        engine = EarlyExerciseCosineEngine(512, 10, exercise_dates=10)
+        process = BlackScholes(0.2)
+        # Fang and Oosterlee (2009), Bermudan put with 10 exercise dates
+        self.assertAlmostEqual(engine.price(110, True, 1, 0.1, 0, 100, process, 'bermudan')[0], 10.479520123857, 8)
+        # binomial tree with 80000 steps
+        self.assertAlmostEqual(engine.price(110, True, 1, 0.1, 0, 100, process, 'american')[0], 10.71918, 3)
+        strike_arr = np.array([90, 100, 110])
+        european = CosineEngine(2 ** 12, 12)(strike_arr, 1, 0.1, 0, 100, process)
+        npt.assert_array_almost_equal(engine(strike_arr, 1, 0.1, 0, 100, process), european, 10)
+        npt.assert_array_almost_equal(engine.price(strike_arr, False, 1, 0.1, 0, 100, process, 'american'), european, 10)
+
+    def test_early_exercise_calls_with_dividends(self):
+        engine = EarlyExerciseCosineEngine(512, 10, exercise_dates=12)
+        strike_arr = np.array([80, 100, 120])
+        for process in [BlackScholes(0.25), CGMY(1., 5., 5., 0.5), VarianceGamma(-0.14, 0.2, 0.12)]:
+            european = CosineEngine(2 ** 12, 12)(strike_arr, 1, 0.05, 0.04, 100, process)
+            bermudan = engine.price(strike_arr, False, 1, 0.05, 0.04, 100, process, 'bermudan')
+            american = engine.price(strike_arr, False, 1, 0.05, 0.04, 100, process, 'american')
+            self.assertTrue(np.all(bermudan > european - 1e-5))
+            self.assertTrue(np.all(american > bermudan - 1e-5))
+            self.assertTrue(np.all(american >= 100 - strike_arr))
+
+    def test_early_exercise_errors(self):
+        engine = EarlyExerciseCosineEngine(256, 10)
+        with self.assertRaises(ValueError):
+            engine.price(100, True, 1, 0.1, 0, 100, Heston(0.04, 0.04, 2, 0.5, -0.7))
+        with self.assertRaises(ValueError):
+            engine.price(100, True, 1, 0.1, 0, 100, BlackScholes(0.2), 'bermudan')
+        with self.assertRaises(ValueError):
+            engine.price(100, True, 1, 0.1, 0, 100, BlackScholes(0.2), 'asian')
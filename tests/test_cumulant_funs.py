@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.moment_generating_funs import cumulants_from_mgf
+from fftoptionlib.process_class import (
+    BlackScholes,
+    Heston,
+    MertonJump,
+    KouJump,
+    VarianceGamma,
+    NIG,
+    CGMY,
+    Poisson,
+)
+
+
+def autograd_cumulants(process, t, r, q):
+    return cumulants_from_mgf(process.mgf, t=t, r=r, q=q, S0=1.0)
+
+
+class TestCumulantFunctions(unittest.TestCase):
+    def setUp(self):
+        self.t, self.r, self.q = 0.7, 0.03, 0.01
+
+    def assert_matches_autograd(self, process, decimal=10):
+        res = process.cumulants(self.t, self.r, self.q)
+        exp_res = autograd_cumulants(process, self.t, self.r, self.q)
+        npt.assert_array_almost_equal(res, exp_res, decimal)
+
+    def test_black_scholes_cumulants(self):
+        self.assert_matches_autograd(BlackScholes(0.25))
+
+    def test_merton_jump_cumulants(self):
+        self.assert_matches_autograd(MertonJump(0.2, 0.5, -0.1, 0.15))
+
+    def test_kou_jump_cumulants(self):
+        self.assert_matches_autograd(KouJump(0.2, 0.8, 10., 5., 0.4))
+
+    def test_poisson_cumulants(self):
+        self.assert_matches_autograd(Poisson(0.34))
+
+    def test_vg_cumulants(self):
+        self.assert_matches_autograd(VarianceGamma(-0.14, 0.2, 0.12))
+
+    def test_nig_cumulants(self):
+        self.assert_matches_autograd(NIG(2, 0.3, 0.6))
+
+    def test_cgmy_cumulants(self):
+        self.assert_matches_autograd(CGMY(0.1, 2, 2, 1.5))
+
+    def test_heston_cumulants(self):
+        self.assert_matches_autograd(Heston(0.09, 0.05, 0.5, 1.0, -0.3), 8)
+        self.assert_matches_autograd(Heston(0.04, 0.04, 2, 0.5, -0.7), 8)
+
+    def test_cumulants_follow_parameter_changes(self):
+        process = BlackScholes(0.2)
+        self.assertAlmostEqual(process.cumulants(1., 0., 0.)[1], 0.04)
+        process.sigma = 0.3
+        self.assertAlmostEqual(process.cumulants(1., 0., 0.)[1], 0.09)
+
+    def test_cumulants_of_maturity_arrays(self):
+        process = BlackScholes(0.2)
+        res = process.cumulants(np.array([0.5, 1.]), 0.02, 0.)
+        npt.assert_array_almost_equal(res[1], [0.02, 0.04])
+        self.assertIs(process.cumulants(np.array([0.5, 1.]), 0.02, 0.), res)
+
+    def test_cumulants_without_base_init(self):
+        class UserBlackScholes(BlackScholes):
+            def __init__(self, sigma):
+                self.sigma = sigma
+
+        process = UserBlackScholes(0.2)
+        self.assertAlmostEqual(process.cumulants(1., 0., 0.)[1], 0.04)
+        self.assertIsNone(process.type)
+        process.log_chf(np.linspace(0, 10, 5), 0.5, 0.02, 0., 100.)
@@ -0,0 +1,138 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.engine_class import (
+    CosineEngine,
+    FFTEngine,
+    FractionFFTEngine,
+    NUFFTEngine,
+    discounted_chf,
+)
+from fftoptionlib.process_class import (
+    BlackScholes,
+    Heston,
+    NIG,
+    VarianceGamma,
+)
+
+
+class TestEngineClass(unittest.TestCase):
+    def setUp(self):
+        self.S0 = 100
+        self.t_arr = np.array([1 / 12, 0.25, 0.5, 1.0])
+        self.r_arr = np.array([0.01, 0.02, 0.025, 0.03])
+        self.q = 0.01
+        self.strike = [np.array([90, 100, 110]),
+                       np.linspace(80, 120, 9),
+                       np.array([100]),
+                       np.linspace(60, 140, 17)]
+
+    def assert_surface_matches_single_maturity(self, engine, process):
+        res = engine.price_surface(self.strike, self.t_arr, self.r_arr, self.q, self.S0, process)
+        self.assertEqual(res.shape, (4, 17))
+        for i, (strike, t, r) in enumerate(zip(self.strike, self.t_arr, self.r_arr)):
+            exp_res = engine(strike, t, r, self.q, self.S0, process)
+            npt.assert_array_almost_equal(res[i, :len(strike)], exp_res, 10)
+            self.assertTrue(np.all(np.isnan(res[i, len(strike):])))
+
+    def test_fft_price_surface(self):
+        self.assert_surface_matches_single_maturity(FFTEngine(2 ** 12, 0.05, 1, spline_order=3),
+                                                    Heston(0.04, 0.04, 2, 0.5, -0.7))
+
+    def test_fraction_fft_price_surface(self):
+        self.assert_surface_matches_single_maturity(FractionFFTEngine(2 ** 12, 0.05, 0.01, 1, spline_order=2),
+                                                    VarianceGamma(-0.14, 0.2, 0.12))
+
+    def test_nufft_price_surface(self):
+        self.assert_surface_matches_single_maturity(NUFFTEngine(512, 0.25, 1.5), NIG(4., 0.3, 0.6))
+
+    def test_nufft_matches_reference_with_small_n(self):
+        strike = np.linspace(50, 200, 61)
+        engine = NUFFTEngine(512, 0.25, 1.5)
+        for process in [Heston(0.04, 0.04, 2, 0.5, -0.7), VarianceGamma(-0.14, 0.2, 0.12)]:
+            exp_res = CosineEngine(2 ** 14, 14)(strike, 0.5, 0.02, self.q, self.S0, process)
+            npt.assert_allclose(engine(strike, 0.5, 0.02, self.q, self.S0, process), exp_res, atol=2e-5)
+        greeks = engine.calc_greeks(strike, 0.5, 0.02, self.q, self.S0, process)
+        exp_greeks = CosineEngine(2 ** 12, 14).calc_greeks(strike, 0.5, 0.02, self.q, self.S0, process)
+        for name in ['price', 'delta', 'gamma', 'theta', 'd_sigma']:
+            npt.assert_allclose(greeks[name], exp_greeks[name], rtol=1e-4, atol=1e-4)
+
+    def test_strike_window_surface(self):
+        self.assert_surface_matches_single_maturity(
+            FractionFFTEngine(2 ** 10, 0.1, 0.01, 1.5, spline_order=3, strike_window=(60, 140)),
+            VarianceGamma(-0.14, 0.2, 0.12))
+
+    def test_strike_window_matches_exact_sum(self):
+        strike = np.arange(95, 105.5, 0.5)
+        for process in [Heston(0.04, 0.04, 2, 0.5, -0.7), NIG(15., -5., 0.5)]:
+            # the non-uniform FFT evaluates the same quadrature without interpolation
+            exp_res = NUFFTEngine(128, 0.5, 1.5, spreading=16)(strike, 0.05, 0.02, self.q, self.S0, process)
+            centred = FractionFFTEngine(128, 0.5, 4. / 128, 1.5, 3)
+            self.assertGreater(np.max(np.abs(centred(strike, 0.05, 0.02, self.q, self.S0, process) - exp_res)), 1e-3)
+            for strike_window in ['strikes', (95, 105)]:
+                engine = FractionFFTEngine(128, 0.5, 4. / 128, 1.5, 3, strike_window=strike_window)
+                res = engine(strike, 0.05, 0.02, self.q, self.S0, process)
+                npt.assert_allclose(res, exp_res, atol=1e-8)
+        grid_plans = dict(engine._grid_plans)
+        engine(strike, 0.05, 0.02, self.q, self.S0, process)
+        engine(np.array([100.]), 0.05, 0.02, self.q, self.S0, process)
+        self.assertEqual(engine._grid_plans, grid_plans)
+        # the centred plan, for its u grid, and the one of the window
+        self.assertEqual(len(grid_plans), 2)
+        with self.assertRaises(ValueError):
+            FractionFFTEngine(128, 0.5, 4. / 128, 1.5, 3, strike_window='listed')(strike, 0.05, 0.02, self.q,
+                                                                                    self.S0, process)
+
+    def test_local_interpolation_surface(self):
+        self.assert_surface_matches_single_maturity(FFTEngine(2 ** 12, 0.05, 1, spline_order=3, interpolation='local'),
+                                                    Heston(0.04, 0.04, 2, 0.5, -0.7))
+
+    def test_local_interpolation_matches_spline(self):
+        process = Heston(0.04, 0.04, 2, 0.5, -0.7)
+        strike = np.linspace(60, 140, 17)
+        exp_res = CosineEngine(2 ** 12, 16)(strike, 0.5, 0.02, self.q, self.S0, process)
+        for spline_order in [2, 3, 5]:
+            for engine in [FFTEngine(2 ** 12, 0.05, 1, spline_order),
+                           FractionFFTEngine(2 ** 12, 0.05, 0.01, 1, spline_order)]:
+                spline_error = np.max(np.abs(engine(strike, 0.5, 0.02, self.q, self.S0, process) - exp_res))
+                exp_greeks = engine.calc_greeks(strike, 0.5, 0.02, self.q, self.S0, process)
+                engine.interpolation = 'local'
+                local_error = np.max(np.abs(engine(strike, 0.5, 0.02, self.q, self.S0, process) - exp_res))
+                self.assertLess(local_error, 1.5 * spline_error)
+                greeks = engine.calc_greeks(strike, 0.5, 0.02, self.q, self.S0, process)
+                for name in ['delta', 'gamma']:
+                    npt.assert_array_almost_equal(greeks[name], exp_greeks[name], 4)
+
+    def test_unknown_interpolation(self):
+        with self.assertRaises(ValueError):
+            FFTEngine(2 ** 12, 0.05, 1, 3, interpolation='linear')
+
+    def test_single_precision_matches_double(self):
+        strike = np.linspace(60, 140, 17)
+        for process in [BlackScholes(0.3), Heston(0.04, 0.04, 2, 0.5, -0.7), VarianceGamma(-0.14, 0.2, 0.12),
+                        NIG(4., 0.3, 0.6)]:
+            for engine in [FFTEngine(2 ** 12, 0.05, 1.5, 3), FractionFFTEngine(2 ** 12, 0.05, 0.01, 1.5, 3)]:
+                exp_res = engine(strike, 0.5, 0.02, self.q, self.S0, process)
+                engine.precision = 'single'
+                self.assertEqual(engine.grid_plan.chf_u_arr.dtype, np.complex64)
+                self.assertEqual(discounted_chf(engine.grid_plan.chf_u_arr, 0.5, 0.02, self.q, self.S0,
+                                                process).dtype, np.complex64)
+                res = engine(strike, 0.5, 0.02, self.q, self.S0, process)
+                npt.assert_allclose(res, exp_res, atol=1e-4)
+
+    def test_unknown_precision(self):
+        with self.assertRaises(ValueError):
+            FFTEngine(2 ** 12, 0.05, 1, 3, precision='half')
+
+    def test_spot_pricer_matches_engine(self):
+        process = Heston(0.04, 0.04, 2, 0.5, -0.7)
+        strike = np.linspace(80, 120, 9)
+        for engine in [FFTEngine(2 ** 12, 0.05, 1.5, 3), FFTEngine(2 ** 12, 0.05, 1.5, 3, interpolation='local'),
+                       FractionFFTEngine(2 ** 12, 0.05, 0.01, 1.5, 3), NUFFTEngine(512, 0.25, 1.5, spreading=16),
+                       CosineEngine(256, 12),
+                       CosineEngine(16, None, tol=1e-6)]:
+            spot_prices = engine.spot_pricer(strike, 0.5, 0.02, self.q, self.S0, process)
+            for S0 in [95., 100., 100.37, 104.2]:
+                npt.assert_array_almost_equal(spot_prices(S0), engine(strike, 0.5, 0.02, self.q, S0, process), 10)
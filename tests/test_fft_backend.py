@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib import fft_backend
+from fftoptionlib.engine_class import (
+    FFTEngine,
+    FractionFFTEngine,
+)
+from fftoptionlib.fft_backend import (
+    ScipyFFTBackend,
+    NumpyFFTBackend,
+    PyFFTWBackend,
+    make_fft_backend,
+    set_fft_backend,
+    get_fft_backend,
+)
+from fftoptionlib.process_class import VarianceGamma
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+
+class TestFFTBackend(unittest.TestCase):
+    def setUp(self):
+        self.process = VarianceGamma(-0.14, 0.2, 0.12)
+        self.strike = np.array([80., 95., 100., 110.])
+        self.kwargs = dict(t=0.5, r=0.02, q=0.01, S0=100.)
+        self.default_backend = get_fft_backend()
+
+    def tearDown(self):
+        set_fft_backend(self.default_backend)
+
+    def engines(self):
+        return [FFTEngine(2 ** 12, 0.05, 1.5, spline_order=3),
+                FractionFFTEngine(2 ** 10, 0.1, 0.002, 1.5, spline_order=3)]
+
+    def assert_backend_matches_default(self, backend, **options):
+        for engine in self.engines():
+            exp_res = engine(self.strike, chf_ln_st=self.process, **self.kwargs)
+            res = engine.set_fft_backend(backend, **options)(self.strike, chf_ln_st=self.process, **self.kwargs)
+            npt.assert_array_almost_equal(res, exp_res, 10)
+
+    def test_scipy_workers(self):
+        self.assert_backend_matches_default('scipy', workers=2)
+
+    def test_numpy(self):
+        self.assert_backend_matches_default(NumpyFFTBackend())
+
+    @unittest.skipIf(pyfftw is None, 'pyfftw is not installed')
+    def test_pyfftw(self):
+        self.assert_backend_matches_default('pyfftw', threads=2, planner_effort='FFTW_ESTIMATE')
+
+    def test_overwrite_x(self):
+        x = np.exp(1j * np.arange(8.))
+        exp_res = np.fft.fft(x)
+        for backend in [ScipyFFTBackend(), NumpyFFTBackend()]:
+            npt.assert_array_almost_equal(backend.fft(x.copy(), overwrite_x=True), exp_res, 12)
+            npt.assert_array_almost_equal(backend.ifft(backend.fft(x.copy()), overwrite_x=True), x, 12)
+
+    def test_numpy_without_out(self):
+        # numpy before 2.0 has no out argument
+        backend = NumpyFFTBackend()
+        backend.supports_out = False
+        x = np.exp(1j * np.arange(8.))
+        y = x.copy()
+        npt.assert_array_almost_equal(backend.fft(y, overwrite_x=True), np.fft.fft(x), 12)
+        npt.assert_array_equal(y, x)
+
+    def test_global_backend(self):
+        backend = set_fft_backend('numpy')
+        self.assertIs(get_fft_backend(), backend)
+        self.assertIs(fft_backend.get_fft_backend(), backend)
+        engine = self.engines()[0]
+        self.assertIsNone(engine.fft_backend)
+        engine(self.strike, chf_ln_st=self.process, **self.kwargs)
+        self.assertIsInstance(engine.set_fft_backend('scipy').fft_backend, ScipyFFTBackend)
+        self.assertIsNone(engine.set_fft_backend(None).fft_backend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            make_fft_backend('fftpack')
+        if pyfftw is None:
+            with self.assertRaises(ImportError):
+                PyFFTWBackend()
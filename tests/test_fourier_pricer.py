@@ -1,8 +1,19 @@
 import unittest
 
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.engine_class import discounted_chf
 from fftoptionlib.fourier_pricer import (
+    FFTGridPlan,
+    FractionFFTGridPlan,
+    NUFFTGridPlan,
     carr_madan_fft_call_pricer,
     carr_madan_fraction_fft_call_pricer,
+    carr_madan_fft_transform,
+    carr_madan_nufft_transform,
+    carr_madan_fraction_fft_transform,
+    simpson_weights,
 )
 from fftoptionlib.helper import spline_fitting
 from fftoptionlib.process_class import (
@@ -12,6 +23,20 @@ from fftoptionlib.process_class import (
 )
 
 
+def direct_sum_call_prices(N, d_u, d_k, alpha, r, t, S0, q, chf_ln_st, rows):
+    """
+    Carr-Madan call prices on the rows of the log strike grid ln(S0) + (j - N / 2) d_k by a direct sum over the
+    Simpson rule, independent of the grid plans.
+    """
+    u_arr = np.arange(N) * d_u
+    k_arr = np.log(S0) + (rows - N / 2) * d_k
+    w_arr = d_u / 3 * (3 + (-1) ** (np.arange(N) + 1) - (np.arange(N) == 0))
+    psi_arr = np.exp(-r * t) * chf_ln_st(u_arr - (alpha + 1) * 1j, t, r, q=q, S0=S0) / (
+        (alpha + 1j * u_arr) * (alpha + 1j * u_arr + 1))
+    fft_prices = np.exp(-1j * np.outer(k_arr, u_arr)).dot(w_arr * psi_arr)
+    return np.exp(k_arr), np.exp(-alpha * k_arr) / np.pi * fft_prices.real
+
+
 class TestFourierPricer(unittest.TestCase):
     def test_carr_madan_fft_call_pricer_black_shole(self):
         N = 2 ** 15
@@ -117,6 +142,92 @@ class TestFourierPricer(unittest.TestCase):
         v = 0.2
         strike, call_prices = carr_madan_fraction_fft_call_pricer(N, d_u, d_k, alpha, r, t, S0, q, VarianceGamma(theta, v, sigma).set_type('chf'))
         ffn_pricer = spline_fitting(strike, call_prices, 2)
-        exp_res = 10.8289
+        exp_res = 10.82886
         res = ffn_pricer(90)
         self.assertAlmostEqual(exp_res, res, 4)
+
+    def test_fft_grid_plan_reuse(self):
+        N = 2 ** 12
+        d_u = 0.05
+        alpha = 1
+        t = 0.5
+        r = 0.03
+        q = 0.01
+        process = Heston(0.04, 0.04, 2, 0.5, -0.7).set_type('chf')
+        grid_plan = FFTGridPlan(N, d_u, alpha)
+        rows = N // 2 + np.arange(-50, 51, 2)
+        for S0 in [90, 100, 110, 100]:
+            exp_strike, exp_res = direct_sum_call_prices(N, d_u, 2 * np.pi / (N * d_u), alpha, r, t, S0, q, process,
+                                                         rows)
+            call_chf = discounted_chf(grid_plan.chf_u_arr, t, r, q, S0, process)
+            strike, res = carr_madan_fft_transform(grid_plan, S0, call_chf)
+            npt.assert_allclose(strike[rows], exp_strike, rtol=1e-12)
+            npt.assert_allclose(res[rows], exp_res, rtol=1e-9, atol=1e-12)
+            exp_strike, exp_res = carr_madan_fft_call_pricer(N, d_u, alpha, r, t, S0, q, process)
+            npt.assert_array_equal(exp_res, res)
+            npt.assert_array_equal(grid_plan.strikes(S0), strike)
+        self.assertAlmostEqual(np.log(grid_plan.strikes(100)[N // 2]), np.log(100))
+        self.assertFalse(grid_plan.weight_arr.flags.writeable)
+
+    def test_fraction_fft_grid_plan_reuse(self):
+        N = 2 ** 12
+        d_u = 0.05
+        d_k = 0.01
+        alpha = 1
+        t = 0.5
+        r = 0.03
+        q = 0.01
+        process = Heston(0.04, 0.04, 2, 0.5, -0.7).set_type('chf')
+        grid_plan = FractionFFTGridPlan(N, d_u, d_k, alpha)
+        rows = N // 2 + np.arange(-50, 51, 2)
+        for S0 in [100, 105]:
+            exp_strike, exp_res = direct_sum_call_prices(N, d_u, d_k, alpha, r, t, S0, q, process, rows)
+            call_chf = discounted_chf(grid_plan.chf_u_arr, t, r, q, S0, process)
+            strike, res = carr_madan_fraction_fft_transform(grid_plan, S0, call_chf)
+            npt.assert_allclose(strike[rows], exp_strike, rtol=1e-12)
+            npt.assert_allclose(res[rows], exp_res, rtol=1e-9, atol=1e-12)
+            exp_strike, exp_res = carr_madan_fraction_fft_call_pricer(N, d_u, d_k, alpha, r, t, S0, q, process)
+            npt.assert_array_equal(exp_res, res)
+        self.assertEqual(grid_plan.fft_z_arr.shape, (2 * N,))
+        self.assertFalse(grid_plan.fft_z_arr.flags.writeable)
+
+    def test_fraction_fft_matches_fft_and_nufft(self):
+        N = 2 ** 10
+        d_u = 0.25
+        alpha = 1.5
+        S0 = 100
+        t = 0.5
+        r = 0.03
+        q = 0.01
+        rows = N // 2 + np.arange(-40, 41, 4)
+        for process in [Heston(0.04, 0.04, 2, 0.5, -0.7), VarianceGamma(-0.14, 0.2, 0.12)]:
+            call_chf = discounted_chf(FFTGridPlan(N, d_u, alpha).chf_u_arr, t, r, q, S0, process)
+            # with d_k = 2 pi / (N d_u) the fractional FFT is the plain FFT, every point of the chirp kernel counts
+            exp_strike, exp_res = carr_madan_fft_transform(FFTGridPlan(N, d_u, alpha), S0, call_chf)
+            strike, res = carr_madan_fraction_fft_transform(
+                FractionFFTGridPlan(N, d_u, 2 * np.pi / (N * d_u), alpha), S0, call_chf)
+            npt.assert_allclose(strike, exp_strike, rtol=1e-12)
+            npt.assert_allclose(res[rows], exp_res[rows], rtol=1e-9, atol=1e-10)
+            for d_k in [0.002, 0.01]:
+                strike, res = carr_madan_fraction_fft_transform(FractionFFTGridPlan(N, d_u, d_k, alpha), S0, call_chf)
+                exp_res = carr_madan_nufft_transform(NUFFTGridPlan(N, d_u, alpha), np.log(strike[rows]), call_chf)
+                npt.assert_allclose(res[rows], exp_res, rtol=1e-9, atol=1e-9)
+
+    def test_nufft_matches_direct_sum(self):
+        t = 0.5
+        r = 0.03
+        q = 0.01
+        S0 = 100
+        alpha = 1.5
+        process = Heston(0.04, 0.04, 2, 0.5, -0.7).set_type('chf')
+        log_strike = np.log(np.linspace(20, 400, 101))
+        for N in [256, 257]:
+            grid_plan = NUFFTGridPlan(N, 0.25, alpha)
+            call_chf = np.exp(-r * t) * process(grid_plan.chf_u_arr, t, r, q=q, S0=S0)
+            weight_arr = simpson_weights(N, 0.25) / ((alpha + 1j * grid_plan.u_arr) * (alpha + 1j * grid_plan.u_arr + 1))
+            exp_res = np.exp(-alpha * log_strike) / np.pi * (
+                np.exp(-1j * np.outer(log_strike, grid_plan.u_arr)).dot(weight_arr * call_chf)).real
+            npt.assert_allclose(carr_madan_nufft_transform(grid_plan, log_strike, call_chf), exp_res, atol=1e-8)
+            res = carr_madan_nufft_transform(grid_plan, np.vstack([log_strike, log_strike[::-1]]),
+                                             np.vstack([call_chf, 2 * call_chf]))
+            npt.assert_allclose(res, np.vstack([exp_res, 2 * exp_res[::-1]]), atol=1e-8)
@@ -4,6 +4,7 @@ import numpy as np
 import numpy.testing as npt
 
 from fftoptionlib.helper import (
+    local_interpolation,
     to_array_atleast_1d,
     to_array_with_same_dimension,
 )
@@ -67,3 +68,11 @@ class HelperTest(unittest.TestCase):
         npt.assert_array_equal(res[0], exp_res[0])
         npt.assert_array_equal(res[1], exp_res[1])
         npt.assert_array_equal(res[2], exp_res[2])
+
+    def test_local_interpolation_small_grid(self):
+        x_data = np.exp(np.linspace(-1, 1, 7))
+        y_data = np.log(x_data) ** 3
+        x_eval = np.exp(np.array([-0.95, -0.2, 0.5, 0.99]))
+        res = local_interpolation(x_data, y_data, 3, x_eval)
+        # not-a-knot cubic splines reproduce cubics
+        npt.assert_array_almost_equal(res, np.log(x_eval) ** 3, 12)
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.engine_class import CosineEngine
+from fftoptionlib.implied_volatility import (
+    calc_implied_volatility,
+    normalized_black_call,
+    normalized_implied_volatility,
+)
+from fftoptionlib.option_class import BasicOption
+from fftoptionlib.pricing_class import FourierPricer
+from fftoptionlib.process_class import BlackScholes
+
+
+class TestImpliedVolatility(unittest.TestCase):
+    def test_normalized_implied_volatility(self):
+        x = -np.repeat([0., 0.01, 0.1, 0.5, 1., 2., 4.], 6)
+        s = np.tile([0.01, 0.05, 0.2, 0.5, 1., 3.], 7)
+        c = normalized_black_call(x, s)
+        keep = c > 1e-12
+        res = normalized_implied_volatility(x[keep], c[keep])
+        npt.assert_allclose(res, s[keep], rtol=1e-10)
+
+    def test_calc_implied_volatility_of_pricer_output(self):
+        option = BasicOption()
+        (option.set_underlying_close_price(36)
+         .set_dividend(0.01)
+         .set_maturity_date('1999-09-17')
+         .set_evaluation_date('1999-04-22')
+         .set_zero_rate(0.06))
+        volatility = 0.2
+        pricer = FourierPricer(option)
+        pricer.set_log_st_process(BlackScholes(volatility))
+        pricer.set_pricing_engine(CosineEngine(2 ** 10, L=30))
+        strike_arr = np.array([25, 30, 36, 40, 45, 30, 36, 40])
+        put_call_arr = np.array(['call', 'call', 'call', 'call', 'call', 'put', 'put', 'put'])
+        prices = pricer.calc_price(strike_arr, put_call_arr, put_label='put')
+        res = calc_implied_volatility(prices, put_call_arr, strike_arr,
+                                      option.get_time_to_maturity(),
+                                      option.get_discount_bond_price(),
+                                      option.get_forward_price(),
+                                      put_label='put')
+        npt.assert_allclose(res, volatility, rtol=1e-6)
+
+    def test_calc_implied_volatility_out_of_bounds(self):
+        res = calc_implied_volatility([0.5, 1., 120., 5.], 'call', 100, 1., 1., 101.)
+        self.assertTrue(np.all(np.isnan(res[:3])))
+        self.assertFalse(np.isnan(res[3]))
+
+    def test_calc_implied_volatility_rounding_level_time_value(self):
+        rng = np.random.RandomState(1)
+        n = 20000
+        strike = rng.uniform(50, 150, n)
+        t = rng.uniform(0.05, 3, n)
+        volatility = rng.uniform(0.05, 0.8, n)
+        put_call = np.where(rng.uniform(size=n) < 0.5, 'put', 'call')
+        x = np.log(100. / strike)
+        s = volatility * np.sqrt(t)
+        # puts are calls at -x
+        prices = 0.97 * np.sqrt(100. * strike) * normalized_black_call(np.where(put_call == 'put', -x, x), s)
+        res = calc_implied_volatility(prices, put_call, strike, t, 0.97, 100.)
+        valid = ~np.isnan(res)
+        self.assertGreater(valid.mean(), 0.95)
+        npt.assert_allclose(res[valid], volatility[valid], rtol=1e-6)
+        # deep in-the-money, the time value is below the rounding of the price
+        self.assertTrue(np.isnan(calc_implied_volatility(0.97 * 50. + 1e-13, 'call', 50., 1., 0.97, 100.)[0]))
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = ['pandas', 'autograd', 'scipy', 'concurrent.futures.process', 'numba']
+
+
+def modules_after(code):
+    script = code + '; import sys; print(" ".join(sorted(sys.modules)))'
+    return set(subprocess.check_output([sys.executable, '-c', script]).decode().split())
+
+
+class TestImports(unittest.TestCase):
+    def test_package_import_is_light(self):
+        loaded = modules_after('import fftoptionlib')
+        self.assertEqual([name for name in HEAVY_MODULES if name in loaded], [])
+
+    def test_pricing_with_datetimes_skips_pandas_and_autograd(self):
+        loaded = modules_after(
+            'import datetime, fftoptionlib as fol; '
+            'option = fol.BasicOption().set_underlying_close_price(100).set_zero_rate(0.02)'
+            '.set_evaluation_date(datetime.date(2017, 1, 3)).set_maturity_date(datetime.date(2017, 7, 3)); '
+            'pricer = fol.FourierPricer(option).set_log_st_process(fol.Heston(0.04, 0.05, 1.5, 0.3, -0.6))'
+            '.set_pricing_engine(fol.CosineEngine(128, 12)); '
+            'pricer.calc_price([90, 100, 110], "call")')
+        self.assertNotIn('pandas', loaded)
+        self.assertNotIn('autograd', loaded)
+
+    def test_string_dates_still_parse(self):
+        loaded = modules_after(
+            'import fftoptionlib as fol; '
+            'assert fol.BasicOption().set_evaluation_date("2017-01-03").set_maturity_date("2017-02-02")'
+            '.get_duration() == 30')
+        self.assertIn('pandas', loaded)
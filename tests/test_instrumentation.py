@@ -0,0 +1,56 @@
+import pickle
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.engine_class import (
+    FFTEngine,
+    FractionFFTEngine,
+    CosineEngine,
+)
+from fftoptionlib.instrumentation import StageCollector, stage, NULL_STAGE
+from fftoptionlib.process_class import Heston
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.process = Heston(0.04, 0.05, 1.5, 0.3, -0.6)
+        self.strike = np.array([80., 95., 100., 110.])
+        self.kwargs = dict(t=0.5, r=0.02, q=0.01, S0=100.)
+
+    def test_disabled_stage_is_shared(self):
+        self.assertIs(stage(None, 'chf', 10), NULL_STAGE)
+
+    def test_fft_engine_stages(self):
+        for engine in [FFTEngine(2 ** 10, 0.05, 1.5, spline_order=3),
+                       FractionFFTEngine(2 ** 9, 0.1, 0.005, 1.5, spline_order=3)]:
+            exp_res = engine(self.strike, chf_ln_st=self.process, **self.kwargs)
+            collector = StageCollector()
+            res = engine.set_collector(collector)(self.strike, chf_ln_st=self.process, **self.kwargs)
+            npt.assert_array_equal(res, exp_res)
+            self.assertEqual(sorted(collector.stats), ['chf', 'fft', 'spline'])
+            self.assertEqual(collector.stats['chf']['calls'], 1)
+            self.assertEqual(collector.stats['chf']['size'], engine.N)
+            self.assertEqual(collector.stats['spline']['size'], len(self.strike))
+            self.assertGreater(collector.stats['fft']['time'], 0.)
+
+    def test_cosine_engine_stages(self):
+        collector = StageCollector()
+        engine = CosineEngine(128, 12).set_collector(collector)
+        engine(self.strike, chf_ln_st=self.process, **self.kwargs)
+        self.assertEqual(sorted(collector.stats), ['chf', 'cos', 'cumulants'])
+        engine.calc_greeks(self.strike, chf_ln_st=self.process, **self.kwargs)
+        # price, two time bumps and two bumps per Heston parameter
+        self.assertEqual(collector.stats['chf']['calls'], 1 + 3 + 2 * 5)
+        self.assertEqual(collector.stats['chf']['size'], 128 * (1 + 3 + 2 * 5))
+        self.assertEqual(collector.reset().stats, {})
+
+    def test_collector_shared_between_threads(self):
+        collector = StageCollector()
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda i: collector('chf', 1., 2), range(4000)))
+        self.assertEqual(collector.stats['chf']['calls'], 4000)
+        self.assertEqual(collector.stats['chf']['size'], 8000)
+        self.assertEqual(pickle.loads(pickle.dumps(collector)).stats, collector.stats)
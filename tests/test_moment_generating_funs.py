@@ -1,5 +1,8 @@
 import unittest
 
+import numpy as np
+import numpy.testing as npt
+
 from fftoptionlib.characteristic_funs import (
     black_schole_log_st_chf,
     merton_jump_log_st_chf,
@@ -11,8 +14,10 @@ from fftoptionlib.characteristic_funs import (
     poisson_chf,
     vg_log_st_chf,
     nig_log_st_chf,
+    vg_exponent,
 )
 from fftoptionlib.moment_generating_funs import (
+    general_ln_st_mgf,
     black_scholes_log_st_mgf,
     merton_jump_log_st_mgf,
     poisson_log_st_mgf,
@@ -22,6 +27,7 @@ from fftoptionlib.moment_generating_funs import (
     double_exponential_mgf,
     poisson_mgf,
     vg_cgm_mgf,
+    vg_cgf,
     vg_mgf,
     parameter_to_cgm,
     vg_log_st_mgf,
@@ -97,6 +103,18 @@ class TestMomentGeneratingFunctions(unittest.TestCase):
         res = vg_log_st_mgf(u, t, r, q, S, theta, v, sigma)
         self.assertAlmostEqual(exp_res, res)
 
+    def test_vg_cgf(self):
+        # the base of the power turns negative at u = 2.36
+        u, t, theta, v, sigma = np.linspace(-3, 3, 25), 1.5, 0.5, 0.7, 0.3
+        npt.assert_allclose(vg_cgf(u, t, theta, v, sigma), vg_exponent(-1j * u, t, theta, v, sigma), rtol=1e-13)
+        npt.assert_allclose(vg_cgf(u[:10], t, theta, v, sigma), np.log(vg_mgf(u[:10], t, theta, v, sigma)),
+                            rtol=1e-13)
+
+    def test_general_ln_st_mgf(self):
+        u, S, t, r, q, theta, v, sigma = np.linspace(-2, 2, 9), 20.2, 1.5, 0.02, 0.01, 0.5, 0.7, 0.3
+        npt.assert_allclose(general_ln_st_mgf(u, t, r, q, S, vg_mgf, theta, v, sigma),
+                            vg_log_st_mgf(u, t, r, q, S, theta, v, sigma), rtol=1e-13)
+
     def test_nig_log_st_mgf(self):
         u, S, t, r, q, a, b, delta = 0.5, 20.2, 1.5, 0.01, 0.01, 2, 0.3, 0.6
         exp_res = nig_log_st_chf(-1j * u, t, r, q, S, a, b, delta)
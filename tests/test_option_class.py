@@ -0,0 +1,45 @@
+import datetime
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.option_class import BasicOption, OptionBatch
+
+
+class TestOptionBatch(unittest.TestCase):
+    def setUp(self):
+        self.options = [
+            (BasicOption().set_underlying_close_price(36).set_dividend(0.01).set_zero_rate(0.06)
+             .set_evaluation_date('1999-04-22').set_maturity_date('1999-05-17')),
+            (BasicOption().set_underlying_close_price(40).set_zero_rate(0.03)
+             .set_evaluation_date(datetime.date(1999, 4, 22)).set_maturity_date(datetime.date(2000, 4, 21))
+             .set_forward_price(41.)),
+        ]
+        self.batch = OptionBatch.from_options(self.options, [[30, 36, 40], 45], [['call', 'put', 'call'], 'put'])
+
+    def test_european_only(self):
+        self.assertEqual(self.batch.get_exercise_type(), 'european')
+        options = [self.options[0], self.options[1].copy().set_exercise_type('american')]
+        with self.assertRaises(ValueError):
+            OptionBatch.from_options(options, [30, 45], 'put')
+
+    def test_columns(self):
+        self.assertEqual(len(self.batch), 4)
+        npt.assert_array_equal(self.batch.strike, [30, 36, 40, 45])
+        npt.assert_array_equal(self.batch.is_put, [False, True, False, True])
+        self.assertEqual(self.batch.expiry_date.dtype, np.dtype('datetime64[D]'))
+
+    def test_matches_basic_option(self):
+        for getter in ['get_duration', 'get_time_to_maturity', 'get_discount_bond_price', 'get_forward_price']:
+            exp_res = [getattr(self.options[i], getter)() for i in [0, 0, 0, 1]]
+            npt.assert_array_almost_equal(getattr(self.batch, getter)(), exp_res, 12)
+
+    def test_pricing_groups(self):
+        batch = OptionBatch([90, 100, 110, 120], 'call', 100, [0.02, 0.02, 0.03, 0.02], '2017-01-03',
+                            ['2017-07-03', '2017-07-03', '2017-07-03', '2018-01-03'])
+        groups, group_index = batch.pricing_groups()
+        self.assertEqual(groups.shape, (3, 4))
+        self.assertEqual(group_index[0], group_index[1])
+        self.assertEqual(len(set(group_index[1:])), 3)
+        npt.assert_array_equal(groups[group_index, 0], batch.get_time_to_maturity())
@@ -0,0 +1,120 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.characteristic_funs import black_schole_log_st_chf
+from fftoptionlib.engine_class import (
+    FFTEngine,
+    FractionFFTEngine,
+    CosineEngine,
+)
+from fftoptionlib.moment_generating_funs import black_scholes_log_st_mgf
+from fftoptionlib.option_class import BasicOption
+from fftoptionlib.portfolio import EXECUTORS, instance_spec, price_portfolio, rebuild_instance
+from fftoptionlib.pricing_class import FourierPricer
+from fftoptionlib.process_class import (
+    BlackScholes,
+    Heston,
+    VarianceGamma,
+    LogSt,
+)
+
+
+class UserBlackScholes(LogSt):
+    """
+    Process defined outside process_class.
+    """
+    parameter_names = ('sigma',)
+    log_st_chf = staticmethod(black_schole_log_st_chf)
+    log_st_mgf = staticmethod(black_scholes_log_st_mgf)
+
+    def __init__(self, sigma):
+        self.sigma = sigma
+        super(UserBlackScholes, self).__init__()
+
+
+class TestPortfolio(unittest.TestCase):
+    def setUp(self):
+        engines = [FFTEngine(2 ** 12, 0.01, 1.5, spline_order=2),
+                   FractionFFTEngine(2 ** 9, 0.045, 0.0025, 1.5, spline_order=3),
+                   CosineEngine(256, 12)]
+        processes = [BlackScholes(0.2), Heston(0.04, 0.05, 1.5, 0.3, -0.6), VarianceGamma(-0.14, 0.2, 0.12)]
+        self.pricers, self.strikes, self.put_calls = [], [], []
+        for i in range(12):
+            option = (BasicOption().set_underlying_close_price(30 + i)
+                      .set_dividend(0.01)
+                      .set_evaluation_date('2017-01-03')
+                      .set_maturity_date('2017-0%d-17' % (i % 9 + 1))
+                      .set_zero_rate(0.02))
+            pricer = FourierPricer(option)
+            pricer.set_pricing_engine(engines[i % 3]).set_log_st_process(processes[i // 4])
+            self.pricers.append(pricer)
+            self.strikes.append(np.linspace(25, 45, i % 4 + 2))
+            self.put_calls.append(np.where(np.arange(i % 4 + 2) % 2, 'put', 'call'))
+
+    def serial_prices(self):
+        return [pricer.calc_price(strike, put_call)
+                for pricer, strike, put_call in zip(self.pricers, self.strikes, self.put_calls)]
+
+    def test_price_portfolio_in_process(self):
+        prices, offsets = price_portfolio(self.pricers, self.strikes, self.put_calls, max_workers=1, chunk_size=5)
+        self.assertEqual(len(offsets), len(self.pricers) + 1)
+        for i, exp_res in enumerate(self.serial_prices()):
+            npt.assert_array_almost_equal(prices[offsets[i]:offsets[i + 1]], exp_res, 10)
+
+    def test_price_portfolio_process_pool(self):
+        prices, offsets = price_portfolio(self.pricers, self.strikes, self.put_calls, max_workers=2)
+        npt.assert_array_almost_equal(prices, np.concatenate(self.serial_prices()), 10)
+
+    def test_price_portfolio_thread_pool(self):
+        prices, offsets = price_portfolio(self.pricers, self.strikes, self.put_calls, max_workers=3,
+                                          executor='thread')
+        self.assertEqual(len(offsets), len(self.pricers) + 1)
+        npt.assert_array_almost_equal(prices, np.concatenate(self.serial_prices()), 10)
+        with self.assertRaises(ValueError):
+            price_portfolio(self.pricers, self.strikes, self.put_calls, executor='fork')
+
+    def test_price_portfolio_keeps_engine_settings(self):
+        engine = FractionFFTEngine(2 ** 9, 0.045, 0.0025, 1.5, spline_order=3, strike_window=[25., 45.])
+        engine.set_fft_backend('numpy')
+        for pricer in self.pricers:
+            pricer.set_pricing_engine(engine).set_log_st_process(UserBlackScholes(0.2))
+        for max_workers in [1, 2]:
+            prices, offsets = price_portfolio(self.pricers, self.strikes, self.put_calls, max_workers=max_workers)
+            npt.assert_array_almost_equal(prices, np.concatenate(self.serial_prices()), 10)
+
+    def test_instance_spec(self):
+        specs = {}
+        spec = instance_spec(VarianceGamma(-0.14, 0.2, 0.12), specs)
+        self.assertEqual(spec[1:4], ('fftoptionlib.process_class', 'VarianceGamma', (-0.14, 0.2, 0.12)))
+        self.assertEqual(spec[0], instance_spec(VarianceGamma(-0.14, 0.2, 0.12), specs)[0])
+        engine = FractionFFTEngine(2 ** 9, 0.045, 0.0025, 1.5, spline_order=3,
+                                   strike_window=[25., 45.]).set_fft_backend('numpy')
+        rebuilt = rebuild_instance(instance_spec(engine, specs))
+        self.assertIs(type(rebuilt), FractionFFTEngine)
+        for name in FractionFFTEngine.parameter_names:
+            self.assertEqual(getattr(rebuilt, name), getattr(engine, name))
+        self.assertIs(type(rebuilt.fft_backend), type(engine.fft_backend))
+        # classes defined outside fftoptionlib are pickled
+        user_spec = instance_spec(UserBlackScholes(0.2), specs)
+        self.assertEqual(user_spec[0][0], 'pickle')
+        self.assertEqual(rebuild_instance(user_spec).sigma, 0.2)
+
+    def test_price_portfolio_early_exercise(self):
+        option = (BasicOption().set_underlying_close_price(100)
+                  .set_evaluation_date('2017-01-03')
+                  .set_maturity_date('2018-01-03')
+                  .set_zero_rate(0.08)
+                  .set_exercise_type('american'))
+        pricer = FourierPricer(option).set_log_st_process(BlackScholes(0.2)).set_pricing_engine(
+            FFTEngine(2 ** 12, 0.01, 1.5, spline_order=2))
+        self.pricers.append(pricer)
+        self.strikes.append(np.array([90., 110.]))
+        self.put_calls.append(np.array(['put', 'put']))
+        for executor in EXECUTORS:
+            prices, offsets = price_portfolio(self.pricers, self.strikes, self.put_calls, max_workers=1,
+                                              executor=executor)
+            npt.assert_array_almost_equal(prices, np.concatenate(self.serial_prices()), 10)
+        # well above the european put of 8.8
+        self.assertAlmostEqual(prices[-1], 11.13, 2)
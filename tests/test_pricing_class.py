@@ -2,13 +2,16 @@ import unittest
 
 import numpy as np
 import numpy.testing as npt
+from scipy.stats import norm
 
 from fftoptionlib.engine_class import (
+    BarrierEngine,
+    EarlyExerciseCosineEngine,
     FFTEngine,
     FractionFFTEngine,
     CosineEngine,
 )
-from fftoptionlib.option_class import BasicOption
+from fftoptionlib.option_class import BasicOption, OptionBatch
 from fftoptionlib.pricing_class import FourierPricer
 from fftoptionlib.process_class import (
     BlackScholes,
@@ -17,6 +20,7 @@ from fftoptionlib.process_class import (
     NIG,
     CGMY,
     Poisson,
+    Heston,
 )
 
 
@@ -176,3 +180,117 @@ class TestPricingClass(unittest.TestCase):
         cosine_pricer.set_pricing_engine(CosineEngine(N, L=30))
         res = cosine_pricer.calc_price(strike_arr, put_call_arr, put_label='put')
         npt.assert_array_almost_equal(res, exp, 6)
+
+    def test_calc_greeks(self):
+        S0, r, q, volatility = 36, 0.06, 0.01, 0.2
+        t = self.vanilla_option.get_time_to_maturity()
+        strike_arr = np.array([30, 34, 36, 38, 42, 34, 38])
+        put_call_arr = np.array(['call', 'call', 'call', 'call', 'call', 'put', 'put'])
+        put_bool = put_call_arr == 'put'
+        d1 = (np.log(S0 / strike_arr) + (r - q + 0.5 * volatility ** 2) * t) / (volatility * np.sqrt(t))
+        d2 = d1 - volatility * np.sqrt(t)
+        call = S0 * np.exp(-q * t) * norm.cdf(d1) - strike_arr * np.exp(-r * t) * norm.cdf(d2)
+        exp = {
+            'price': np.where(put_bool, call - S0 * np.exp(-q * t) + strike_arr * np.exp(-r * t), call),
+            'delta': np.exp(-q * t) * (norm.cdf(d1) - put_bool),
+            'gamma': np.exp(-q * t) * norm.pdf(d1) / (S0 * volatility * np.sqrt(t)),
+            'theta': (-np.exp(-q * t) * S0 * norm.pdf(d1) * volatility / (2 * np.sqrt(t))
+                      - r * strike_arr * np.exp(-r * t) * (norm.cdf(d2) - put_bool)
+                      + q * S0 * np.exp(-q * t) * (norm.cdf(d1) - put_bool)),
+            'd_sigma': S0 * np.exp(-q * t) * norm.pdf(d1) * np.sqrt(t),
+        }
+        for engine in [CosineEngine(256, L=12),
+                       FFTEngine(2 ** 14, 0.02, 1.5, spline_order=3),
+                       FractionFFTEngine(2 ** 12, 0.05, 0.005, 1.5, spline_order=3)]:
+            pricer = FourierPricer(self.vanilla_option)
+            pricer.set_log_st_process(BlackScholes(volatility))
+            pricer.set_pricing_engine(engine)
+            res = pricer.calc_greeks(strike_arr, put_call_arr, put_label='put')
+            self.assertEqual(sorted(res), sorted(exp))
+            for name in exp:
+                npt.assert_array_almost_equal(res[name], exp[name], 4)
+
+    def test_calc_batch_price(self):
+        options = [self.vanilla_option.copy().set_underlying_close_price(S0).set_maturity_date(expiry)
+                   for S0, expiry in [(36, '1999-05-17'), (36, '1999-08-17'), (40, '1999-05-17'), (36, '1999-05-17')]]
+        strikes = [np.array([30, 36, 40]), np.array([34, 38]), np.array([40]), np.array([36, 44])]
+        put_calls = [np.array(['call', 'put', 'call']), 'put', 'call', np.array(['put', 'call'])]
+        batch = OptionBatch.from_options(options, strikes, put_calls)
+        for engine in [CosineEngine(256, L=12),
+                       FFTEngine(2 ** 12, 0.02, 1.5, spline_order=3),
+                       FractionFFTEngine(2 ** 10, 0.05, 0.005, 1.5, spline_order=3)]:
+            exp_res = []
+            for option, strike, put_call in zip(options, strikes, put_calls):
+                pricer = FourierPricer(option).set_log_st_process(BlackScholes(0.2)).set_pricing_engine(engine)
+                exp_res.append(pricer.calc_price(strike, put_call))
+            pricer = FourierPricer(batch).set_log_st_process(BlackScholes(0.2)).set_pricing_engine(engine)
+            npt.assert_array_almost_equal(pricer.calc_batch_price(), np.concatenate(exp_res), 10)
+
+    def test_stream_price(self):
+        strike_arr = np.array([30, 34, 36, 38, 42])
+        put_call_arr = np.array(['put', 'put', 'call', 'call', 'call'])
+        spots = [36, 36.05, 35.9, 37.2]
+        for engine in [CosineEngine(256, L=12),
+                       FFTEngine(2 ** 12, 0.02, 1.5, spline_order=3),
+                       FractionFFTEngine(2 ** 10, 0.05, 0.005, 1.5, spline_order=3, interpolation='local')]:
+            pricer = FourierPricer(self.vanilla_option).set_log_st_process(Heston(0.04, 0.04, 2, 0.5, -0.7))
+            res = list(pricer.set_pricing_engine(engine).stream_price(spots, strike_arr, put_call_arr))
+            self.assertEqual(len(res), len(spots))
+            for S0, prices in zip(spots, res):
+                option = self.vanilla_option.copy().set_underlying_close_price(S0)
+                exp_res = FourierPricer(option).set_log_st_process(Heston(0.04, 0.04, 2, 0.5, -0.7)).set_pricing_engine(
+                    engine).calc_price(strike_arr, put_call_arr)
+                npt.assert_array_almost_equal(prices, exp_res, 10)
+
+    def test_stream_price_explicit_forward(self):
+        strike_arr = np.array([30, 34, 36, 38, 42])
+        put_call_arr = np.array(['put', 'put', 'call', 'put', 'call'])
+        spots = [36, 37.2]
+        forward = 36.4
+        option = self.vanilla_option.copy().set_forward_price(forward)
+        pricer = FourierPricer(option).set_log_st_process(BlackScholes(0.2)).set_pricing_engine(CosineEngine(256, 12))
+        res = list(pricer.stream_price(spots, strike_arr, put_call_arr))
+        for S0, prices in zip(spots, res):
+            exp_res = FourierPricer(option.copy().set_underlying_close_price(S0).set_forward_price(forward * S0 / 36)
+                                    ).set_log_st_process(BlackScholes(0.2)).set_pricing_engine(
+                CosineEngine(256, 12)).calc_price(strike_arr, put_call_arr)
+            npt.assert_array_almost_equal(prices, exp_res, 10)
+
+    def test_early_exercise_dispatch(self):
+        strike_arr = np.array([30, 36, 40])
+        put_call_arr = np.array(['put', 'call', 'put'])
+        pricer = FourierPricer(self.vanilla_option.copy().set_exercise_type('american'))
+        pricer.set_log_st_process(BlackScholes(0.3)).set_pricing_engine(FFTEngine(2 ** 12, 0.02, 1.5, spline_order=3))
+        res = pricer.calc_price(strike_arr, put_call_arr)
+        option = pricer.option
+        exp_res = EarlyExerciseCosineEngine(2 ** 9, 10).price(
+            strike_arr, put_call_arr == 'put', option.get_time_to_maturity(), option.get_zero_rate(),
+            option.get_dividend(), 36, BlackScholes(0.3), 'american')
+        npt.assert_array_almost_equal(res, exp_res, 10)
+        european = FourierPricer(self.vanilla_option).set_log_st_process(BlackScholes(0.3)).set_pricing_engine(
+            FFTEngine(2 ** 12, 0.02, 1.5, spline_order=3)).calc_price(strike_arr, put_call_arr)
+        self.assertTrue(np.all(res >= european - 1e-6))
+        pricer.option.set_exercise_type('bermudan')
+        pricer.set_early_exercise_engine(EarlyExerciseCosineEngine(2 ** 9, 10, exercise_dates=4))
+        bermudan = pricer.calc_price(strike_arr, put_call_arr)
+        self.assertTrue(np.all(bermudan <= res + 1e-6))
+        self.assertTrue(np.all(bermudan >= european - 1e-6))
+        for calc in [lambda: pricer.calc_greeks(strike_arr, put_call_arr),
+                     lambda: pricer.stream_price([36, 37], strike_arr, put_call_arr),
+                     lambda: FourierPricer(pricer.option).calc_batch_price(pricer.option)]:
+            with self.assertRaises(ValueError):
+                calc()
+
+    def test_barrier_price(self):
+        strike_arr = np.array([30, 36, 40])
+        put_call_arr = np.array(['put', 'call', 'put'])
+        pricer = FourierPricer(self.vanilla_option).set_log_st_process(NIG(15., -5., 0.5))
+        res = pricer.calc_barrier_price(strike_arr, put_call_arr, 32., 'down-and-out', 20)
+        option = pricer.option
+        exp_res = BarrierEngine(2 ** 12, 10).price(
+            strike_arr, put_call_arr == 'put', option.get_time_to_maturity(), option.get_zero_rate(),
+            option.get_dividend(), 36, NIG(15., -5., 0.5), 32., 'down-and-out', 20)
+        npt.assert_array_almost_equal(res, exp_res, 10)
+        pricer.set_barrier_engine(BarrierEngine(2 ** 14, 10))
+        npt.assert_array_almost_equal(pricer.calc_barrier_price(strike_arr, put_call_arr, 32., 'down-and-out', 20),
+                                      exp_res, 4)
@@ -0,0 +1,100 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import numpy.testing as npt
+
+from fftoptionlib.characteristic_funs import black_schole_log_st_chf
+from fftoptionlib.engine_class import CosineEngine, FFTEngine
+from fftoptionlib.moment_generating_funs import black_scholes_log_st_mgf
+from fftoptionlib.process_class import (
+    BlackScholes,
+    CGMY,
+    Heston,
+    KouJump,
+    LogSt,
+    MertonJump,
+    NIG,
+    Poisson,
+    VarianceGamma,
+    chf_and_mgf_switch,
+)
+
+
+class TypedBlackScholes(LogSt):
+    def __init__(self, sigma):
+        super(TypedBlackScholes, self).__init__()
+        self.sigma = sigma
+
+    def __call__(self, u, t, r, q, S0):
+        return chf_and_mgf_switch(black_schole_log_st_chf, black_scholes_log_st_mgf, self.type)(
+            u, t, r, q, S0, self.sigma)
+
+
+class IncompleteProcess(LogSt):
+    def __init__(self, sigma):
+        super(IncompleteProcess, self).__init__('chf')
+        self.sigma = sigma
+
+
+class TestProcessClass(unittest.TestCase):
+    def setUp(self):
+        self.processes = [BlackScholes(0.2), MertonJump(0.2, 0.5, -0.1, 0.15), KouJump(0.2, 0.5, 10., 5., 0.4),
+                          Poisson(0.5), VarianceGamma(-0.14, 0.2, 0.12), NIG(4., 0.3, 0.6),
+                          CGMY(0.1, 5., 5., 1.5), Heston(0.04, 0.04, 2, 0.5, -0.7)]
+        self.u = np.linspace(0, 20, 41)
+
+    def test_chf_and_mgf_leave_type(self):
+        for process in self.processes:
+            process.set_type('mgf')
+            npt.assert_array_equal(process.chf(self.u, 0.5, 0.02, 0.01, 100.),
+                                   process.copy().set_type('chf')(self.u, 0.5, 0.02, 0.01, 100.))
+            self.assertEqual(process.type, 'mgf')
+            process.set_type('chf')
+            npt.assert_array_equal(process.mgf(0.5, 0.5, 0.02, 0.01, 100.),
+                                   process.copy().set_type('mgf')(0.5, 0.5, 0.02, 0.01, 100.))
+            self.assertEqual(process.type, 'chf')
+
+    def test_log_chf(self):
+        for process in self.processes:
+            npt.assert_allclose(np.exp(process.log_chf(self.u - 1.5j, 0.5, 0.02, 0.01, 100.)),
+                                process.log_st_chf(self.u - 1.5j, 0.5, 0.02, 0.01, 100., *process.get_parameters()),
+                                rtol=1e-12)
+        process = VarianceGamma(-0.14, 0.2, 0.12)
+        t_arr = np.array([[0.25], [0.5]])
+        process.log_chf(self.u, t_arr, 0.02, 0.01, 100.)
+        process.log_chf(self.u, t_arr, 0.02, 0.01, 100.)
+        process.log_chf(self.u, 0.5, 0.02, 0.01, 100.)
+        self.assertEqual(len(process._martingale_cache), 2)
+        self.assertEqual(len(process.copy(theta=-0.1)._martingale_cache), 0)
+
+    def test_processes_without_closed_forms(self):
+        process = TypedBlackScholes(0.2)
+        npt.assert_array_almost_equal(process.chf(self.u, 0.5, 0.02, 0.01, 100.),
+                                      BlackScholes(0.2).chf(self.u, 0.5, 0.02, 0.01, 100.), 14)
+        self.assertIsNone(process.type)
+        npt.assert_allclose(np.exp(process.log_chf(self.u, 0.5, 0.02, 0.01, 100.)),
+                            process.chf(self.u, 0.5, 0.02, 0.01, 100.), rtol=1e-14)
+        self.assertAlmostEqual(process.calc_cumulants(0.5, 0.02, 0.01)[1], 0.02, 10)
+        with self.assertRaises(ValueError):
+            BlackScholes(0.2)(self.u, 0.5, 0.02, 0.01, 100.)
+        process = IncompleteProcess(0.2)
+        for calc in [process.chf, process.mgf, process]:
+            with self.assertRaises(NotImplementedError):
+                calc(self.u, 0.5, 0.02, 0.01, 100.)
+
+    def test_shared_process_between_threads(self):
+        process = Heston(0.04, 0.04, 2, 0.5, -0.7)
+        strike = np.linspace(80, 120, 9)
+        engines = [FFTEngine(2 ** 12, 0.05, 1.5, 3), CosineEngine(256, 12), CosineEngine(64, None, tol=1e-6)]
+        exp_res = [engine(strike, 0.5, 0.02, 0.01, 100., process) for engine in engines]
+
+        def price(i):
+            if i % 5 == 0:
+                # a caller switching the process type meanwhile
+                process.set_type('mgf' if i % 2 else 'chf')
+            return engines[i % 3](strike, 0.5, 0.02, 0.01, 100., process)
+
+        with ThreadPoolExecutor(4) as executor:
+            for i, res in enumerate(executor.map(price, range(60))):
+                npt.assert_array_equal(res, exp_res[i % 3])